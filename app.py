@@ -1,8 +1,11 @@
 """Flask application for a web server."""
 
 from threading import Thread
-from flask import Flask, render_template
+from flask import Flask, abort, jsonify, render_template, request, send_from_directory
 import os
+from src.lib.hedging import hedging_report
+from src.lib.memory import memory_report
+from src.lib.profiling import PROFILE_DIR, cancel_profile, list_profiles, pending_profiles, request_profile
 
 app = Flask("")
 
@@ -24,7 +27,54 @@ def home():
     log_display = ''.join(log_contents)
 
     # Render the index.html template with log contents
-    return render_template("index.html", log_display=log_display)
+    return render_template(
+        "index.html",
+        log_display=log_display,
+        profiles=list_profiles(),
+        pending_profiles=pending_profiles(),
+    )
+
+@app.route("/profile", methods=["POST"])
+def profile():
+    """Arm the profiler for the next run of a job."""
+    job_name = request.values.get("job", "")
+    mode = request.values.get("mode", "cprofile")
+    try:
+        request_profile(job_name, mode)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"job": job_name, "mode": mode, "pending": pending_profiles()})
+
+@app.route("/profile/cancel", methods=["POST"])
+def cancel():
+    """Remove the pending profile request of a job."""
+    job_name = request.values.get("job", "")
+    mode = cancel_profile(job_name)
+    if mode is None:
+        return jsonify({"error": f"No pending profile for {job_name}"}), 404
+    return jsonify({"job": job_name, "mode": mode, "pending": pending_profiles()})
+
+@app.route("/profiles")
+def profiles():
+    """List the pending profile requests and the stored profiles."""
+    return jsonify({"pending": pending_profiles(), "profiles": list_profiles()})
+
+@app.route("/profiles/<path:filename>")
+def download_profile(filename):
+    """Download a stored profile."""
+    if not filename.endswith((".pstats", ".collapsed")):
+        abort(404)
+    return send_from_directory(os.path.abspath(PROFILE_DIR), filename, as_attachment=True)
+
+@app.route("/memory")
+def memory():
+    """Show the per-job RSS deltas, tracemalloc snapshots and memory alerts."""
+    return jsonify(memory_report())
+
+@app.route("/hedging")
+def hedging():
+    """Show the hedge rates and tail latencies of the hedged quote requests."""
+    return jsonify(hedging_report())
 
 def run():
     """Run the Flask application."""
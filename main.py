@@ -7,36 +7,14 @@ import pytz
 import schedule
 from app import keep_alive
 
-from src.bist.bist_30_change import bist30_change
-from src.bist.bist_comp import bist_comp
-from src.bist.bist_open_close import send_bist_open, send_bist_close
-from src.bist.bist_sector_info import bist_sector_info
-from src.bist.bist_sector_stock_info import bist_sector_stock_info
-from src.bist.bist_stock_by_time import bist_stock_by_time
-from src.bist.halka_arz import halka_arz
-from src.commodity.commodity_price import commodity_price
-from src.commodity.gold_price import gold_price
-from src.commodity.silver_price import analyze_silver_prices
-from src.crypto.crypto_utils import crypto_send
-from src.etc.exchange_rates import currency_send
-from src.etc.long_term_performance import analyze_long_term_stock
-from src.us.us_open_close import us_open, us_close
-
-OK_LEVEL_NUM = 22  
-START_LEVEL_NUM = 21
-logging.addLevelName(OK_LEVEL_NUM, "OK")
-logging.addLevelName(START_LEVEL_NUM, "START")
-
-def ok(self, message, *args, **kwargs):
-    if self.isEnabledFor(OK_LEVEL_NUM):
-        self._log(OK_LEVEL_NUM, message, args, **kwargs)
-        
-def start(self, message, *args, **kwargs):
-    if self.isEnabledFor(START_LEVEL_NUM):
-        self._log(START_LEVEL_NUM, message, args, **kwargs)
-
-logging.Logger.ok = ok
-logging.Logger.start = start
+from src.lib.jobs import MARKETS, SCHEDULE, TRIGGERS, run_job, warm_up_in_background
+from src.lib.log_levels import install_log_levels
+from src.lib.planner import prefetch_upcoming
+from src.lib.profiling import install_signal_handler
+from src.lib.trading_calendar import is_trading_day, session
+from src.lib.triggers import PUBLISH_TRIGGERS, TriggeredRun, start_time
+
+install_log_levels()
 
 logging.basicConfig(filename='yatirimbot.log', level=logging.INFO, 
                     format='%(asctime)s %(levelname)s %(message)s')
@@ -46,43 +24,78 @@ def is_weekday():
     """Check if the current day is a weekday."""
     return datetime.now(pytz.timezone("Europe/Istanbul")).weekday() < 5
 
-schedule.every().day.at("06:30", "Europe/Istanbul").do(crypto_send)
-schedule.every().day.at("11:00", "Europe/Istanbul").do(bist_stock_by_time)
-schedule.every().day.at("15:00", "Europe/Istanbul").do(bist_stock_by_time)
-schedule.every().day.at("17:30", "Europe/Istanbul").do(analyze_long_term_stock)
-schedule.every().day.at("19:00", "Europe/Istanbul").do(bist_stock_by_time)
-schedule.every().day.at("23:49", "Europe/Istanbul").do(analyze_long_term_stock)
-
-
-schedule.every().day.at("10:17", "Europe/Istanbul").do(send_bist_open).tag("weekday")
-schedule.every().day.at("10:20", "Europe/Istanbul").do(halka_arz).tag("weekday")
-schedule.every().day.at("10:30", "Europe/Istanbul").do(gold_price).tag("weekday")
-schedule.every().day.at("11:30", "Europe/Istanbul").do(analyze_silver_prices).tag("weekday")
-schedule.every().day.at("12:30", "Europe/Istanbul").do(currency_send).tag("weekday")
-schedule.every().day.at("13:30", "Europe/Istanbul").do(lambda: commodity_price("NG=F", "Doğal Gaz")).tag("weekday")
-schedule.every().day.at("16:00", "Europe/Istanbul").do(bist30_change).tag("weekday")
-schedule.every().day.at("16:30", "Europe/Istanbul").do(gold_price).tag("weekday")
-schedule.every().day.at("16:46", "Europe/Istanbul").do(us_open).tag("weekday")
-schedule.every().day.at("18:00", "Europe/Istanbul").do(crypto_send).tag("weekday")
-schedule.every().day.at("18:17", "Europe/Istanbul").do(send_bist_close).tag("weekday")
-schedule.every().day.at("19:30", "Europe/Istanbul").do(bist30_change).tag("weekday")
-schedule.every().day.at("20:00", "Europe/Istanbul").do(lambda: commodity_price("CL=F", "Ham Petrol")).tag("weekday")
-schedule.every().day.at("20:30", "Europe/Istanbul").do(bist30_change).tag("weekday")
-schedule.every().day.at("22:16", "Europe/Istanbul").do(bist_comp).tag("weekday")
-schedule.every().day.at("23:16", "Europe/Istanbul").do(us_close).tag("weekday")
-schedule.every().day.at("23:30", "Europe/Istanbul").do(lambda: commodity_price("HO=F", "Kalorifer Yakıtı")).tag("weekday")
+def is_trading_day_for(name):
+    """Check whether the market of a job is open today; True for jobs not about a market."""
+    market = MARKETS.get(name)
+    if market is None or is_trading_day(market):
+        return True
+    logger.info(f"{market} is closed today, skipping {name}")
+    return False
+
+def run_weekday_job(name, *args):
+    """Run a job only on weekdays, and only when its market is open."""
+    if is_weekday() and is_trading_day_for(name):
+        return run_job(name, *args)
+    return None
+
+def run_triggered_job(name, *args, early_close=False):
+    """
+    Run a job on trading days once its data is available, polling from the scheduler loop.
+
+    Close-triggered jobs are registered twice, at their regular start and at their
+    start on early-close days; only the one for today's session runs.
+    """
+    if not is_weekday() or not is_trading_day_for(name):
+        return
+    if not PUBLISH_TRIGGERS:
+        run_job(name, *args)
+        return
+    trigger = TRIGGERS[name]
+    if trigger.print == "close" and session(trigger.market).early_close != early_close:
+        return
+    triggered_run = TriggeredRun(name, TRIGGERS[name], run_job, args)
+    schedule.every().second.do(poll_triggered_job, triggered_run)
+
+def poll_triggered_job(triggered_run):
+    """Poll the data of a triggered job; stops once the job ran or gave up."""
+    return schedule.CancelJob if triggered_run.poll() else None
+
+def at(nominal, name):
+    """Return the time to schedule a job at, earlier than nominal for triggered jobs."""
+    return start_time(TRIGGERS.get(name), nominal)
+
+def run_startup_job(name):
+    """Run a job once from the scheduler loop."""
+    run_job(name)
+    return schedule.CancelJob
+
+def register(job):
+    """Schedule a run of the job registry."""
+    if job.name in TRIGGERS:
+        scheduled = schedule.every().day.at(at(job.at, job.name), "Europe/Istanbul").do(run_triggered_job, job.name, *job.args)
+        if TRIGGERS[job.name].print == "close" and PUBLISH_TRIGGERS:
+            early = start_time(TRIGGERS[job.name], job.at, early_close=True)
+            schedule.every().day.at(early, "Europe/Istanbul").do(run_triggered_job, job.name, *job.args, early_close=True).tag("weekday")
+    elif job.weekdays:
+        scheduled = schedule.every().day.at(job.at, "Europe/Istanbul").do(run_weekday_job, job.name, *job.args)
+    else:
+        scheduled = schedule.every().day.at(job.at, "Europe/Istanbul").do(run_job, job.name, *job.args)
+    if job.weekdays:
+        scheduled.tag("weekday")
+
+for scheduled_job in SCHEDULE:
+    register(scheduled_job)
+schedule.every().minute.do(prefetch_upcoming)
 
 def main():
     """Run the main scheduling loop."""
     keep_alive()
-    crypto_send()
+    install_signal_handler()
+    warm_up_in_background()
+    schedule.every().second.do(run_startup_job, "crypto_send")
     logger = logging.getLogger(__name__)
     logger.critical('Script Started')
 
-    for job in schedule.get_jobs():
-        if "weekday" in job.tags:
-            job.run = lambda job=job: job() if is_weekday() else None
-
     while True:
         schedule.run_pending()
         time.sleep(1)
@@ -0,0 +1,213 @@
+"""
+Command line runner for the jobs.
+
+Runs any job, a set of jobs or every scheduled job once, optionally in parallel, with
+a chosen data provider and email sink, and prints the per-stage timings and request
+counts of each run. Used for benchmarks, backfills and checking a job by hand.
+
+Examples:
+    uv run runner.py send_bist_open --sink stdout
+    uv run runner.py "commodity_price:NG=F:Doğal Gaz" gold_price --provider fixtures
+    uv run runner.py all --provider fixtures --sink file --parallel 4 --json results.json
+    uv run runner.py all --provider record --cassettes cassettes/
+    uv run runner.py all --provider replay --cassettes cassettes/ --latency 50
+    uv run runner.py bist_comp --provider synthetic --seed 7
+    uv run runner.py send_bist_open --provider replay --latency 90000 --deadlines
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from src.lib.budget import check_budget, enforce_budget, job_usage
+from src.lib.jobs import DEADLINES, JOBS, SCHEDULE, get_job
+from src.lib.log_levels import install_log_levels
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("fetch", "render", "send", "other")
+
+
+class ErrorCounter(logging.Handler):
+    """Count the errors the jobs log, since most jobs log failures instead of raising."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+_error_counter = ErrorCounter()
+
+
+def parse_job_spec(spec):
+    """
+    Parse a job spec of the form "name" or "name:arg1:arg2".
+
+    Raises:
+        ValueError: If the job is not registered.
+    """
+    name, *args = spec.split(":")
+    if name not in JOBS:
+        raise ValueError(f"Unknown job: {name}. Known jobs: {', '.join(sorted(JOBS))}")
+    return name, tuple(args)
+
+
+def scheduled_runs():
+    """Return the distinct (name, args) pairs of the schedule."""
+    runs = []
+    for job in SCHEDULE:
+        if (job.name, job.args) not in runs:
+            runs.append((job.name, job.args))
+    return runs
+
+
+def setup_logging(verbose):
+    """Log to stderr instead of yatirimbot.log."""
+    install_log_levels()
+    logging.basicConfig(
+        level=logging.INFO if verbose else logging.WARNING,
+        stream=sys.stderr,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+    if _error_counter not in logging.getLogger().handlers:
+        logging.getLogger().addHandler(_error_counter)
+
+
+def setup_worker(sink, verbose):
+    """Set up logging and the email sink in this process."""
+    setup_logging(verbose)
+
+    # Imported here so the runner only pays for pandas and yfinance once it runs jobs
+    from src.email_utils import set_sink  # pylint: disable=import-outside-toplevel
+    from src.lib.stats import install_render_timing  # pylint: disable=import-outside-toplevel
+
+    set_sink(sink)
+    install_render_timing()
+
+
+def make_provider(options, name, args):
+    """
+    Create the data provider for one job run; cassettes are kept per job.
+
+    With the "deadlines" option, jobs with a publish deadline fetch under it and fall
+    back to the data cache, as they do when scheduled.
+    """
+    # pylint: disable=import-outside-toplevel
+    from src.lib.cassette import cassette_path
+    from src.lib.data_cache import DeadlineProvider
+    from src.lib.providers import get_provider
+
+    provider = get_provider(
+        options["provider"],
+        fixture_dir=options["fixtures"],
+        cassette=cassette_path("-".join([name, *args]), options["cassettes"]),
+        latency=options["latency"] / 1000,
+        latency_scale=options["latency_scale"],
+        seed=options["seed"] or 0,
+    )
+    if options.get("deadlines") and name in DEADLINES:
+        return DeadlineProvider(DEADLINES[name], provider)
+    return provider
+
+
+def run_one(name, args, provider_options, seed=None):
+    """
+    Run one job with its own data provider and collect its statistics.
+
+    A run that goes over the request budget of the job gets the "over-budget" status.
+
+    Returns:
+        dict: The job, its arguments, its status and its statistics.
+    """
+    from src.lib.providers import use_provider  # pylint: disable=import-outside-toplevel
+
+    func = get_job(name)
+    if seed is not None:
+        # Random picks must match between recording and replaying a cassette
+        random.seed(seed)
+    _error_counter.count = 0
+    status = "ok"
+    with use_provider(make_provider(provider_options, name, args)), enforce_budget(name) as (stats, meter):
+        try:
+            func(*args)
+        except Exception as e:
+            logger.error(f"{name} raised: {e}")
+            status = "failed"
+    if status == "ok" and _error_counter.count:
+        status = f"errors:{_error_counter.count}"
+    budget_violations = check_budget(name, *job_usage(stats, meter))
+    if status == "ok" and budget_violations:
+        status = "over-budget"
+    return {"job": name, "args": list(args), "status": status, **stats.as_dict(), **meter.as_dict(), "budget_violations": budget_violations}
+
+
+def print_results(results):
+    """Print a table of the job runs."""
+    print(f"{'job':<36} {'status':<10} {'wall':>7} {'cpu':>7} " + " ".join(f"{stage:>7}" for stage in STAGES) + f" {'reqs':>5} {'bytes':>10}")
+    for result in results:
+        label = ":".join([result["job"], *result["args"]])
+        stages = " ".join(f"{result['stages'].get(stage, 0.0):>7.2f}" for stage in STAGES)
+        print(
+            f"{label[:36]:<36} {result['status']:<10} {result['wall_time']:>7.2f} {result['cpu_time']:>7.2f} "
+            f"{stages} {result['request_count']:>5} {result['bytes']:>10}"
+        )
+
+
+def main():
+    """Parse the arguments and run the jobs."""
+    parser = argparse.ArgumentParser(description="Run jobs once with a chosen data provider and email sink.")
+    parser.add_argument("jobs", nargs="+", help='job specs ("name" or "name:arg1:arg2"), or "all" for every scheduled job')
+    parser.add_argument("--provider", choices=("live", "fixtures", "record-fixtures", "record", "replay", "synthetic"), default="live")
+    parser.add_argument("--fixtures", default="fixtures", help="fixture directory for the fixture providers")
+    parser.add_argument("--cassettes", default="cassettes", help="cassette directory for the record and replay providers")
+    parser.add_argument("--latency", type=float, default=0.0, help="milliseconds added to every replayed request")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="replay requests with this fraction of their recorded duration")
+    parser.add_argument("--deadlines", action="store_true", help="fetch under the publish deadlines of the jobs, falling back to the data cache")
+    parser.add_argument("--sink", choices=("smtp", "file", "stdout"), default="stdout")
+    parser.add_argument("--seed", type=int, help="seed the random picks of the jobs, e.g. to record and replay the same stocks")
+    parser.add_argument("--parallel", type=int, default=1, help="number of jobs to run at once, each in its own process")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the INFO logs of the jobs")
+    args = parser.parse_args()
+
+    setup_logging(args.verbose)
+    try:
+        runs = scheduled_runs() if args.jobs == ["all"] else [parse_job_spec(spec) for spec in args.jobs]
+    except ValueError as e:
+        parser.error(str(e))
+
+    provider_options = {
+        "provider": args.provider,
+        "fixtures": args.fixtures,
+        "cassettes": args.cassettes,
+        "latency": args.latency,
+        "latency_scale": args.latency_scale,
+        "seed": args.seed,
+        "deadlines": args.deadlines,
+    }
+    if args.parallel > 1:
+        with ProcessPoolExecutor(max_workers=args.parallel, initializer=setup_worker, initargs=(args.sink, args.verbose)) as executor:
+            futures = [executor.submit(run_one, name, job_args, provider_options, args.seed) for name, job_args in runs]
+            results = [future.result() for future in futures]
+    else:
+        setup_worker(args.sink, args.verbose)
+        results = [run_one(name, job_args, provider_options, args.seed) for name, job_args in runs]
+
+    print_results(results)
+    for result in results:
+        for violation in result["budget_violations"]:
+            print(f"OVER BUDGET {violation}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+    sys.exit(0 if all(result["status"] == "ok" for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
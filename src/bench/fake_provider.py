@@ -0,0 +1,33 @@
+"""
+A local fake data provider for the benchmarks.
+
+Serves synthetic bars for any symbol (see src/lib/synthetic.py), an ``info`` dict
+derived from them, and canned cryptoprices.cc and CollectAPI responses, so every
+scheduled job can run without the network.
+"""
+
+import json
+
+from src.lib.synthetic import SyntheticProvider
+
+_CRYPTO = {"BTC": (67000.0, 1.3e12), "ETH": (3500.0, 4.2e11), "SOL": (150.0, 7.0e10)}
+_GOLD = [
+    {"name": "Gram Altın", "buying": 2950.12, "selling": 2951.40},
+    {"name": "ONS Altın", "buying": 2650.30, "selling": 2651.10},
+    {"name": "Çeyrek Altın", "buying": 4850.00, "selling": 4950.00},
+]
+
+
+class FakeProvider(SyntheticProvider):
+    """Synthetic market data plus canned responses for the HTTP APIs the jobs call."""
+
+    name = "fake"
+
+    def http_request(self, method, url, headers=None, body=None):
+        if url.startswith("https://cryptoprices.cc/"):
+            parts = url.rstrip("/").split("/")
+            price, market_cap = _CRYPTO.get(parts[3], (1.0, 1.0))
+            return 200, str(market_cap if parts[-1] == "MCAP" else price).encode()
+        if url.startswith("https://api.collectapi.com/economy/goldPrice"):
+            return 200, json.dumps({"success": True, "result": _GOLD}, ensure_ascii=False).encode("utf-8")
+        return 404, b""
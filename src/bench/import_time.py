@@ -0,0 +1,85 @@
+"""
+Import-time benchmark for ``main.py``.
+
+Imports ``main`` in fresh interpreters and reports the median wall time, and checks
+that none of the heavy libraries are imported at start-up. Exits with status 1 when
+the import is slower than ``--max-seconds`` or a heavy library was imported, so it
+can gate commits.
+
+Usage:
+    python -m src.bench.import_time [--runs 5] [--max-seconds 1.0]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HEAVY_MODULES = ("matplotlib", "yfinance", "pandas", "numpy", "requests")
+
+_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(runs=5):
+    """
+    Import main in fresh interpreters.
+
+    Args:
+        runs (int): Number of interpreters to start.
+
+    Returns:
+        dict: Median and per-run import times in seconds, and the heavy modules that were imported.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    results = []
+    # Run from a scratch directory so the log file main creates does not land in the repo
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-c", _PROBE],
+                cwd=work_dir,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    times = [result["seconds"] for result in results]
+    return {
+        "median": statistics.median(times),
+        "runs": times,
+        "heavy": sorted({module for result in results for module in result["heavy"]}),
+    }
+
+
+def main():
+    """Run the benchmark and exit non-zero when it fails its thresholds."""
+    parser = argparse.ArgumentParser(description="Measure the import time of main.py.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    result = measure_import(args.runs)
+    print(f"main import: median {result['median']:.3f}s over {args.runs} runs")
+    failed = False
+    if result["heavy"]:
+        print(f"FAIL: heavy modules imported at start-up: {', '.join(result['heavy'])}")
+        failed = True
+    if result["median"] > args.max_seconds:
+        print(f"FAIL: import slower than {args.max_seconds:.2f}s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
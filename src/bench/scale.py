@@ -0,0 +1,136 @@
+"""
+Scale benchmark on synthetic market data.
+
+Generates a universe of synthetic symbols (see src/lib/synthetic.py), fetches it the way
+the jobs do, through ``yf.download`` with the synthetic provider installed, runs the
+universe-wide computations of the BIST jobs (daily change, distance to the 52-week
+high, volatility, top movers) and renders a full-history chart, and reports the time
+and memory of every step. Everything runs offline.
+
+Usage:
+    python -m src.bench.scale --symbols 330 --years 10
+    python -m src.bench.scale --symbols 5000 --years 30 --json scale.json
+"""
+
+import argparse
+import io
+import json
+import time
+from contextlib import contextmanager
+
+from src.lib.memory import format_bytes, get_rss
+
+
+@contextmanager
+def timed(results, step):
+    """Record the wall time and the RSS growth of the block under ``step``."""
+    rss_before = get_rss()
+    start = time.perf_counter()
+    yield
+    results[step] = {"seconds": round(time.perf_counter() - start, 4), "rss_delta": get_rss() - rss_before}
+
+
+def universe_summary(data):
+    """
+    Run the universe-wide computations of the BIST jobs on a multi-ticker download.
+
+    Returns:
+        dict: The top and bottom movers and the median distance to the 52-week high and
+        volatility.
+    """
+    close = data["Close"].ffill()
+    change = close.iloc[-1] / close.iloc[-2] - 1
+    distance_to_high = close.iloc[-1] / data["High"].iloc[-252:].max() - 1
+    volatility = close.pct_change().iloc[-252:].std() * 252**0.5
+    movers = change.sort_values()
+    return {
+        "top": movers.index[-5:].tolist(),
+        "bottom": movers.index[:5].tolist(),
+        "median_distance_to_high": round(float(distance_to_high.median()), 4),
+        "median_volatility": round(float(volatility.median()), 4),
+    }
+
+
+def render_history(history, title):
+    """Render the closes of a full history as a PNG and return its bytes."""
+    # pylint: disable=import-outside-toplevel
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(history.index, history["Close"])
+    ax.set_title(title)
+    image_stream = io.BytesIO()
+    fig.savefig(image_stream, format="png")
+    plt.close(fig)
+    return image_stream.getvalue()
+
+
+def run_scale(symbols, years, seed=0):
+    """
+    Run the scale benchmark.
+
+    Args:
+        symbols (int): Number of symbols in the universe.
+        years (int): Years of daily bars per symbol.
+        seed (int): Seed of the synthetic data.
+
+    Returns:
+        dict: The size of the data and the seconds and RSS growth of every step.
+    """
+    # pylint: disable=import-outside-toplevel
+    import yfinance as yf
+
+    from src.lib.providers import use_provider
+    from src.lib.synthetic import SyntheticConfig, SyntheticProvider, synthetic_universe
+
+    universe = synthetic_universe(symbols)
+    # Keep every generated series, the way a data cache holding the universe would
+    provider = SyntheticProvider(seed=seed, config=SyntheticConfig(years=years), cache_size=2 * symbols)
+    steps = {}
+    with use_provider(provider):
+        with timed(steps, "generate"):
+            for symbol in universe:
+                provider.daily_bars(symbol)
+        with timed(steps, "download"):
+            data = yf.download(universe, period="max", progress=False)
+        with timed(steps, "universe"):
+            summary = universe_summary(data)
+        with timed(steps, "history"):
+            history = yf.Ticker(universe[0]).history(period="max")
+        with timed(steps, "render"):
+            png = render_history(history, universe[0])
+
+    return {
+        "symbols": symbols,
+        "years": years,
+        "bars": int(data["Close"].count().sum()),
+        "peak_rss": get_rss(),
+        "png_bytes": len(png),
+        "summary": summary,
+        "steps": steps,
+    }
+
+
+def main():
+    """Parse the arguments and run the scale benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark universe-wide computations on synthetic market data.")
+    parser.add_argument("--symbols", type=int, default=330, help="number of symbols in the universe")
+    parser.add_argument("--years", type=int, default=10, help="years of daily bars per symbol")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic data")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    result = run_scale(args.symbols, args.years, args.seed)
+    print(f"{result['symbols']} symbols, {result['years']} years, {result['bars']} bars, RSS {format_bytes(result['peak_rss'])}, chart {format_bytes(result['png_bytes'])}")
+    for step, values in result["steps"].items():
+        print(f"{step:<10} {values['seconds']:>8.3f}s {format_bytes(values['rss_delta']):>10}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
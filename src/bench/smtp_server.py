@@ -0,0 +1,107 @@
+"""
+A minimal local SMTP server that stands in for the real one during benchmarks.
+
+It accepts any login, keeps every message it receives in memory and never relays
+anything. Only the commands smtplib uses to send a message are implemented.
+"""
+
+import base64
+import socketserver
+import threading
+from email import message_from_bytes
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Handle one SMTP session."""
+
+    def _reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self._reply("220 localhost yatirimbot benchmark SMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self._reply("250-localhost")
+                self._reply("250-AUTH PLAIN LOGIN")
+                self._reply("250 8BITMIME")
+            elif verb == "HELO":
+                self._reply("250 localhost")
+            elif verb == "AUTH":
+                self._authenticate(command)
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                self._receive_data()
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+    def _authenticate(self, command):
+        parts = command.split()
+        if len(parts) > 1 and parts[1].upper() == "LOGIN":
+            # Username and password are asked for one after the other
+            for prompt in ("Username:", "Password:"):
+                self._reply("334 " + base64.b64encode(prompt.encode()).decode())
+                self.rfile.readline()
+        self._reply("235 Authentication successful")
+
+    def _receive_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                break
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        self.server.store(b"".join(lines))
+        self._reply("250 OK: queued")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    SMTP server on 127.0.0.1 that keeps the received messages.
+
+    Usage:
+        with LocalSMTPServer() as server:
+            ... send to 127.0.0.1:server.port ...
+            server.messages
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0):
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self.messages = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, name="local-smtp", daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def store(self, raw):
+        with self._lock:
+            self.messages.append(raw)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+def png_sizes(raw):
+    """Return the sizes in bytes of the PNG attachments of a raw message."""
+    message = message_from_bytes(raw)
+    return [len(part.get_payload(decode=True)) for part in message.walk() if part.get_content_type() == "image/png"]
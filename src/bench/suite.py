@@ -0,0 +1,224 @@
+"""
+End-to-end benchmark of every scheduled job.
+
+Each job runs in a fresh process against the local fake data provider and sends its
+email to a local stand-in SMTP server, so nothing leaves the machine. For every job the
+suite reports the median wall time, CPU time, peak RSS, data requests, bytes fetched
+and PNG bytes attached over a number of repeats, appends the results to a JSON history
+file and compares them with the previous entry.
+
+Usage:
+    python -m src.bench.suite
+    python -m src.bench.suite --repeat 5 --threshold 0.2
+    python -m src.bench.suite bist_comp "commodity_price:NG=F:Doğal Gaz" --no-save
+
+Exits with 1 when a metric regressed by more than the threshold, or a job failed or
+went over its request budget (see src/lib/budget.py).
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from src.bench.smtp_server import LocalSMTPServer, png_sizes
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FILE = os.getenv("BENCH_HISTORY", "bench_history.json")
+METRICS = ("wall_time", "cpu_time", "peak_rss", "request_count", "bytes", "png_bytes")
+# Differences below these are noise, whatever the relative change
+ABSOLUTE_FLOORS = {"wall_time": 0.05, "cpu_time": 0.05, "peak_rss": 5 * 1024 * 1024, "request_count": 0, "bytes": 1024, "png_bytes": 1024}
+
+_error_counter = None
+_provider = None
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes (ru_maxrss is in KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def setup_bench_worker(name, smtp_port, seed, verbose):
+    """Set up a worker process: logging, the local SMTP server, the fake provider and the job module."""
+    global _error_counter, _provider  # pylint: disable=global-statement
+    # pylint: disable=import-outside-toplevel
+    import runner
+    from src import email_utils
+    from src.bench.fake_provider import FakeProvider
+    from src.lib.jobs import get_job
+    from src.lib.providers import install_provider
+
+    runner.setup_worker("smtp", verbose)
+    _error_counter = runner.ErrorCounter()
+    logging.getLogger().addHandler(_error_counter)
+    email_utils.SMTP_HOST, email_utils.SMTP_PORT, email_utils.SMTP_SSL = "127.0.0.1", smtp_port, False
+    email_utils.EMAIL, email_utils.PASSWORD, email_utils.RECEIVER = "bench@localhost", "bench", "bench@localhost"
+    _provider = FakeProvider(seed=seed)
+    install_provider(_provider)
+    # Import the job up front so the first run is not charged for it
+    get_job(name)
+
+
+def bench_run(name, args, seed):
+    """
+    Run a job once in the worker process.
+
+    Returns:
+        dict: The status and statistics of the run.
+    """
+    # pylint: disable=import-outside-toplevel
+    from src.lib.budget import check_budget, enforce_budget, job_usage
+    from src.lib.jobs import get_job
+
+    random.seed(seed)
+    _error_counter.count = 0
+    status = "ok"
+    with enforce_budget(name) as (stats, meter):
+        try:
+            get_job(name)(*args)
+        except Exception as e:
+            logger.error(f"{name} raised: {e}")
+            status = "failed"
+    if status == "ok" and _error_counter.count:
+        status = f"errors:{_error_counter.count}"
+    budget_violations = check_budget(name, *job_usage(stats, meter))
+    if status == "ok" and budget_violations:
+        status = "over-budget"
+    return {"status": status, "peak_rss": _peak_rss(), "budget_violations": budget_violations, **stats.as_dict()}
+
+
+def bench_job(name, args, server, repeat, seed, verbose):
+    """
+    Benchmark one job in its own process.
+
+    Returns:
+        dict: The job, its arguments, its status and the median of every metric.
+    """
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=setup_bench_worker, initargs=(name, server.port, seed, verbose)) as executor:
+        for _ in range(repeat):
+            sent = len(server.messages)
+            run = executor.submit(bench_run, name, args, seed).result()
+            run["png_bytes"] = sum(size for raw in server.messages[sent:] for size in png_sizes(raw))
+            run["emails"] = len(server.messages) - sent
+            runs.append(run)
+    failures = [run["status"] for run in runs if run["status"] != "ok"]
+    return {
+        "job": name,
+        "args": list(args),
+        "status": failures[0] if failures else "ok",
+        "emails": runs[-1]["emails"],
+        "budget_violations": runs[-1]["budget_violations"],
+        **{metric: statistics.median_low(run[metric] for run in runs) for metric in METRICS},
+    }
+
+
+def git_commit():
+    """Return the short hash of the checked out commit, or None outside of a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    """Load the benchmark history, oldest entry first."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def find_regressions(previous, results, threshold):
+    """
+    Compare the results with a previous history entry.
+
+    Args:
+        previous (dict): A history entry.
+        results (list): The results of this run.
+        threshold (float): Allowed relative increase of a metric, e.g. 0.25 for 25%.
+
+    Returns:
+        list: A message for every metric that got worse by more than the threshold.
+    """
+    before = {(job["job"], tuple(job["args"])): job for job in previous["jobs"]}
+    regressions = []
+    for result in results:
+        old = before.get((result["job"], tuple(result["args"])))
+        if old is None:
+            continue
+        for metric in METRICS:
+            if metric not in old:
+                continue
+            increase = result[metric] - old[metric]
+            if increase > ABSOLUTE_FLOORS[metric] and increase > threshold * old[metric]:
+                label = ":".join([result["job"], *result["args"]])
+                regressions.append(f"{label} {metric}: {old[metric]} -> {result[metric]}")
+    return regressions
+
+
+def print_results(results):
+    """Print a table of the benchmark results."""
+    print(f"{'job':<36} {'status':<10} {'wall':>7} {'cpu':>7} {'rss MB':>7} {'reqs':>5} {'bytes':>10} {'png':>9}")
+    for result in results:
+        label = ":".join([result["job"], *result["args"]])
+        print(
+            f"{label[:36]:<36} {result['status']:<10} {result['wall_time']:>7.2f} {result['cpu_time']:>7.2f} "
+            f"{result['peak_rss'] / 1024 / 1024:>7.1f} {result['request_count']:>5} {result['bytes']:>10} {result['png_bytes']:>9}"
+        )
+
+
+def main():
+    """Parse the arguments, run the benchmarks and check for regressions."""
+    # pylint: disable=import-outside-toplevel
+    import runner
+
+    parser = argparse.ArgumentParser(description="Benchmark every scheduled job against a fake data provider and a local SMTP server.")
+    parser.add_argument("jobs", nargs="*", help='job specs ("name" or "name:arg1:arg2"); every scheduled job by default')
+    parser.add_argument("--repeat", type=int, default=3, help="runs per job, the median is reported")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the fake data and of the random picks of the jobs")
+    parser.add_argument("--history", default=HISTORY_FILE, help="JSON file the results are appended to")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative increase of a metric that counts as a regression")
+    parser.add_argument("--no-save", action="store_true", help="do not append the results to the history")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the INFO logs of the jobs")
+    args = parser.parse_args()
+
+    runner.setup_logging(args.verbose)
+    try:
+        runs = [runner.parse_job_spec(spec) for spec in args.jobs] if args.jobs else runner.scheduled_runs()
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = []
+    with LocalSMTPServer() as server:
+        for name, job_args in runs:
+            print(f"Benchmarking {':'.join([name, *job_args])}", file=sys.stderr)
+            results.append(bench_job(name, job_args, server, args.repeat, args.seed, args.verbose))
+    print_results(results)
+    for result in results:
+        for violation in result["budget_violations"]:
+            print(f"OVER BUDGET {violation}")
+
+    history = load_history(args.history)
+    regressions = find_regressions(history[-1], results, args.threshold) if history else []
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not args.no_save:
+        history.append({"timestamp": datetime.now().isoformat(timespec="seconds"), "commit": git_commit(), "repeat": args.repeat, "seed": args.seed, "jobs": results})
+        with open(args.history, "w", encoding="utf-8") as file:
+            json.dump(history, file, ensure_ascii=False, indent=2)
+    sys.exit(1 if regressions or any(result["status"] != "ok" for result in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+BIST30 Correlation Script.
+
+This script updates the rolling correlations of the BIST30 stocks and their beta to
+BIST100 (src/lib/correlation.py), renders the correlation matrix as a heatmap, and
+sends an email with the highest and lowest betas.
+"""
+
+import logging
+from io import BytesIO
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from src.email_utils import send_email
+from src.lib.correlation import refresh
+
+logger = logging.getLogger(__name__)
+
+TOP = 5
+
+
+def _label(symbol):
+    return symbol.replace(".IS", "")
+
+
+def plot_heatmap(correlation, labels, sessions):
+    """
+    Render a correlation matrix as a heatmap.
+
+    Args:
+        correlation (numpy.ndarray): Correlation matrix.
+        labels (list): Label of every row and column.
+        sessions (int): Sessions the correlations are computed over, for the title.
+
+    Returns:
+        BytesIO: A buffer containing the heatmap image.
+    """
+    fig = Figure(figsize=(12, 10))
+    ax = fig.add_subplot()
+    image = ax.imshow(correlation, cmap="RdYlGn", vmin=-1, vmax=1)
+    ax.set_xticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=90, fontsize=8)
+    ax.set_yticks(range(len(labels)))
+    ax.set_yticklabels(labels, fontsize=8)
+    ax.set_title(f"BIST30 Korelasyon Matrisi - Son {sessions} İşlem Günü")
+    fig.colorbar(image, ax=ax, fraction=0.046, pad=0.04)
+    fig.tight_layout()
+
+    image_stream = BytesIO()
+    fig.savefig(image_stream, format="png")
+    image_stream.seek(0)
+    return image_stream
+
+
+def format_report(correlation, betas, labels, sessions):
+    """
+    Build the email body of the correlations and betas.
+
+    Args:
+        correlation (numpy.ndarray): Correlation matrix, the benchmark last.
+        betas (numpy.ndarray): Beta of every symbol to the benchmark, the benchmark last.
+        labels (list): Label of every symbol.
+        sessions (int): Sessions the correlations are computed over.
+
+    Returns:
+        str: The body.
+    """
+    stocks = len(labels) - 1
+    pairs = correlation[:stocks, :stocks][np.triu_indices(stocks, k=1)]
+    order = [i for i in np.argsort(betas[:stocks])[::-1] if np.isfinite(betas[i])]
+    lines = [f"🔴 BIST30 Korelasyon ve Beta Analizi (Son {sessions} İşlem Günü) 👇", ""]
+    lines.append(f"🔗 Ortalama Korelasyon: {np.nanmean(pairs):.2f}")
+    lines.append("")
+    lines.append("📈 En Yüksek Beta (BIST100'e Göre):")
+    lines.extend(f"#{labels[i]}: {betas[i]:.2f} (Korelasyon: {correlation[i, -1]:.2f})" for i in order[:TOP])
+    lines.append("")
+    lines.append("📉 En Düşük Beta (BIST100'e Göre):")
+    lines.extend(f"#{labels[i]}: {betas[i]:.2f} (Korelasyon: {correlation[i, -1]:.2f})" for i in order[::-1][:TOP])
+    return "\n".join(lines)
+
+
+def bist30_correlation():
+    """Update the rolling correlations and betas of the BIST30 stocks and send an email report."""
+    try:
+        logger.start("Running bist30_correlation")
+        saved = refresh()
+        if saved is None:
+            logger.error("No correlation state to report")
+            return
+        state = saved["state"]
+        correlation, betas = state.correlation(), state.betas()
+        if correlation is None or betas is None:
+            logger.error(f"Not enough sessions for the correlations: {state.filled}")
+            return
+        labels = [_label(symbol) for symbol in saved["symbols"]]
+
+        image_stream = plot_heatmap(correlation, labels, state.filled)
+        subject = "BIST30 Korelasyon ve Beta Analizi #bist30_correlation"
+        body = format_report(correlation, betas, labels, state.filled)
+        send_email(subject, body, image_stream)
+        logger.ok("bist30_correlation worked successfully.")
+    except Exception as e:
+        logger.error(f"Unexpected error in bist30_correlation: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    bist30_correlation()
@@ -1,13 +1,13 @@
 """
-This module provides functions for fetching and sharing current price and change of BIST30 stocks picked randomly.
+This module provides functions for fetching and sharing current price and change of BIST30 stocks taken in rotation.
 
 It uses the yfinance library to fetch market data and a custom email utility to send the information.
 """
 
-import random
 import yfinance as yf
 from src.email_utils import send_email
-from src.lib.constants import bist30_stocks
+from src.lib.indicators import stock_signals
+from src.lib.rotation import next_pick
 from src.lib.utils import get_stock_emoji_and_text
 import logging
 
@@ -43,7 +43,7 @@ def get_stock_change(stock):
 def bist30_change():
     """Calculate and print the current change and current price of BIST30 stock today."""
     logger.start("Running bist30_change")
-    chosen_stock = random.choice(bist30_stocks)
+    chosen_stock = next_pick("bist30_change")
     stock_code = chosen_stock + ".IS"
     logger.info(f"Chosen stock: {chosen_stock} ({stock_code})")
     
@@ -54,17 +54,19 @@ def bist30_change():
         return
     
     emo, text = get_stock_emoji_and_text(change)
+    signals = stock_signals(stock_code, price)
+    if signals:
+        signals = f"{signals}\n\n"
     subject = "send_bist30_stock #bist30_change"
     body = f"""🔴 #{chosen_stock} bugün %{change} {text}
 
 {emo} Anlık Fiyatı: {price}
 
-#yatırım #borsa #hisse #ekonomi #bist #bist100 #türkiye #faiz #enflasyon #endeks #finans #para #şirket
+{signals}#yatırım #borsa #hisse #ekonomi #bist #bist100 #türkiye #faiz #enflasyon #endeks #finans #para #şirket
     """
     
     logger.info("Email body prepared for sending.")
     
-    # print(body)
     send_email(subject, body)
     
     logger.ok("bist30_change worked successfully.")
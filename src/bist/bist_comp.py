@@ -65,6 +65,7 @@ def plot_comparison(xu30_data: yf.Ticker, xu100_data: yf.Ticker) -> BytesIO:
 
         image_stream = BytesIO()
         plt.savefig(image_stream, format="png")
+        plt.close()
         image_stream.seek(0)
         logger.info("Comparison plot generated successfully.")
         return image_stream
@@ -118,7 +119,6 @@ def bist_comp():
         
         # Send the email without additional logging
         send_email(subject, body, image_stream)
-        # print(body)
         
         logger.ok("bist_comp worked successfully.")
     except Exception as e:
@@ -3,43 +3,46 @@ This module provides functions to fetch and send BIST100 (Istanbul Stock Exchang
 
 It uses the yfinance library to fetch stock data and the matplotlib library to generate a 7-day graph.
 """
-from datetime import datetime, timedelta
-import yfinance as yf
-from io import BytesIO
-from matplotlib import pyplot as plt
 from src.email_utils import send_email
+from src.lib.intraday import intraday_store
+from src.lib.quotes import get_close, get_open
+from src.lib.render_ahead import ChartSpec, build_chart, prepare, render, save_chart
 from src.lib.utils import get_date, get_turkish_month, get_stock_emoji_and_text
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def generate_bist_graph():
-    """Generate a 7-day graph with 3-hour intervals for BIST100 Stock Exchange."""
+BIST_CHART = ChartSpec(title="BIST 100 7 Günlük Grafik", ylabel="Fiyat (TL)", xlabel="Tarih", step="h")
+
+
+def fetch_bist_history():
+    """Fetch 7 days of BIST100 prices with 1-hour intervals, downloading only the new 15-minute bars."""
+    return intraday_store("XU100.IS").series()
+
+
+def prepare_bist_graph():
+    """Render the 7-day graph of BIST100 ahead of send_bist_close."""
+    try:
+        prepare("bist100", BIST_CHART, fetch_bist_history())
+    except Exception as e:
+        logger.error(f"Failed to render the BIST graph ahead: {e}")
+
+
+def generate_bist_graph(latest_price=None):
+    """
+    Generate a 7-day graph with 1-hour intervals for BIST100 Stock Exchange.
+
+    Args:
+        latest_price (float, optional): Latest price, drawn as the final point. The graph
+            rendered ahead by prepare_bist_graph() is only used with it.
+    """
     try:
         logger.info("Generating 7-day graph for BIST100.")
-        end_date = datetime.today().strftime("%Y-%m-%d")
-        start_date = (datetime.today() - timedelta(days=7)).strftime("%Y-%m-%d")
-        stock_data = yf.download("XU100.IS", start=start_date, end=end_date, interval="15m")
-
-        # Resample data to 3-hour intervals and interpolate missing values
-        stock_data_3h = stock_data["Close"].resample("1h").mean().interpolate(method="time")
-
-        # Plotting the graph
-        plt.figure(figsize=(12, 6))
-        plt.plot(stock_data_3h.index, stock_data_3h.values, linestyle="-")
-        plt.title("BIST 100 7 Günlük Grafik")
-        plt.xlabel("Tarih")
-        plt.ylabel("Fiyat (TL)")
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        # Save the plot
-        image_stream = BytesIO()
-        plt.savefig(image_stream, format="png")
-        # plt.show()
-        image_stream.seek(0)
+        if latest_price is None:
+            image_stream = save_chart(build_chart(BIST_CHART, fetch_bist_history()))
+        else:
+            image_stream = render("bist100", BIST_CHART, fetch_bist_history, lambda: (get_date(), latest_price))
         logger.info("7-day graph generated successfully.")
         return image_stream
     except Exception as e:
@@ -51,11 +54,7 @@ def get_bist_open():
     """Fetch the change of BIST100 between previous close and opening."""
     try:
         logger.info("Fetching BIST100 opening data.")
-        xu100 = yf.Ticker("XU100.IS")
-        xu100_open = xu100.info.get("open", 0)
-        xu100_last_close = xu100.info.get("previousClose", 0)
-        if xu100_open == 0 or xu100_last_close == 0:
-            raise ValueError("Missing opening or previous close data.")
+        xu100_open, xu100_last_close = get_open("XU100.IS")
         xu100_change = ((xu100_open - xu100_last_close) / xu100_last_close) * 100
         logger.info(f"BIST100 opening data retrieved: Open: {xu100_open}, Change: {xu100_change}%")
         return round(xu100_open, 2), round(xu100_change, 2)
@@ -82,8 +81,7 @@ def send_bist_open():
         image = generate_bist_graph()
 
         # Send email without additional logging
-        # send_email(subject, body, image)
-        print(body)
+        send_email(subject, body, image, sink="stdout")
         logger.ok("send_bist_open worked successfully.")
     except Exception as e:
         logger.error(f"Failed to run send_bist_open: {e}")
@@ -94,10 +92,7 @@ def get_bist_close():
     """Fetch the current value and previous close value of the exchange and calculate daily change rate."""
     try:
         logger.info("Fetching BIST100 closing data.")
-        xu100 = yf.Ticker("XU100.IS")
-        xu100_data = xu100.history(period="max")
-        xu100_current = xu100_data["Close"][-1]
-        xu100_prev = xu100_data["Close"][-2]
+        xu100_current, xu100_prev = get_close("XU100.IS")
         xu100_current_change = ((xu100_current - xu100_prev) / xu100_prev) * 100
         logger.info(f"BIST100 closing data retrieved: Current: {xu100_current}, Change: {xu100_current_change}%")
         return round(xu100_current, 2), round(xu100_current_change, 2)
@@ -121,10 +116,9 @@ def send_bist_close():
 
 {emo} Kapanış Fiyatı: {bist_close}
         """
-        image = generate_bist_graph()
+        image = generate_bist_graph(bist_close)
 
         send_email(subject, body, image)
-        # print(body)
         logger.ok("send_bist_close worked successfully.")
     except Exception as e:
         logger.error(f"Failed to run send_bist_close: {e}")
@@ -1,79 +1,57 @@
 """
-This module provides functionality to fetch and send performance data of random sectors from the Borsa İstanbul (BIST).
+This module provides functionality to send the daily performance of the sectors of Borsa İstanbul (BIST).
 
-It uses the yfinance library to retrieve daily sector performance information and generates a formatted email containing the sector names, their performance percentage changes, and emojis representing the stock's movement.
+The performance of every sector in stocks_by_sector is aggregated from its constituents
+(see src/lib/sectors.py) and formatted into an email with the equal-weight and
+cap-weight changes, the advancers and decliners, and emojis representing the movement.
 """
 
-import random
-import yfinance as yf
 from src.email_utils import send_email
-from src.lib.constants import endeksler
+from src.lib.sectors import SECTOR_INDICES, sector_performance
 from src.lib.utils import get_date, get_turkish_month, get_stock_emoji_and_text
 import logging
 
 # Use pre-configured logger
 logger = logging.getLogger(__name__)
 
-def fetch_sector_data(index):
+
+def format_sector(item):
     """
-    Fetch the daily performance data for a given Borsa İstanbul sector index.
+    Format the line of a sector in the report.
 
     Args:
-        index (str): The sector index code.
+        item (SectorPerformance): Performance of the sector.
 
     Returns:
-        tuple: (long_name, current_price, change, emoji, text)
-               Returns information about the sector and its performance.
-               If data is unavailable or an error occurs, returns None.
+        str: The line, with a note when no constituent has a change.
     """
-    try:
-        logger.info(f"Fetching data for sector index: {index}")
-        stock_code = index + ".IS"
-        endeks = yf.Ticker(stock_code)
-        endeks_data = endeks.history(period="1d")
-
-        if len(endeks_data) >= 1:
-            current = endeks_data["Close"].iloc[-1]
-            open_price = endeks_data["Open"].iloc[-1]
-            change = ((current - open_price) / open_price) * 100
-            change = round(change, 2)
-            long_name = endeks.info.get("longName", "Bilgi Yok")
-            emo, text = get_stock_emoji_and_text(change)
-            logger.info(f"Data fetched successfully for sector: {index}")
-            return long_name, change, emo, text
-        else:
-            logger.warning(f"No sufficient data for {index}")
-            return None
-
-    except Exception as error:
-        logger.error(f"Error fetching data for {index}: {str(error)}")
-        return None
+    tag = SECTOR_INDICES.get(item.sector, item.sector.replace(" ", ""))
+    if item.equal_weight is None:
+        return f"🔍 #{tag} {item.sector} Yeterli veri yok\n"
+    emo, text = get_stock_emoji_and_text(item.equal_weight)
+    line = f"{emo} #{tag} {item.sector} %{item.equal_weight} {text}"
+    if item.cap_weight is not None:
+        line += f" (piyasa değeri ağırlıklı %{item.cap_weight})"
+    return line + f", {item.advancers} hisse yükseldi, {item.decliners} hisse düştü.\n"
 
 
 def bist_sector_info():
-    """Generate and sends an email report on the performance of random sectors in Borsa İstanbul."""
+    """Generate and send an email report on the performance of every sector in Borsa İstanbul."""
     try:
         logger.start("Running bist_sector_info")
         today_date = get_date()
         day = today_date.strftime("%d")
         day = day[1:] if day.startswith("0") else day
         month = get_turkish_month(today_date.strftime("%B"))
-        random_sectors = random.sample(endeksler, 5)  # Fetch 5 random sectors
         subject = "sektor_hisse_bilgi"
-        body = f"""🔴 {day} {month} Borsa İstanbul Endekslerinin Performansları 👇\n\n"""
+        body = f"""🔴 {day} {month} Borsa İstanbul Sektörlerinin Performansları 👇\n\n"""
 
-        for index in random_sectors:
-            sector_info = fetch_sector_data(index)
-            if sector_info:
-                long_name, change, emo, text = sector_info
-                body += f"{emo} #{index} {long_name} %{change} {text}.\n"
-            else:
-                body += f"🔍 #{index} Yeterli veri yok veya veri alınırken hata\n"
+        for item in sector_performance():
+            body += format_sector(item)
 
         body += "\n#yatırım #borsa #hisse #ekonomi #bist #bist100 #türkiye #faiz #enflasyon #endeks #finans #para #şirket"
 
-        # send_email(subject, body)
-        print(body)
+        send_email(subject, body, sink="stdout")
         logger.ok("bist_sector_info worked successfully")
     
     except Exception as e:
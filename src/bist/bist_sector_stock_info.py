@@ -4,11 +4,11 @@ This module provides functionality to fetch and send performance data for stocks
 It utilizes the yfinance library to retrieve stock performance information and generates a formatted email report.
 """
 
-import random
 import yfinance as yf
 from src.email_utils import send_email
 from src.lib.utils import get_stock_emoji_and_text
 from src.lib.constants import stocks_by_sector
+from src.lib.eligibility import Requirement, sample
 import logging
 
 logger = logging.getLogger(__name__)
@@ -84,7 +84,8 @@ def bist_sector_stock_info(day):
 
         subject = "sektor_hisse_bilgi #crypto ##crypto"
         body = f"🔴 {sector} Hisselerinin 5 Günlük Performansları 👇 \n\n"
-        random_stocks = random.sample(stocks_by_sector[sector], 8)
+        # The 5-day change needs 6 bars
+        random_stocks = sample(stocks_by_sector[sector], 8, Requirement(min_rows=6), suffix=".IS")
 
         for stock in random_stocks:
             stock_code = f"{stock}.IS"
@@ -105,7 +106,6 @@ def bist_sector_stock_info(day):
         body += "\n#yatırım #borsa #hisse #ekonomi #bist #bist100 #türkiye #faiz #enflasyon #endeks #finans #para #şirket"
 
         send_email(subject, body)
-        # print(body)
         logger.ok(f"bist_sector_stock_info worked successfully")
 
     except Exception as e:
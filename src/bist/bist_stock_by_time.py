@@ -1,18 +1,17 @@
 """
-This module generates a performance report for a randomly chosen stock from Borsa İstanbul (BIST).
+This module generates a performance report for a stock from Borsa İstanbul (BIST), taken in rotation.
 
 It retrieves historical data for the stock using the yfinance library and generates a graph of its
 price history, as well as calculating percentage changes over specified time periods. The results
 are then formatted into a message that can be sent via email.
 """
 
-import random
 import logging
-from io import BytesIO
-import matplotlib.pyplot as plt
 import yfinance as yf
 from src.email_utils import send_email
-from src.lib.constants import bist_all
+from src.lib.indicators import stock_signals
+from src.lib.render_ahead import ChartSpec, prepare, render
+from src.lib.rotation import next_pick, upcoming_symbols
 from src.lib.utils import get_stock_emoji_and_text
 from src.lib.utils import get_turkish_month
 
@@ -21,13 +20,13 @@ logger = logging.getLogger(__name__)
 
 def initialize_stock_data():
     """
-    Initialize the stock data by randomly selecting a stock and retrieving its historical data.
+    Initialize the stock data by taking the next stock of the rotation and retrieving its historical data.
 
     Returns:
         tuple: Contains the chosen stock, stock code, historical data, and the stock information.
     """
     try:
-        chosen_stock = random.choice(bist_all)
+        chosen_stock = next_pick("bist_stock_by_time")
         stock_code = chosen_stock + ".IS"
         chosen_stock_info = yf.Ticker(stock_code)
 
@@ -44,33 +43,37 @@ def initialize_stock_data():
         raise  # Re-raise the exception to halt execution
 
 
-def generate_stock_graph(stock, hist_data):
+def stock_chart(stock):
+    """Return the look of the chart of a stock."""
+    return ChartSpec(title=f"{stock} Hisse Senedi Grafiği", ylabel="Fiyat", label="Son Fiyat")
+
+
+def prepare_bist_stock_graph():
+    """Render the chart of the next stock of the rotation ahead of bist_stock_by_time."""
+    try:
+        for stock_code in upcoming_symbols("bist_stock_by_time"):
+            stock = stock_code.removesuffix(".IS")
+            hist_data = yf.Ticker(stock_code).history(period="1y")
+            prepare(f"bist_stock:{stock}", stock_chart(stock), hist_data["Close"])
+    except Exception as e:
+        logger.error(f"Error rendering the stock graph ahead: {e}")
+
+
+def generate_stock_graph(stock, hist_data, current_price=None):
     """
     Generate a line graph of the historical closing prices for the specified stock.
 
     Args:
         stock (str): The stock code to generate the graph for.
         hist_data (DataFrame): Historical data of the stock.
+        current_price (float, optional): Current price, drawn as the final point.
 
     Returns:
         BytesIO: A BytesIO object containing the PNG image of the graph.
     """
     try:
-        # Plot historical prices
-        plt.figure(figsize=(12, 6))
-        plt.plot(hist_data["Close"], label="Son Fiyat")
-        plt.title(f"{stock} Hisse Senedi Grafiği")
-        plt.xlabel("")
-        plt.ylabel("Fiyat")
-        plt.grid(True)
-        plt.legend()
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        # Save the plot as a BytesIO object
-        image = BytesIO()
-        plt.savefig(image, format="png")  # Save the plot as PNG image to the BytesIO object
-        plt.close()  # Close the plot to free memory
+        fetch_latest = (lambda: (hist_data.index[-1], current_price)) if isinstance(current_price, (int, float)) and current_price else None
+        image = render(f"bist_stock:{stock}", stock_chart(stock), lambda: hist_data["Close"], fetch_latest)
         logger.info("Stock graph generated successfully.")
         return image
 
@@ -144,11 +147,16 @@ def bist_stock_by_time():
 
     # Generate the stock graph
     try:
-        image = generate_stock_graph(chosen_stock, hist_data)
+        image = generate_stock_graph(chosen_stock, hist_data, today)
     except Exception as e:
         logger.error(f"Failed to generate stock graph: {e}")
         return  # Exit if the graph generation fails
 
+    # Technical signals, left out when they cannot be computed
+    signals = stock_signals(chosen_stock + ".IS", today, hist_data)
+    if signals:
+        signals = f"\n{signals}\n"
+
     # Construct the message
     try:
         body = f"""🔴 #{chosen_stock} Hissesinin Zamana Bağlı Performansı 👇
@@ -158,14 +166,13 @@ def bist_stock_by_time():
 {get_stock_emoji_and_text(day_5_change_percent, "emoji")} {day_5_day} {turkish_day_5} {day_5_year} tarihinden beri %{day_5_change_percent} {get_stock_emoji_and_text(day_5_change_percent, "text")}.
 {get_stock_emoji_and_text(month_1_change_percent, "emoji")} {month_1_day} {turkish_month_1} {month_1_year} tarihinden beri %{month_1_change_percent} {get_stock_emoji_and_text(month_1_change_percent, "text")}.
 {get_stock_emoji_and_text(month_6_change_percent, "emoji")} {month_6_day} {turkish_month_6} {month_6_year} tarihinden beri %{month_6_change_percent} {get_stock_emoji_and_text(month_6_change_percent, "text")}.
-
+{signals}
 #yatırım #borsa #hisse #ekonomi #bist #bist100 #türkiye #faiz #enflasyon #endeks #finans #para #şirket
           """
         subject = "bist_by_time #bist_stock_by_time"
 
         # Send the email
         send_email(subject, body, image)
-        # print(body)
         logger.ok("bist_stock_by_time worked successfully")
 
     except Exception as e:
@@ -79,8 +79,7 @@ def halka_arz():
         logger.info(f"Appended performance data for {stock}: {message.strip()}")
 
     try:
-        # send_email(subject, body)
-        print(body)
+        send_email(subject, body, sink="stdout")
         logger.ok("halka_arz worked successfully")
     except Exception as e:
         logger.error(f"Failed to send email: {e}")
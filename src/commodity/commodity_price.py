@@ -2,11 +2,12 @@
 
 import logging
 from datetime import datetime, timedelta
-from io import BytesIO
 
 import yfinance as yf
-from matplotlib import pyplot as plt
 from src.email_utils import send_email
+from src.lib.render_ahead import ChartSpec, prepare, render
+from src.lib.seasonality import seasonality_section
+from src.lib.window_stats import symbol_stats
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -30,56 +31,107 @@ def get_commodity_info(ticker, display_name):
     """
     Fetch and format commodity information.
 
+    The price and the 52-week high and low come from the window stats of the daily
+    bars (src/lib/window_stats.py), so only the bars since the last report are fetched.
+    The seasonality of the current and the next month is read from src/lib/seasonality.py.
+
     Args:
         ticker (str): The commodity ticker symbol.
         display_name (str): The display name of the commodity.
 
     Returns:
-        tuple: A tuple containing commodity info and formatted email body.
+        tuple: A tuple containing the commodity stats and formatted email body.
     """
     try:
         logger.info(f"Fetching information for {display_name} with ticker {ticker}")
-        commodity = yf.Ticker(ticker)
-        commodity_info = commodity.info
-        currency = commodity_info.get("financialCurrency", "USD")
+        stats = symbol_stats(ticker)
+        if stats is None:
+            raise ValueError(f"No daily bars for {ticker}")
+        # Commodity futures are quoted in dollars
+        currency = "USD"
         email_body = f"🔴 {display_name} güncel ve uzun dönemli performansı 👇\n\n"
-        current_price = commodity_info.get(
-            "regularMarketPrice",
-            (commodity_info.get("open", 0) + commodity_info.get("dayHigh", 0)) / 2,
-        )
-        email_body += f"▪️ Anlık Fiyat: {format_currency(current_price, currency)}\n"
-        email_body += f"▪️ 52 Haftalık En Yüksek Değer: {format_currency(commodity_info.get('fiftyTwoWeekHigh', 0), currency)}\n"
-        email_body += f"▪️ 52 Haftalık En Düşük Değer: {format_currency(commodity_info.get('fiftyTwoWeekLow', 0), currency)}\n"
+        email_body += f"▪️ Anlık Fiyat: {format_currency(stats.price, currency)}\n"
+        email_body += f"▪️ 52 Haftalık En Yüksek Değer: {format_currency(stats.high, currency)}\n"
+        email_body += f"▪️ 52 Haftalık En Düşük Değer: {format_currency(stats.low, currency)}\n"
+        # Monthly seasonality saved by refresh_seasonality, no fetch
+        seasonality = seasonality_section(ticker)
+        if seasonality:
+            email_body += f"\n{seasonality}\n"
         logger.info(f"Information for {display_name} fetched successfully")
-        return commodity_info, email_body
+        return stats, email_body
     except Exception as e:
         logger.error(f"Error fetching commodity information for {display_name}: {e}")
         return None, None
 
-def plot_commodity_prices(historical_data, display_name):
+def commodity_chart(display_name):
+    """Return the look of the chart of a commodity."""
+    return ChartSpec(title=f"{display_name} Değişim Grafiği", ylabel="Fiyat Dolar")
+
+def fetch_commodity_history(ticker):
+    """
+    Fetch the closing prices of a commodity over the last year.
+
+    Args:
+        ticker (str): The commodity ticker symbol.
+
+    Returns:
+        pandas.Series: Closing prices, empty when there is no data.
+    """
+    historical_data = yf.download(
+        ticker,
+        start=(datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d"),
+        end=datetime.now().strftime("%Y-%m-%d"),
+    )
+    return historical_data["Close"]
+
+def prepare_commodity_chart(ticker, display_name):
+    """
+    Render the chart of a commodity ahead of commodity_price.
+
+    Args:
+        ticker (str): The commodity ticker symbol.
+        display_name (str): The display name of the commodity.
+    """
+    try:
+        historical_data = fetch_commodity_history(ticker)
+        if historical_data.empty:
+            logger.warning(f"No historical data found for {display_name}, nothing to render ahead.")
+            return
+        prepare(f"commodity:{ticker}", commodity_chart(display_name), historical_data)
+    except Exception as e:
+        logger.error(f"Error rendering the chart of {display_name} ahead: {e}")
+
+def plot_commodity_prices(ticker, display_name, current_price=None):
     """
     Plot commodity prices and return the image as a BytesIO object.
 
     Args:
-        historical_data (pandas.DataFrame): Historical price data.
+        ticker (str): The commodity ticker symbol.
         display_name (str): The display name of the commodity.
+        current_price (float, optional): Latest price, drawn as the final point.
 
     Returns:
-        BytesIO: An in-memory bytes buffer containing the plot image.
+        BytesIO: An in-memory bytes buffer containing the plot image, None when there
+        is no historical data.
     """
     try:
         logger.info(f"Generating plot for {display_name}")
-        plt.figure(figsize=(12, 6))
-        plt.plot(historical_data["Close"])
-        plt.title(f"{display_name} Değişim Grafiği")
-        plt.ylabel("Fiyat Dolar")
-        plt.xticks(rotation=45)
-        plt.grid(True)
-        plt.tight_layout()
-        image_stream = BytesIO()
-        plt.savefig(image_stream, format="png")
-        plt.close()
-        image_stream.seek(0)
+        historical_data = None
+
+        def fetch_series():
+            nonlocal historical_data
+            logger.info(f"Fetching historical data for {display_name}")
+            historical_data = fetch_commodity_history(ticker)
+            return historical_data
+
+        def fetch_latest():
+            return datetime.now(), float(current_price)
+
+        latest = fetch_latest if isinstance(current_price, (int, float)) and current_price else None
+        image_stream = render(f"commodity:{ticker}", commodity_chart(display_name), fetch_series, latest)
+        if historical_data is not None and historical_data.empty:
+            logger.warning(f"No historical data found for {display_name}. Skipping plot generation.")
+            return None
         logger.info(f"Plot for {display_name} generated successfully")
         return image_stream
     except Exception as e:
@@ -98,24 +150,13 @@ def commodity_price(ticker, display_name):
         logger.start(f"Starting report for {display_name}")
         
         # Fetch commodity info
-        commodity_info, email_body = get_commodity_info(ticker, display_name)
-        if commodity_info is None:
+        stats, email_body = get_commodity_info(ticker, display_name)
+        if stats is None:
             logger.error(f"Failed to fetch data for {display_name}. Exiting function.")
             return
 
-        # Fetch historical data
-        logger.info(f"Fetching historical data for {display_name}")
-        historical_data = yf.download(
-            ticker,
-            start=(datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d"),
-            end=datetime.now().strftime("%Y-%m-%d"),
-        )
-        if historical_data.empty:
-            logger.warning(f"No historical data found for {display_name}. Skipping plot generation.")
-            return
-
-        # Generate and send the plot
-        image_stream = plot_commodity_prices(historical_data, display_name)
+        # Generate the plot, patching the current price into the chart rendered ahead
+        image_stream = plot_commodity_prices(ticker, display_name, stats.price)
         if image_stream is None:
             logger.error(f"Failed to generate plot for {display_name}. Exiting function.")
             return
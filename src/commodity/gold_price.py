@@ -6,14 +6,13 @@ It uses the CollectAPI for current gold prices and yfinance for historical data.
 
 import http.client
 import json
-from io import BytesIO
 from datetime import datetime
 
 import pytz
-import matplotlib.pyplot as plt
 import yfinance as yf
 
 from src.email_utils import send_email
+from src.lib.render_ahead import ChartSpec, prepare, render
 from src.lib.utils import get_turkish_month
 import logging
 
@@ -42,26 +41,28 @@ def fetch_gold_data():
     finally:
         conn.close()
 
+GOLD_CHART = ChartSpec(title="Ons Altın Grafiği", ylabel="Fiyat Dolar", label="Son Fiyat")
+
+def fetch_gold_history():
+    """Fetch the closing prices of gold over the last year."""
+    return yf.Ticker("GC=F").history(period="1y")["Close"]
+
+def fetch_gold_latest():
+    """Fetch the latest gold price as a (time, price) point."""
+    hist_data = yf.Ticker("GC=F").history(period="1d")
+    return hist_data.index[-1], float(hist_data["Close"].iloc[-1])
+
+def prepare_gold_chart():
+    """Render the gold chart ahead of gold_price."""
+    try:
+        prepare("gold", GOLD_CHART, fetch_gold_history())
+    except Exception as e:
+        logger.error(f"Error rendering the gold chart ahead: {e}")
+
 def create_gold_chart():
     """Create a chart of historical gold prices."""
     try:
-        gold = yf.Ticker("GC=F")
-        hist_data = gold.history(period="1y")
-
-        plt.figure(figsize=(12, 6))
-        plt.plot(hist_data["Close"], label="Son Fiyat")
-        plt.legend()
-        plt.title("Ons Altın Grafiği")
-        plt.ylabel("Fiyat Dolar")
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        image_stream = BytesIO()
-        plt.savefig(image_stream, format="png")
-        plt.close()  # Close the plot to release memory
-        image_stream.seek(0)
-        return image_stream
+        return render("gold", GOLD_CHART, fetch_gold_history, fetch_gold_latest)
     except Exception as e:
         logger.error(f"Error creating gold chart: {e}")
         return None
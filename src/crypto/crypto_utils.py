@@ -1,36 +1,38 @@
 """Utility functions for fetching and processing cryptocurrency data."""
 
 import logging
+from datetime import datetime, timezone
 from io import BytesIO
 from typing import Dict, List, Optional, Tuple
 
-import matplotlib.pyplot as plt
 import requests
 import yfinance as yf
 
 from src.email_utils import send_email
+from src.lib.render_ahead import ChartSpec, prepare, render
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-def plot_bitcoin_graph() -> Optional[BytesIO]:
+BITCOIN_CHART = ChartSpec(title="Bitcoin Aylık Grafik", ylabel="Dolar", label="Son Fiyat", figsize=(10, 5))
+
+def fetch_bitcoin_history():
+    """Fetch the closing prices of Bitcoin over the last month."""
+    return yf.Ticker("BTC-USD").history(period="1mo")["Close"]
+
+def prepare_bitcoin_graph() -> None:
+    """Render the Bitcoin graph ahead of crypto_send."""
+    try:
+        prepare("bitcoin", BITCOIN_CHART, fetch_bitcoin_history())
+    except Exception as e:
+        logger.error(f"Failed to render the Bitcoin graph ahead: {e}")
+
+def plot_bitcoin_graph(latest_price: Optional[float] = None) -> Optional[BytesIO]:
     """Generate a monthly Bitcoin price graph and return it as a BytesIO object."""
     try:
         logger.info("Generating Bitcoin monthly price graph.")
-        btc = yf.Ticker("BTC-USD")
-        btc_data = btc.history(period="1mo")
-        plt.figure(figsize=(10, 5))
-        plt.plot(btc_data["Close"], label="Son Fiyat")
-        plt.title("Bitcoin Aylık Grafik")
-        plt.ylabel("Dolar")
-        plt.legend()
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        image_buffer = BytesIO()
-        plt.savefig(image_buffer, format="png")
-        plt.close()
-        image_buffer.seek(0)
+        fetch_latest = (lambda: (datetime.now(timezone.utc), latest_price)) if latest_price else None
+        image_buffer = render("bitcoin", BITCOIN_CHART, fetch_bitcoin_history, fetch_latest)
         logger.info("Bitcoin graph generated successfully.")
         return image_buffer
     except Exception as e:
@@ -78,13 +80,15 @@ def crypto_send() -> None:
     }
 
     body = "🚀 Anlık Kripto Verileri 🚀\n"
+    prices: Dict[str, float] = {}
 
     for crypto, urls in cryptos.items():
         logger.info(f"Processing data for {crypto}")
         try:
             price, market_cap = map(get_crypto_price, urls)
             if price and market_cap:
-                formatted_price = format_price(float(price))
+                prices[crypto] = float(price)
+                formatted_price = format_price(prices[crypto])
                 formatted_market_cap = format_market_cap(float(market_cap))
                 body += f"\n🌟 #{crypto} Fiyatı: ${formatted_price}\n"
                 body += f"💰 #{crypto} Piyasa Değeri: {formatted_market_cap}\n"
@@ -96,7 +100,7 @@ def crypto_send() -> None:
             continue
 
     # Generate Bitcoin graph
-    image_stream = plot_bitcoin_graph()
+    image_stream = plot_bitcoin_graph(prices.get("BTC"))
     if image_stream:
         try:
             send_email("Anlık Kripto Verileri #crypto_send", body, image_stream)
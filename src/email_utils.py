@@ -1,20 +1,54 @@
-"""Utility module for sending emails with optional image attachments."""
+"""
+Utility module for sending emails with optional image attachments.
+
+Emails go to one of the sinks:
+- "smtp": sent through the SMTP server (default).
+- "file": written to OUTBOX_DIR as a text file, with the image next to it.
+- "stdout": printed, for dry runs.
+"""
 import os
+import re
 import ssl
+from datetime import datetime
 from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import smtplib
 import _ssl
 from dotenv import load_dotenv
+from src.lib.data_cache import stale_note
+from src.lib.stats import stage
 
 # Adding environment variables
 load_dotenv()
 EMAIL = os.getenv("EMAIL")
 PASSWORD = os.getenv("PASSWORD")
 RECEIVER = os.getenv("RECEIVER")
+SMTP_HOST = os.getenv("SMTP_HOST", "mail.kurumsaleposta.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") == "1"
+EMAIL_SINK = os.getenv("EMAIL_SINK", "smtp")
+OUTBOX_DIR = os.getenv("OUTBOX_DIR", "outbox")
+EMAIL_SINKS = ("smtp", "file", "stdout")
+
+_sink_override = None
 
-def send_email(subject: str, body: str, image_stream=None):
+def set_sink(sink):
+    """
+    Force every email to go to the given sink, regardless of the sink asked for by the job.
+
+    Args:
+        sink (str, optional): "smtp", "file" or "stdout"; None removes the override.
+
+    Raises:
+        ValueError: If the sink is unknown.
+    """
+    global _sink_override  # pylint: disable=global-statement
+    if sink is not None and sink not in EMAIL_SINKS:
+        raise ValueError(f"Unknown email sink: {sink}")
+    _sink_override = sink
+
+def send_email(subject: str, body: str, image_stream=None, sink=None):
     """
     Send an email with an optional image attachment.
     
@@ -22,7 +56,55 @@ def send_email(subject: str, body: str, image_stream=None):
         subject (str): The subject of the email.
         body (str): The body content of the email.
         image_stream (BytesIO, optional): A BytesIO stream containing the image data.
+        sink (str, optional): "smtp", "file" or "stdout"; defaults to EMAIL_SINK.
+            A sink forced with set_sink() takes precedence.
+
+    When the job had to use cached data because of its publish deadline, a note
+    saying so is added to the body.
         
+    Raises:
+        smtplib.SMTPException: If there's an error sending the email.
+    """
+    sink = _sink_override or sink or EMAIL_SINK
+    note = stale_note()
+    if note:
+        body = f"{body}\n\n{note}"
+    with stage("send"):
+        if sink == "stdout":
+            print_email(subject, body, image_stream)
+        elif sink == "file":
+            write_email(subject, body, image_stream)
+        else:
+            send_smtp_email(subject, body, image_stream)
+
+def print_email(subject: str, body: str, image_stream=None):
+    """Print an email instead of sending it."""
+    print(f"Subject: {subject}")
+    if image_stream:
+        print(f"Attachment: image.png ({len(image_stream.getvalue())} bytes)")
+    print(body)
+
+def write_email(subject: str, body: str, image_stream=None):
+    """
+    Write an email to OUTBOX_DIR instead of sending it.
+
+    Returns:
+        str: Path of the written text file.
+    """
+    os.makedirs(OUTBOX_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9_]+", "_", subject).strip("_")[:60]
+    base_path = os.path.join(OUTBOX_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{slug}")
+    with open(base_path + ".txt", "w", encoding="utf-8") as file:
+        file.write(f"Subject: {subject}\n\n{body}")
+    if image_stream:
+        with open(base_path + ".png", "wb") as file:
+            file.write(image_stream.getvalue())
+    return base_path + ".txt"
+
+def send_smtp_email(subject: str, body: str, image_stream=None):
+    """
+    Send an email through the SMTP server.
+
     Raises:
         smtplib.SMTPException: If there's an error sending the email.
     """
@@ -40,6 +122,13 @@ def send_email(subject: str, body: str, image_stream=None):
             image.add_header("Content-Disposition", "attachment", filename="image.png")
             msg.attach(image)
 
+        if not SMTP_SSL:
+            # Plain SMTP, e.g. the local stand-in server of the benchmarks
+            with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
+                server.login(EMAIL, PASSWORD)
+                server.send_message(msg)
+            return
+
         # Create SSL context with legacy renegotiation support
         context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
         context.options |= 0x4  # Enable legacy renegotiation (SSL_OP_LEGACY_SERVER_CONNECT)
@@ -52,8 +141,8 @@ def send_email(subject: str, body: str, image_stream=None):
         # Set up supported ciphers
         context.set_ciphers('DEFAULT@SECLEVEL=1')
 
-        # Connect using SMTP_SSL with port 465
-        with smtplib.SMTP_SSL("mail.kurumsaleposta.com", 465, context=context) as server:
+        # Connect using SMTP_SSL, port 465 by default
+        with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=context) as server:
             server.login(EMAIL, PASSWORD)
             server.send_message(msg)
             
@@ -1,41 +1,25 @@
 """
 Module for fetching currency data and sending email reports.
+
+The lira rates of every currency, the cross rates and the basket are derived from one
+download of the base rates, see src/lib/fx.py.
 """
 import logging
 from io import BytesIO
-import yfinance as yf
+import pandas as pd
 from matplotlib import pyplot as plt
 from src.email_utils import send_email
+from src.lib.fx import BASKET, CURRENCIES, basket_rate, cross_matrix, fetch_base_rates, try_rates, usd_values
 
 # Set up logging configuration
 logger = logging.getLogger(__name__)
 
-def get_currency_data(currency_pair: str) -> yf.Ticker.history:
-    """
-    Fetch the last 3 months of historical data for a given currency pair.
-
-    Args:
-        currency_pair (str): The currency pair to fetch data for (e.g., "USDTRY=X").
-
-    Returns:
-        yf.Ticker.history: Historical data for the currency pair.
-    """
-    try:
-        logger.info(f"Fetching data for {currency_pair}.")
-        data = yf.Ticker(currency_pair).history(period="3mo")
-        if data.empty:
-            logger.warning(f"No data returned for currency pair {currency_pair}.")
-        return data
-    except Exception as e:
-        logger.error(f"Error fetching data for {currency_pair}: {e}")
-        return None
-
-def plot_currency_data(currency_data: yf.Ticker.history, currency_pair: str) -> BytesIO:
+def plot_currency_data(currency_data, currency_pair: str) -> BytesIO:
     """
     Create a plot of the currency data.
 
     Args:
-        currency_data (yf.Ticker.history): Historical data for the currency pair.
+        currency_data (pandas.Series): Daily rates of the currency pair.
         currency_pair (str): The currency pair being plotted.
 
     Returns:
@@ -44,7 +28,7 @@ def plot_currency_data(currency_data: yf.Ticker.history, currency_pair: str) ->
     try:
         logger.info(f"Creating plot for {currency_pair}.")
         fig, ax = plt.subplots(figsize=(10, 5))
-        ax.plot(currency_data["Close"], label=f"{currency_pair} Son Fiyat")
+        ax.plot(currency_data, label=f"{currency_pair} Son Fiyat")
         ax.set_title(f"{currency_pair} - Son 3 Ay")
         ax.set_xlabel("Tarih")
         ax.set_ylabel("Değer")
@@ -63,31 +47,40 @@ def plot_currency_data(currency_data: yf.Ticker.history, currency_pair: str) ->
         logger.error(f"Error creating plot for {currency_pair}: {e}")
         return None
 
+def format_rate(value):
+    """Format a rate, with more decimals for currencies worth less than a lira."""
+    return f"{value:.4f}" if value < 1 else f"{value:.2f}"
+
 def currency_send():
     """Fetch currency data, create plots, and send an email report."""
     logger.start("Running exchange_rates")
     try:
-        currencies = ["USDTRY=X", "EURTRY=X", "GBPTRY=X"]
+        closes = fetch_base_rates("3mo")
+        if closes.empty:
+            logger.error("No data returned for the base rates.")
+            return
+        usd = usd_values(closes)
+        rates = try_rates(usd)
+        rates["Sepet"] = basket_rate(rates)
+        # Change over the period, from the first close of every currency
+        changes = (rates.iloc[-1] / rates.bfill().iloc[0] - 1) * 100
         email_body = "🌍 Döviz Kurları 🌍\n\n"
-        image_buffer = None
 
-        for currency in currencies:
-            data = get_currency_data(currency)
-            if data is None or data.empty:
+        for currency in CURRENCIES + ["Sepet"]:
+            last_price = rates[currency].iloc[-1]
+            if pd.isna(last_price):
                 logger.warning(f"Skipping {currency} due to missing data.")
                 continue
-            
-            last_price = data["Close"].iloc[-1]
-            change = (data["Close"].iloc[-1] - data["Close"].iloc[0]) / data["Close"].iloc[0] * 100
-            currency_label = currency.replace("=X", "")
-            
-            # Generate and save plot for the first currency
-            if currency == "USDTRY=X":
-                image_buffer = plot_currency_data(data, currency_label)
-                if image_buffer is None:
-                    logger.error("Failed to generate image for email; proceeding without an image.")
-            
-            email_body += f"{currency_label}:\nSon Fiyat: {last_price:.2f}\nDeğişim: {change:.2f}%\n\n"
+            currency_label = f"{currency}TRY" if currency != "Sepet" else f"Sepet ({' + '.join(f'{weight} {name}' for name, weight in BASKET.items())})"
+            email_body += f"{currency_label}:\nSon Fiyat: {format_rate(last_price)}\nDeğişim: {changes[currency]:.2f}%\n\n"
+
+        matrix = cross_matrix(usd)
+        crosses = [("EUR", "USD"), ("GBP", "USD"), ("USD", "JPY"), ("USD", "CHF"), ("EUR", "GBP")]
+        email_body += "Çapraz Kurlar:\n" + "\n".join(f"{base}/{quote}: {matrix.loc[base, quote]:.4f}" for base, quote in crosses) + "\n"
+
+        image_buffer = plot_currency_data(rates["USD"].dropna(), "USDTRY")
+        if image_buffer is None:
+            logger.error("Failed to generate image for email; proceeding without an image.")
 
         # Send the email with or without an image attachment
         send_email("Güncel Döviz Kurları #currency_send", email_body, image_buffer)
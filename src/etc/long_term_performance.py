@@ -1,18 +1,19 @@
 """
-This module performs a long-term analysis of a randomly selected stock.
+This module performs a long-term analysis of a stock taken in rotation.
 
 It fetches stock data, creates a chart, and sends an email report.
 """
 import logging
 from datetime import datetime, timedelta
 from io import BytesIO
-from secrets import randbelow
 
 import matplotlib.pyplot as plt
 import yfinance as yf
 
 from src.email_utils import send_email
-from src.lib.constants import us_stock_list
+from src.lib.risk import stock_risk
+from src.lib.rotation import next_pick
+from src.lib.window_stats import symbol_profile, symbol_stats
 
 # Set up logging configuration
 logger = logging.getLogger(__name__)
@@ -24,24 +25,12 @@ def format_value(value, currency):
     return ""
 
 def analyze_long_term_stock():
-    """Analyze a randomly selected stock and send a report via email."""
+    """Analyze the next stock of the rotation and send a report via email."""
     logger.start("Running analyze_long_term_stock")
     try:
-        selected_stock = us_stock_list[randbelow(len(us_stock_list))]
+        selected_stock = next_pick("analyze_long_term_stock")
         logger.info(f"Selected stock for analysis: {selected_stock}")
         
-        stock = yf.Ticker(selected_stock)
-        stock_info = stock.info
-        currency = stock_info.get("financialCurrency", "USD")
-
-        # Compose the email body with stock information
-        email_body = f"📈#{selected_stock} {stock_info.get('shortName', 'Stock')} hisse senedinin güncel ve uzun dönemli performansı 👇\n\n"
-        current_price = stock_info.get("regularMarketPrice") or (stock_info.get("open", 0) + stock_info.get("dayHigh", 0)) / 2
-        email_body += f"▪️ Anlık Fiyat: {format_value(current_price, currency)}\n"
-        email_body += f"▪️ 52 Haftalık En Yüksek Değer: {format_value(stock_info.get('fiftyTwoWeekHigh'), currency)}\n"
-        email_body += f"▪️ Ortalama Günlük İşlem Hacmi (Son 10 Gün): {format_value(stock_info.get('averageDailyVolume10Day'), 'hisse')}\n"
-        email_body += f"▪️ Piyasa Değeri: {format_value(stock_info.get('marketCap'), currency)}\n"
-
         # Fetch stock historical data for the last year
         end_date = datetime.now()
         start_date = end_date - timedelta(days=365)
@@ -54,6 +43,25 @@ def analyze_long_term_stock():
             logger.error(f"Failed to fetch historical data for {selected_stock}: {e}")
             return
 
+        # Price, 52-week high and volume from the year of bars, name and shares from the cached profile
+        stats = symbol_stats(selected_stock, stock_data)
+        stock_info = symbol_profile(selected_stock)
+        currency = stock_info.get("financialCurrency") or "USD"
+        shares = stock_info.get("sharesOutstanding")
+        market_cap = shares * stats.price if shares else stock_info.get("marketCap")
+
+        # Compose the email body with stock information
+        email_body = f"📈#{selected_stock} {stock_info.get('shortName') or 'Stock'} hisse senedinin güncel ve uzun dönemli performansı 👇\n\n"
+        email_body += f"▪️ Anlık Fiyat: {format_value(stats.price, currency)}\n"
+        email_body += f"▪️ 52 Haftalık En Yüksek Değer: {format_value(stats.high, currency)}\n"
+        email_body += f"▪️ Ortalama Günlük İşlem Hacmi (Son 10 Gün): {format_value(stats.average_volume, 'hisse')}\n"
+        email_body += f"▪️ Piyasa Değeri: {format_value(market_cap, currency)}\n"
+
+        # CAGR, volatility, drawdown and the ratios were computed by refresh_risk_metrics
+        risk = stock_risk(selected_stock)
+        if risk:
+            email_body += f"\n{risk}\n"
+
         # Plotting the stock price history
         try:
             plt.figure(figsize=(12, 6))
@@ -61,7 +69,7 @@ def analyze_long_term_stock():
             y_min, y_max = stock_data["Close"].min(), stock_data["Close"].max()
             y_ticks = range(int(y_min), int(y_max) + 1, max(1, int((y_max - y_min) / 10)))
             plt.yticks(y_ticks)
-            plt.title(f'{stock_info.get("shortName", selected_stock)} Değişim Grafiği')
+            plt.title(f'{stock_info.get("shortName") or selected_stock} Değişim Grafiği')
             plt.ylabel("Fiyat")
             plt.grid(True)
             plt.xticks(rotation=45)
@@ -78,7 +86,7 @@ def analyze_long_term_stock():
             return
 
         # Send the email with the generated plot
-        subject = f"{stock_info.get('shortName', selected_stock)} Hissesi Performans Raporu #L_term_stock"
+        subject = f"{stock_info.get('shortName') or selected_stock} Hissesi Performans Raporu #L_term_stock"
         try:
             send_email(subject, email_body, image_stream)
             logger.ok(f"Email sent successfully for {selected_stock}")
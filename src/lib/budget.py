@@ -0,0 +1,208 @@
+"""
+This module counts the outbound requests of the jobs and checks them against their budgets.
+
+Every job declares the most data requests and bytes a run may use (BUDGETS in
+src/lib/jobs.py). The real HTTP requests are counted where they leave the process:
+the curl_cffi session yfinance uses, ``requests.Session.request`` and
+``http.client.HTTPConnection``. A request is counted once, by the outermost of these
+layers, and requests from every thread are counted, since ``yf.download`` fetches in
+worker threads.
+
+When a stand-in data provider is installed nothing reaches the network, and the
+requests the provider serves (``RunStats.requests``) are checked instead. The scheduler
+logs a warning when a job goes over its budget; the runner and the benchmarks fail.
+"""
+
+import logging
+import os
+import threading
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+from src.lib.memory import format_bytes
+
+logger = logging.getLogger(__name__)
+
+BUDGETS_ENABLED = os.getenv("REQUEST_BUDGETS", "1") == "1"
+
+Budget = namedtuple("Budget", ["requests", "bytes"])
+
+_lock = threading.Lock()
+_meters = []
+_local = threading.local()
+_installed = False
+
+
+class RequestMeter:
+    """Outbound HTTP requests and response bytes counted while the meter is active."""
+
+    def __init__(self):
+        self.requests = Counter()
+        self.bytes = 0
+
+    @property
+    def request_count(self):
+        """Total number of requests."""
+        return sum(self.requests.values())
+
+    def as_dict(self):
+        """Return the counts as a JSON-serializable dict."""
+        return {"http_requests": dict(self.requests), "http_request_count": self.request_count, "http_bytes": self.bytes}
+
+
+@contextmanager
+def meter_requests():
+    """
+    Count the outbound HTTP requests made by any thread inside the block.
+
+    Yields:
+        RequestMeter: The counts, updated as requests are made.
+    """
+    install_request_counting()
+    meter = RequestMeter()
+    with _lock:
+        _meters.append(meter)
+    try:
+        yield meter
+    finally:
+        with _lock:
+            _meters.remove(meter)
+
+
+def _record(kind, nbytes=0, count=1):
+    with _lock:
+        for meter in _meters:
+            meter.requests[kind] += count
+            meter.bytes += nbytes
+
+
+@contextmanager
+def _outermost():
+    """Yield True in the outermost transport layer of a request, False in the layers it calls."""
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    try:
+        yield depth == 0
+    finally:
+        _local.depth = depth
+
+
+def _count_session(kind, request):
+    """Wrap a Session.request method of requests or curl_cffi."""
+
+    def counted_request(self, *args, **kwargs):
+        with _outermost() as outermost:
+            response = request(self, *args, **kwargs)
+            if outermost:
+                _record(kind, len(response.content or b""))
+            return response
+
+    return counted_request
+
+
+def install_request_counting():
+    """Count the requests made through curl_cffi (yfinance), requests and http.client from now on."""
+    global _installed  # pylint: disable=global-statement
+    if _installed:
+        return
+    # pylint: disable=import-outside-toplevel
+    import http.client
+
+    import requests
+
+    requests.Session.request = _count_session("requests", requests.Session.request)
+    try:
+        from curl_cffi import requests as curl_requests
+
+        curl_requests.Session.request = _count_session("yfinance", curl_requests.Session.request)
+    except ImportError:
+        # yfinance falls back to requests, whose requests are counted as such
+        pass
+
+    request, getresponse = http.client.HTTPConnection.request, http.client.HTTPConnection.getresponse
+
+    def counted_http_request(self, *args, **kwargs):
+        with _outermost() as outermost:
+            if outermost:
+                _record("http.client")
+            return request(self, *args, **kwargs)
+
+    def counted_getresponse(self):
+        with _outermost() as outermost:
+            response = getresponse(self)
+        if outermost:
+            read = response.read
+
+            def counted_read(*args, **kwargs):
+                data = read(*args, **kwargs)
+                _record("http.client", len(data), count=0)
+                return data
+
+            response.read = counted_read
+        return response
+
+    http.client.HTTPConnection.request = counted_http_request
+    http.client.HTTPConnection.getresponse = counted_getresponse
+    _installed = True
+
+
+def job_usage(stats, meter):
+    """
+    Return the requests and bytes a run used.
+
+    Args:
+        stats (RunStats): Statistics of the run, with the requests served by the data provider.
+        meter (RequestMeter): Requests that reached the network during the run.
+
+    Returns:
+        tuple: (requests, bytes), the larger of the two counts of each.
+    """
+    return max(stats.request_count, meter.request_count), max(stats.bytes, meter.bytes)
+
+
+def check_budget(name, requests, nbytes, budgets=None):
+    """
+    Check a run of a job against its budget.
+
+    Args:
+        name (str): Name of the job.
+        requests (int): Requests the run made.
+        nbytes (int): Bytes the run fetched.
+        budgets (dict, optional): Budgets by job name; defaults to BUDGETS in src/lib/jobs.py.
+
+    Returns:
+        list: A message for every limit the run went over; empty when within budget
+        or when the job has no budget.
+    """
+    if budgets is None:
+        from src.lib.jobs import BUDGETS as budgets  # pylint: disable=import-outside-toplevel
+
+    budget = budgets.get(name)
+    if not BUDGETS_ENABLED or budget is None:
+        return []
+    violations = []
+    if requests > budget.requests:
+        violations.append(f"{name} made {requests} requests, budget is {budget.requests}")
+    if nbytes > budget.bytes:
+        violations.append(f"{name} fetched {format_bytes(nbytes)}, budget is {format_bytes(budget.bytes)}")
+    return violations
+
+
+@contextmanager
+def enforce_budget(name):
+    """
+    Count the requests of a job run, log them and warn when the run goes over its budget.
+
+    Yields:
+        tuple: (RunStats, RequestMeter) of the run.
+    """
+    from src.lib.stats import collect_stats  # pylint: disable=import-outside-toplevel
+
+    with collect_stats() as stats, meter_requests() as meter:
+        try:
+            yield stats, meter
+        finally:
+            requests, nbytes = job_usage(stats, meter)
+            logger.info(f"{name} made {requests} requests and fetched {format_bytes(nbytes)}")
+            for violation in check_budget(name, requests, nbytes):
+                logger.warning(f"Request budget exceeded: {violation}")
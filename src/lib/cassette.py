@@ -0,0 +1,264 @@
+"""
+This module records the market data calls of a job into a cassette and replays them.
+
+A cassette is a gzipped JSON file holding every yfinance, cryptoprices.cc and
+CollectAPI interaction of a run, in order, with how long each one took. Identical
+responses are stored once. Replaying a cassette serves the same responses offline,
+with an optional artificial latency, so jobs can be benchmarked and regression
+tested deterministically and two versions of the code compared.
+
+Usage:
+    python -m src.lib.cassette show cassettes/bist_comp.json.gz
+    python -m src.lib.cassette compare old/bist_comp.json.gz new/bist_comp.json.gz
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+
+import pandas as pd
+
+from src.lib.providers import LiveProvider, frame_from_json, frame_to_json
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+CASSETTE_DIR = os.getenv("CASSETTE_DIR", "cassettes")
+
+
+class CassetteMissError(LookupError):
+    """Raised when a replayed job makes a request that is not in the cassette."""
+
+
+class ReplayedError(ConnectionError):
+    """Raised when replaying a request that failed while it was recorded."""
+
+
+def _request_key(kind, target, kwargs=None):
+    """Build the exact key of a request, and the loose key that ignores its dates."""
+    kwargs = {name: str(value) for name, value in (kwargs or {}).items() if value is not None and name != "progress"}
+    exact = json.dumps([kind, target, sorted(kwargs.items())], ensure_ascii=False)
+    loose = json.dumps([kind, target, kwargs.get("interval", "1d")], ensure_ascii=False)
+    return exact, loose
+
+
+def _encode(kind, response):
+    if kind in ("history", "download"):
+        if isinstance(response.columns, pd.MultiIndex):
+            return {"multi": {symbol: frame_to_json(response.xs(symbol, axis=1, level=1)) for symbol in response.columns.get_level_values(1).unique()}}
+        return {"frame": frame_to_json(response)}
+    if kind == "http":
+        status, content = response
+        return {"status": status, "body": content.decode("utf-8", errors="replace")}
+    return {"info": response}
+
+
+def _decode(kind, data):
+    if kind in ("history", "download"):
+        if "multi" in data:
+            frames = {symbol: frame_from_json(frame) for symbol, frame in data["multi"].items()}
+            return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+        return frame_from_json(data["frame"])
+    if kind == "http":
+        return data["status"], data["body"].encode("utf-8")
+    return dict(data["info"])
+
+
+def cassette_path(job_label, cassette_dir=CASSETTE_DIR):
+    """Return the cassette path of a job, e.g. cassettes/commodity_price-NG=F.json.gz."""
+    safe = "".join(char if char.isalnum() or char in "=-_." else "_" for char in job_label)
+    return os.path.join(cassette_dir, f"{safe}.json.gz")
+
+
+def load_cassette(path):
+    """
+    Load a cassette file.
+
+    Raises:
+        ValueError: If the cassette was written by an incompatible version.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        cassette = json.load(file)
+    if cassette.get("version") != CASSETTE_VERSION:
+        raise ValueError(f"{path} is cassette version {cassette.get('version')}, expected {CASSETTE_VERSION}")
+    return cassette
+
+
+class CassetteRecorder:
+    """Fetch through another provider (the network by default) and record every interaction into a cassette."""
+
+    name = "record"
+
+    def __init__(self, path, upstream=None):
+        self.path = path
+        self.upstream = upstream or LiveProvider()
+        self.interactions = []
+        self.responses = []
+        self._response_ids = {}
+
+    def _record(self, kind, target, kwargs, call):
+        start = time.perf_counter()
+        try:
+            response = call()
+            encoded = json.dumps(_encode(kind, response), ensure_ascii=False, sort_keys=True)
+        except Exception as e:
+            # Failures are part of the run too, replay raises them again
+            self._add(kind, target, kwargs, json.dumps({"error": f"{type(e).__name__}: {e}"}), time.perf_counter() - start)
+            raise
+        self._add(kind, target, kwargs, encoded, time.perf_counter() - start)
+        return response
+
+    def _add(self, kind, target, kwargs, encoded, elapsed):
+        digest = hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+        if digest not in self._response_ids:
+            self._response_ids[digest] = len(self.responses)
+            self.responses.append(json.loads(encoded))
+        exact, loose = _request_key(kind, target, kwargs)
+        self.interactions.append(
+            {
+                "kind": kind,
+                "key": exact,
+                "loose_key": loose,
+                "response": self._response_ids[digest],
+                "elapsed": round(elapsed, 4),
+                "bytes": len(encoded),
+            }
+        )
+
+    def ticker_info(self, symbol):
+        return self._record("info", symbol, None, lambda: self.upstream.ticker_info(symbol))
+
+    def ticker_history(self, symbol, **kwargs):
+        return self._record("history", symbol, kwargs, lambda: self.upstream.ticker_history(symbol, **kwargs))
+
+    def download(self, tickers, **kwargs):
+        target = tickers if isinstance(tickers, str) else " ".join(tickers)
+        return self._record("download", target, kwargs, lambda: self.upstream.download(tickers, **kwargs))
+
+    def http_request(self, method, url, headers=None, body=None):
+        return self._record("http", f"{method} {url}", None, lambda: self.upstream.http_request(method, url, headers=headers, body=body))
+
+    def close(self):
+        """Write the cassette."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        cassette = {
+            "version": CASSETTE_VERSION,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "interactions": self.interactions,
+            "responses": self.responses,
+        }
+        with gzip.open(self.path, "wt", encoding="utf-8") as file:
+            json.dump(cassette, file, ensure_ascii=False, separators=(",", ":"))
+        logger.info(f"Recorded {len(self.interactions)} interactions into {self.path}")
+
+
+class CassetteReplayer:
+    """
+    Serve the interactions of a cassette instead of going to the network.
+
+    Requests are matched on their exact arguments first, then on the kind, the target
+    and the interval only, so jobs that ask for date ranges relative to today still
+    replay on later days. Repeated requests get the recorded responses in order.
+
+    Args:
+        path (str): Path of the cassette.
+        latency (float): Seconds added to every request.
+        latency_scale (float): Multiplier applied to the recorded duration of every request.
+    """
+
+    name = "replay"
+
+    def __init__(self, path, latency=0.0, latency_scale=0.0):
+        self.path = path
+        self.latency = latency
+        self.latency_scale = latency_scale
+        cassette = load_cassette(path)
+        self._responses = cassette["responses"]
+        self._exact = defaultdict(deque)
+        self._loose = defaultdict(deque)
+        for interaction in cassette["interactions"]:
+            self._exact[interaction["key"]].append(interaction)
+            self._loose[interaction["loose_key"]].append(interaction)
+        self.misses = 0
+
+    def _replay(self, kind, target, kwargs=None):
+        exact, loose = _request_key(kind, target, kwargs)
+        queue = self._exact.get(exact) or self._loose.get(loose)
+        if not queue:
+            self.misses += 1
+            raise CassetteMissError(f"No recorded {kind} request for {target} {kwargs or ''} in {self.path}")
+        # Keep the last response so a job may repeat a request more often than recorded
+        interaction = queue.popleft() if len(queue) > 1 else queue[0]
+        delay = self.latency + self.latency_scale * interaction["elapsed"]
+        if delay > 0:
+            time.sleep(delay)
+        response = self._responses[interaction["response"]]
+        if "error" in response:
+            raise ReplayedError(response["error"])
+        return _decode(kind, response)
+
+    def ticker_info(self, symbol):
+        return self._replay("info", symbol)
+
+    def ticker_history(self, symbol, **kwargs):
+        return self._replay("history", symbol, kwargs)
+
+    def download(self, tickers, **kwargs):
+        target = tickers if isinstance(tickers, str) else " ".join(tickers)
+        return self._replay("download", target, kwargs)
+
+    def http_request(self, method, url, headers=None, body=None):  # pylint: disable=unused-argument
+        return self._replay("http", f"{method} {url}")
+
+
+def summarize(cassette):
+    """
+    Summarize a cassette.
+
+    Returns:
+        dict: Number of requests per kind, total bytes and total recorded request time.
+    """
+    interactions = cassette["interactions"]
+    return {
+        "requests": dict(Counter(interaction["kind"] for interaction in interactions)),
+        "request_count": len(interactions),
+        "bytes": sum(interaction["bytes"] for interaction in interactions),
+        "elapsed": round(sum(interaction["elapsed"] for interaction in interactions), 3),
+    }
+
+
+def main():
+    """Show or compare cassettes."""
+    parser = argparse.ArgumentParser(description="Inspect recorded cassettes.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    show = subparsers.add_parser("show", help="summarize a cassette")
+    show.add_argument("path")
+    compare = subparsers.add_parser("compare", help="compare the requests of two cassettes")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        cassette = load_cassette(args.path)
+        print(json.dumps({"recorded_at": cassette["recorded_at"], **summarize(cassette)}, indent=2))
+        return
+
+    old, new = summarize(load_cassette(args.old)), summarize(load_cassette(args.new))
+    print(f"{'':<20} {'old':>12} {'new':>12} {'diff':>12}")
+    for field in ("request_count", "bytes", "elapsed"):
+        print(f"{field:<20} {old[field]:>12} {new[field]:>12} {round(new[field] - old[field], 3):>12}")
+    for kind in sorted(set(old["requests"]) | set(new["requests"])):
+        before, after = old["requests"].get(kind, 0), new["requests"].get(kind, 0)
+        print(f"{'  ' + kind:<20} {before:>12} {after:>12} {after - before:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+This module keeps the rolling correlations of the BIST30 stocks and their beta to XU100.
+
+A RollingCorrelation keeps the daily returns of the last CORRELATION_WINDOW sessions
+in a ring, with their running sums and the running sums of their products, a matrix
+with a row and a column per symbol. A new daily bar adds the outer product of its
+returns and subtracts that of the bar leaving the window, so it costs O(n²) for n
+symbols, whatever the length of the history; the covariances, correlations and betas
+are read off the sums. The sums are recomputed from the ring once every window, so
+the rounding errors of the subtractions do not pile up.
+
+Missing closes, e.g. a suspended stock, carry the last close forward: a zero return.
+
+The ``bist30_correlation`` job (src/bist/bist30_correlation.py) adds the bars closed
+since its last run, the first run builds the state from CORRELATION_HISTORY of bars,
+and the state is saved in CORRELATION_PATH between runs.
+"""
+
+import logging
+import os
+import pickle
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.lib.data_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+CORRELATION_PATH = os.getenv("CORRELATION_PATH", os.path.join(CACHE_DIR, "correlation.pkl"))
+CORRELATION_WINDOW = int(os.getenv("CORRELATION_WINDOW", "60"))
+# Enough sessions to fill the window on the first run
+CORRELATION_HISTORY = "6mo"
+BENCHMARK = "XU100.IS"
+
+
+class RollingCorrelation:
+    """
+    Running sums of the daily returns of symbols and of their products, over a window.
+
+    Args:
+        count (int): Number of symbols.
+        window (int): Sessions of the window.
+    """
+
+    def __init__(self, count, window=CORRELATION_WINDOW):
+        self.window = window
+        self.returns = np.zeros((window, count))
+        self.position = 0
+        self.filled = 0
+        self.sums = np.zeros(count)
+        self.products = np.zeros((count, count))
+        self.last_close = np.full(count, np.nan)
+        self.updates = 0
+
+    def update(self, close):
+        """
+        Add the closes of a new daily bar.
+
+        Args:
+            close (numpy.ndarray): Close of every symbol, NaN when missing.
+        """
+        close = np.where(np.isnan(close), self.last_close, np.asarray(close, dtype=float))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            change = close / self.last_close - 1
+        self.last_close = close
+        if np.isnan(change).all():
+            # The first bar only gives the closes to compute the next returns from
+            return
+        change = np.where(np.isfinite(change), change, 0.0)
+        if self.filled == self.window:
+            old = self.returns[self.position]
+            self.sums -= old
+            self.products -= np.outer(old, old)
+        self.returns[self.position] = change
+        self.sums += change
+        self.products += np.outer(change, change)
+        self.position = (self.position + 1) % self.window
+        self.filled = min(self.filled + 1, self.window)
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._resum()
+
+    def _resum(self):
+        """Recompute the sums from the returns in the ring."""
+        rows = self.returns[: self.filled]
+        self.sums = rows.sum(axis=0)
+        self.products = rows.T @ rows
+
+    def covariance(self):
+        """Return the sample covariance matrix of the returns in the window, None with less than two."""
+        if self.filled < 2:
+            return None
+        mean = self.sums / self.filled
+        return (self.products - self.filled * np.outer(mean, mean)) / (self.filled - 1)
+
+    def correlation(self):
+        """Return the correlation matrix, NaN for symbols whose returns do not move."""
+        covariance = self.covariance()
+        if covariance is None:
+            return None
+        deviation = np.sqrt(np.clip(np.diag(covariance), 0.0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            correlation = covariance / np.outer(deviation, deviation)
+        return np.clip(correlation, -1.0, 1.0)
+
+    def betas(self, benchmark=-1):
+        """Return the beta of every symbol to the symbol at position benchmark."""
+        covariance = self.covariance()
+        if covariance is None or covariance[benchmark, benchmark] <= 0:
+            return None
+        return covariance[:, benchmark] / covariance[benchmark, benchmark]
+
+
+_lock = threading.Lock()
+_saved = None
+
+
+def load(path=CORRELATION_PATH):
+    """
+    Return the saved state, reading it from disk on first use.
+
+    Returns:
+        dict: {"symbols", "last_date", "state"}, or None when there is no state yet.
+    """
+    global _saved  # pylint: disable=global-statement
+    with _lock:
+        if _saved is not None or not os.path.exists(path):
+            return _saved
+        try:
+            with open(path, "rb") as file:
+                _saved = pickle.load(file)
+        except (OSError, pickle.PickleError, EOFError, AttributeError) as e:
+            logger.error(f"Failed to read the correlation state: {e}")
+        return _saved
+
+
+def _save(saved, path):
+    global _saved  # pylint: disable=global-statement
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(saved, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logger.error(f"Failed to save the correlation state: {e}")
+    with _lock:
+        _saved = saved
+
+
+def _closed_until():
+    """Return the first day whose BIST bar is not closed yet."""
+    import pytz  # pylint: disable=import-outside-toplevel
+    from src.lib.trading_calendar import MARKETS, session  # pylint: disable=import-outside-toplevel
+
+    now = datetime.now(pytz.timezone(MARKETS["BIST"].tz))
+    today = session("BIST", now.date())
+    if today is not None and now >= today.close:
+        return now.date() + timedelta(days=1)
+    return now.date()
+
+
+def refresh(path=CORRELATION_PATH, until=None):
+    """
+    Add the daily bars closed since the last refresh to the state of the BIST30 stocks
+    and XU100, or build it from CORRELATION_HISTORY of bars.
+
+    Args:
+        path (str): File of the saved state.
+        until (date, optional): Bars from this day on are not added; by default today,
+            or tomorrow once today's session has closed.
+
+    Returns:
+        dict: The saved state, its last symbol is the benchmark.
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    import yfinance as yf  # pylint: disable=import-outside-toplevel
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+
+    symbols = registry()["bist30_stocks"].symbols() + [BENCHMARK]
+    until = until or _closed_until()
+    saved = load(path)
+    if saved is not None and (saved["symbols"] != symbols or saved["state"].window != CORRELATION_WINDOW):
+        logger.warning("The BIST30 list or the window changed, rebuilding the correlation state")
+        saved = None
+    if saved is None:
+        frame = yf.download(symbols, period=CORRELATION_HISTORY, interval="1d", progress=False)
+        state, last_date = RollingCorrelation(len(symbols)), None
+    else:
+        frame = yf.download(symbols, start=(saved["last_date"] + timedelta(days=1)).strftime("%Y-%m-%d"), interval="1d", progress=False)
+        state, last_date = saved["state"], saved["last_date"]
+    added = 0
+    if not frame.empty:
+        closes = frame["Close"].reindex(columns=symbols)
+        closes.index = pd.DatetimeIndex(closes.index).tz_localize(None).normalize()
+        for day, row in closes.iterrows():
+            if day.date() >= until or (last_date is not None and day.date() <= last_date):
+                continue
+            state.update(row.to_numpy(dtype=float))
+            last_date = day.date()
+            added += 1
+    if last_date is None:
+        logger.error("No bars for the correlation state")
+        return saved
+    saved = {"symbols": symbols, "last_date": last_date, "state": state}
+    if added:
+        _save(saved, path)
+    logger.info(f"Correlation state updated with {added} bars, {state.filled} in the window, last bar on {last_date}")
+    return saved
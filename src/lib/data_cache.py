@@ -0,0 +1,214 @@
+"""
+This module keeps jobs on time when Yahoo or CollectAPI is slow: stale-while-revalidate
+under a per-job publish deadline.
+
+Jobs with a deadline (DEADLINES in src/lib/jobs.py) run with a DeadlineProvider in
+front of the real data provider. Every fetch runs in a background thread and the job
+waits for it only until the deadline. When the deadline is hit, or the fetch fails,
+the job gets the last successful response of the same request from the data cache,
+the email gets a staleness note, and the fetch keeps running in the background to
+refresh the cache for the next run. Without a cached response the job gets a
+DeadlineExceededError, like any other data error.
+
+The cache keeps the last response of every request in memory and in CACHE_DIR, so it
+survives restarts. Requests are keyed without their start and end dates, which are
+relative to today, so the cache does not grow by one entry per day.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.lib.providers import LiveProvider, active_provider, use_provider
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+
+CacheEntry = namedtuple("CacheEntry", ["value", "fetched_at"])
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a fetch misses the deadline of its job and nothing is cached for it."""
+
+
+def cache_key(kind, target, kwargs=None):
+    """Build the cache key of a request, ignoring its start and end dates."""
+    kwargs = {name: str(value) for name, value in (kwargs or {}).items() if value is not None and name not in ("start", "end", "progress")}
+    return json.dumps([kind, target, sorted(kwargs.items())], ensure_ascii=False)
+
+
+def _copy(value):
+    """Copy a cached value so the job cannot change the cached one."""
+    if hasattr(value, "copy"):
+        return value.copy()
+    return value
+
+
+class DataCache:
+    """
+    Last successful response of every request, in memory and on disk.
+
+    Args:
+        cache_dir (str, optional): Directory of the cache files; None keeps the cache in memory only.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pkl")
+
+    def get(self, key):
+        """Return the CacheEntry of a request, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.cache_dir and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), "rb") as file:
+                    entry = pickle.load(file)
+            except (OSError, pickle.PickleError, EOFError) as e:
+                logger.error(f"Failed to read cache entry {key}: {e}")
+                return None
+            with self._lock:
+                self._entries[key] = entry
+        return entry
+
+    def put(self, key, value):
+        """Store the response of a request."""
+        entry = CacheEntry(_copy(value), datetime.now())
+        with self._lock:
+            self._entries[key] = entry
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            # Write to a temporary file first so a crash never leaves a truncated entry
+            with open(path + ".tmp", "wb") as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.error(f"Failed to write cache entry {key}: {e}")
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Return the process-wide cache in CACHE_DIR."""
+    global _default_cache  # pylint: disable=global-statement
+    if _default_cache is None:
+        _default_cache = DataCache()
+    return _default_cache
+
+
+class DeadlineProvider:
+    """
+    Run the fetches of another provider under a deadline, falling back to cached responses.
+
+    Args:
+        seconds (float): Seconds from now until the deadline.
+        upstream (optional): Provider doing the fetching; the network by default.
+        cache (DataCache, optional): Cache of the last responses; the CACHE_DIR cache by default.
+    """
+
+    name = "deadline"
+
+    def __init__(self, seconds, upstream=None, cache=None):
+        self.upstream = upstream or LiveProvider()
+        self.cache = cache or default_cache()
+        self.deadline = time.monotonic() + seconds
+        self.stale = []
+
+    def _call(self, kind, target, kwargs, call):
+        key = cache_key(kind, target, kwargs)
+        future = Future()
+
+        def fetch():
+            try:
+                value = call()
+            except Exception as e:  # pylint: disable=broad-except
+                future.set_exception(e)
+                return
+            if kind != "http" or value[0] == 200:
+                self.cache.put(key, value)
+            future.set_result(value)
+
+        # A daemon thread, so a fetch that never returns cannot keep the process alive
+        threading.Thread(target=fetch, name=f"fetch-{target}", daemon=True).start()
+        try:
+            return future.result(timeout=max(0.0, self.deadline - time.monotonic()))
+        except FutureTimeoutError:
+            reason = "missed the deadline"
+            error = DeadlineExceededError(f"{kind} request for {target} missed the deadline and nothing is cached")
+        except Exception as e:  # pylint: disable=broad-except
+            reason = f"failed ({e})"
+            error = e
+
+        entry = self.cache.get(key)
+        if entry is None:
+            raise error
+        logger.warning(f"{kind} request for {target} {reason}, using the response from {entry.fetched_at:%Y-%m-%d %H:%M}")
+        self.stale.append((kind, target, entry.fetched_at))
+        return _copy(entry.value)
+
+    def ticker_info(self, symbol):
+        return self._call("info", symbol, None, lambda: self.upstream.ticker_info(symbol))
+
+    def ticker_history(self, symbol, **kwargs):
+        return self._call("history", symbol, kwargs, lambda: self.upstream.ticker_history(symbol, **kwargs))
+
+    def download(self, tickers, **kwargs):
+        target = tickers if isinstance(tickers, str) else " ".join(tickers)
+        return self._call("download", target, kwargs, lambda: self.upstream.download(tickers, **kwargs))
+
+    def http_request(self, method, url, headers=None, body=None):
+        return self._call("http", f"{method} {url}", None, lambda: self.upstream.http_request(method, url, headers=headers, body=body))
+
+    def close(self):
+        if hasattr(self.upstream, "close"):
+            self.upstream.close()
+
+
+@contextmanager
+def publish_deadline(seconds):
+    """
+    Run the block with its fetches under a deadline, through the provider in use or the network.
+
+    Args:
+        seconds (float, optional): Seconds until the deadline; None runs the block as is.
+
+    Yields:
+        DeadlineProvider: The provider, or None without a deadline.
+    """
+    if seconds is None:
+        yield None
+        return
+    with use_provider(DeadlineProvider(seconds, active_provider())) as provider:
+        yield provider
+
+
+def stale_note():
+    """
+    Return the note added to the emails of a run that used cached data.
+
+    Returns:
+        str: The note, or an empty string when every response was fresh.
+    """
+    stale = getattr(active_provider(), "stale", None)
+    if not stale:
+        return ""
+    oldest = min(fetched_at for _kind, _target, fetched_at in stale)
+    return f"⚠️ Veri kaynağı gecikti, {oldest:%d.%m.%Y %H:%M} tarihli veriler kullanıldı."
@@ -0,0 +1,259 @@
+"""
+This module keeps an eligibility index of the stocks the jobs pick at random.
+
+Jobs such as ``bist_stock_by_time`` pick a random stock and give up when it turns out to
+have too short a history or no current price, which wastes the fetch and usually the
+post. The index records, for every symbol of the universes, the date of its latest
+daily bar, the length of its history over the last year, its last close and data
+quality flags. It is refreshed once a day by the ``refresh_eligibility`` job, with
+one multi-ticker download per chunk of symbols, and saved in CACHE_DIR so it survives
+restarts. The downloaded bars are kept in memory for BARS_MAX_AGE seconds, so the
+indicator refresh that follows reuses them, see ``recent_bars()``.
+
+Jobs pick with ``choose()`` and ``sample()``, which only draw from the symbols that meet
+the requirement of the job, without a fetch. Without an index, e.g. on the first run,
+they draw from every symbol as before.
+
+Flags:
+
+- no_data: no bars at all, e.g. a delisted ticker.
+- no_price: the last close is missing or not positive.
+- suspended: no volume on the last SUSPENDED_BARS bars.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from src.lib.data_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+ELIGIBILITY_PATH = os.getenv("ELIGIBILITY_PATH", os.path.join(CACHE_DIR, "eligibility.json"))
+ELIGIBILITY_CHUNK = int(os.getenv("ELIGIBILITY_CHUNK", "100"))
+SUSPENDED_BARS = 5
+# Seconds the bars of a refresh are kept for the jobs that run right after it
+BARS_MAX_AGE = 60 * 60
+
+SymbolRecord = namedtuple("SymbolRecord", ["last_bar", "rows", "last_close", "flags"])
+SymbolRecord.__doc__ = """
+Eligibility of one symbol.
+
+Args:
+    last_bar (str): ISO date of the latest daily bar, None without bars.
+    rows (int): Number of daily bars over the last year.
+    last_close (float): Last close, None without one.
+    flags (tuple): Data quality flags, see the module docstring.
+"""
+
+Requirement = namedtuple("Requirement", ["min_rows", "max_age_days", "need_price"], defaults=(0, 7, True))
+Requirement.__doc__ = """
+What a job needs of the stock it picks.
+
+Args:
+    min_rows (int): Fewest daily bars over the last year.
+    max_age_days (int): Most calendar days since the latest bar.
+    need_price (bool): Needs a positive last close and trading volume.
+"""
+
+_lock = threading.Lock()
+_index = None
+_bars = None
+
+
+def universe_symbols():
+    """Return the Yahoo symbols of every stock the jobs pick from, BIST and US."""
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+
+    universe = registry()
+    return (universe["bist_stocks"] | universe["us_stock_list"]).symbols()
+
+
+def assess(frame, symbols):
+    """
+    Build the records of symbols from a multi-ticker download of daily bars.
+
+    Args:
+        frame (pandas.DataFrame): Bars with (price, ticker) columns.
+        symbols (list): Symbols of the download.
+
+    Returns:
+        dict: SymbolRecord by symbol.
+    """
+    records = {}
+    # A download of one ticker may come back with plain columns
+    multi = getattr(frame.columns, "nlevels", 1) > 1
+    for symbol in symbols:
+        try:
+            close = (frame[("Close", symbol)] if multi else frame["Close"]).dropna()
+            volume = (frame[("Volume", symbol)] if multi else frame["Volume"]).reindex(close.index).fillna(0)
+        except KeyError:
+            close, volume = None, None
+        if close is None or close.empty:
+            records[symbol] = SymbolRecord(None, 0, None, ("no_data",))
+            continue
+        last_close = float(close.iloc[-1])
+        flags = []
+        if not last_close > 0:
+            flags.append("no_price")
+        if len(volume) >= SUSPENDED_BARS and not volume.iloc[-SUSPENDED_BARS:].any():
+            flags.append("suspended")
+        records[symbol] = SymbolRecord(close.index[-1].date().isoformat(), int(len(close)), last_close, tuple(flags))
+    return records
+
+
+def refresh(symbols=None, path=ELIGIBILITY_PATH):
+    """
+    Rebuild the index from a year of daily bars of every symbol and save it.
+
+    Args:
+        symbols (list, optional): Symbols to index; every universe by default.
+        path (str): File to save the index to.
+
+    Returns:
+        dict: SymbolRecord by symbol.
+    """
+    global _index, _bars  # pylint: disable=global-statement
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    import yfinance as yf  # pylint: disable=import-outside-toplevel
+
+    symbols = symbols or universe_symbols()
+    records = {}
+    frames = []
+    for start in range(0, len(symbols), ELIGIBILITY_CHUNK):
+        chunk = symbols[start : start + ELIGIBILITY_CHUNK]
+        try:
+            frame = yf.download(chunk, period="1y", interval="1d", progress=False)
+        except Exception as e:
+            logger.error(f"Failed to download the bars of {len(chunk)} symbols for the eligibility index: {e}")
+            continue
+        records.update(assess(frame, chunk))
+        if not frame.empty:
+            if getattr(frame.columns, "nlevels", 1) == 1:
+                frame = pd.concat({chunk[0]: frame}, axis=1).swaplevel(axis=1)
+            frames.append(frame)
+    if not records:
+        logger.error("No bars for the eligibility index, keeping the previous one")
+        return load(path)
+    with _lock:
+        _bars = (pd.concat(frames, axis=1), time.monotonic()) if frames else None
+    index = {"refreshed_at": datetime.now().isoformat(), "symbols": {symbol: record._asdict() for symbol, record in records.items()}}
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(index, file)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logger.error(f"Failed to save the eligibility index: {e}")
+    with _lock:
+        _index = records
+    flagged = sum(1 for record in records.values() if record.flags)
+    logger.info(f"Eligibility index refreshed: {len(records)} symbols, {flagged} flagged")
+    return records
+
+
+def recent_bars(max_age=BARS_MAX_AGE):
+    """
+    Return the year of daily bars downloaded by the last refresh in this process, so
+    the jobs that run right after it need not download them again.
+
+    Args:
+        max_age (float): Most seconds since the refresh.
+
+    Returns:
+        pandas.DataFrame: Bars with (price, ticker) columns, None when there are no
+        bars that recent.
+    """
+    with _lock:
+        if _bars is None or time.monotonic() - _bars[1] > max_age:
+            return None
+        return _bars[0]
+
+
+def refresh_eligibility():
+    """Refresh the eligibility index of every universe."""
+    logger.start("Running refresh_eligibility")
+    try:
+        refresh()
+        logger.ok("refresh_eligibility worked successfully.")
+    except Exception as e:
+        logger.error(f"Failed to refresh the eligibility index: {e}")
+
+
+def load(path=ELIGIBILITY_PATH):
+    """
+    Return the index, reading it from disk on first use.
+
+    Returns:
+        dict: SymbolRecord by symbol; empty when there is no index yet.
+    """
+    global _index  # pylint: disable=global-statement
+    with _lock:
+        if _index is not None:
+            return _index
+    records = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            records = {symbol: SymbolRecord(**{**record, "flags": tuple(record["flags"])}) for symbol, record in data["symbols"].items()}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Failed to read the eligibility index: {e}")
+    with _lock:
+        _index = records
+    return records
+
+
+def is_eligible(record, requirement, today=None):
+    """Check whether the record of a symbol meets a requirement."""
+    if record is None or record.last_bar is None or record.rows < requirement.min_rows:
+        return False
+    if requirement.need_price and ("no_price" in record.flags or "suspended" in record.flags):
+        return False
+    age = (today or date.today()) - date.fromisoformat(record.last_bar)
+    return age <= timedelta(days=requirement.max_age_days)
+
+
+def eligible(names, requirement, suffix="", index=None):
+    """
+    Filter names down to the symbols that meet a requirement.
+
+    Args:
+        names (list): Names as in src/lib/constants.py, e.g. "AKBNK".
+        requirement (Requirement): What the job needs.
+        suffix (str): Suffix of the Yahoo symbol of the names, e.g. ".IS".
+        index (dict, optional): SymbolRecord by symbol; the saved index by default.
+
+    Returns:
+        list: The eligible names; all the names when there is no index.
+    """
+    index = load() if index is None else index
+    if not index:
+        return list(names)
+    today = date.today()
+    return [name for name in names if is_eligible(index.get(name + suffix), requirement, today)]
+
+
+def choose(names, requirement, suffix="", rng=random):
+    """
+    Pick a random name among those that meet a requirement.
+
+    Raises:
+        IndexError: If no name meets the requirement.
+    """
+    candidates = eligible(names, requirement, suffix)
+    if not candidates:
+        raise IndexError(f"None of the {len(names)} symbols meets {requirement}")
+    logger.info(f"Choosing among {len(candidates)} of {len(names)} symbols meeting {requirement}")
+    return rng.choice(candidates)
+
+
+def sample(names, count, requirement, suffix="", rng=random):
+    """Pick count random names among those that meet a requirement, fewer when not enough do."""
+    candidates = eligible(names, requirement, suffix)
+    return rng.sample(candidates, min(count, len(candidates)))
@@ -0,0 +1,127 @@
+"""
+This module derives the Turkish lira rates of many currencies from a few base rates.
+
+Every rate between two currencies follows from their values in dollars, so a dozen
+currencies only need one rate each against the dollar: USDTRY plus the majors of
+BASE_RATES. They are fetched in one multi-ticker download; their closes are aligned on
+the same dates, carrying the last close over the days a pair did not trade, and turned
+into the dollar value of every currency with one array operation. From these:
+
+- ``try_rates()`` gives the price of every currency in lira,
+- ``cross_matrix()`` gives the rate of every currency against every other one,
+- ``basket_rate()`` gives the lira price of a currency basket, by default the half
+  dollar, half euro basket of the Central Bank of Turkey.
+"""
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Yahoo symbol of each currency against the dollar, and whether it is quoted as units
+# of the currency per dollar (USDJPY) rather than dollars per unit (EURUSD)
+BASE_RATES = {
+    "TRY": ("USDTRY=X", True),
+    "EUR": ("EURUSD=X", False),
+    "GBP": ("GBPUSD=X", False),
+    "JPY": ("USDJPY=X", True),
+    "CHF": ("USDCHF=X", True),
+    "CAD": ("USDCAD=X", True),
+    "AUD": ("AUDUSD=X", False),
+    "CNY": ("USDCNY=X", True),
+    "SEK": ("USDSEK=X", True),
+    "NOK": ("USDNOK=X", True),
+    "DKK": ("USDDKK=X", True),
+    "SAR": ("USDSAR=X", True),
+}
+
+# Currencies in the order of the report
+CURRENCIES = ["USD"] + [currency for currency in BASE_RATES if currency != "TRY"]
+
+BASKET = {"USD": 0.5, "EUR": 0.5}
+
+
+def fetch_base_rates(period="3mo"):
+    """
+    Download the daily closes of the base rates in one multi-ticker download.
+
+    Args:
+        period (str): Period of the history, e.g. "3mo".
+
+    Returns:
+        pandas.DataFrame: Closes with a row per day and a column per currency of
+        BASE_RATES, as quoted by Yahoo.
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    import yfinance as yf  # pylint: disable=import-outside-toplevel
+
+    symbols = [symbol for symbol, _ in BASE_RATES.values()]
+    frame = yf.download(symbols, period=period, interval="1d", progress=False)
+    if frame.empty:
+        return pd.DataFrame(columns=list(BASE_RATES))
+    closes = frame["Close"].reindex(columns=symbols)
+    closes.columns = list(BASE_RATES)
+    closes.index = pd.DatetimeIndex(closes.index).tz_localize(None).normalize()
+    logger.info(f"Downloaded {len(closes)} days of {len(symbols)} base rates")
+    return closes
+
+
+def usd_values(closes):
+    """
+    Return the value in dollars of every currency on every date.
+
+    Args:
+        closes (pandas.DataFrame): Closes of the base rates, as from fetch_base_rates().
+
+    Returns:
+        pandas.DataFrame: Dollars per unit with a column per currency, the dollar
+        included; dates before the first close of a rate are NaN.
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    closes = closes.sort_index().ffill()
+    inverted = np.array([BASE_RATES[currency][1] for currency in closes.columns])
+    with np.errstate(divide="ignore"):
+        values = np.where(inverted, 1.0 / closes.to_numpy(dtype=float), closes.to_numpy(dtype=float))
+    usd = pd.DataFrame(values, index=closes.index, columns=closes.columns)
+    usd.insert(0, "USD", 1.0)
+    return usd
+
+
+def try_rates(usd):
+    """Return the price in lira of every currency, from the dollar values of usd_values()."""
+    return usd.drop(columns="TRY").div(usd["TRY"], axis=0)
+
+
+def cross_matrix(usd, day=-1):
+    """
+    Return the rate of every currency against every other one on a date.
+
+    Args:
+        usd (pandas.DataFrame): Dollar values, as from usd_values().
+        day (int): Position of the date, the last one by default.
+
+    Returns:
+        pandas.DataFrame: The price of the row currency in the column currency, e.g.
+        ``matrix.loc["EUR", "TRY"]`` is EURTRY.
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    values = usd.iloc[day].to_numpy(dtype=float)
+    return pd.DataFrame(np.divide.outer(values, values), index=usd.columns, columns=usd.columns)
+
+
+def basket_rate(rates, weights=None):
+    """
+    Return the lira price of a currency basket.
+
+    Args:
+        rates (pandas.DataFrame): Lira prices, as from try_rates().
+        weights (dict, optional): Units of each currency in the basket, BASKET by default.
+
+    Returns:
+        pandas.Series: Price of the basket by date.
+    """
+    weights = weights or BASKET
+    return rates[list(weights)] @ np.array(list(weights.values()))
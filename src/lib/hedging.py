@@ -0,0 +1,186 @@
+"""
+This module hedges latency-critical requests.
+
+``hedged()`` starts the primary request and, when it has not answered within the hedge
+delay, issues a second one: the same value through an alternate endpoint, or a
+duplicate of the primary. Whichever answers first wins. The loser cannot be
+interrupted in the middle of a request, so it is left to finish in a daemon thread and
+its response is discarded; a hedge that was not issued yet is never issued. A primary
+that fails before the delay is hedged at once.
+
+The hedge delay is a percentile (HEDGE_PERCENTILE) of the recent latencies of the
+primary request, so only the slow tail is hedged. The hedge rate, the win rate of the
+hedges and the tail latencies with and without hedging are kept per request name and
+shown at ``/hedging``.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+
+from src.lib.stats import RunStats, attach_stats, current_stats, stage
+
+logger = logging.getLogger(__name__)
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "1.0"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.2"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "10"))
+HEDGE_HISTORY = int(os.getenv("HEDGE_HISTORY", "200"))
+
+_lock = threading.Lock()
+
+
+class _HedgeStats:
+    """Counters and latencies of one hedged request name."""
+
+    def __init__(self):
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        # Latencies of the primary alone, and of the hedged call as the job saw it
+        self.primary_latencies = deque(maxlen=HEDGE_HISTORY)
+        self.latencies = deque(maxlen=HEDGE_HISTORY)
+
+
+_stats = defaultdict(_HedgeStats)
+
+
+def percentile(values, percent):
+    """Return the given percentile of the values (nearest rank), or None without values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def hedge_delay(name):
+    """
+    Return how long to wait for the primary request before hedging it.
+
+    Returns:
+        float: HEDGE_PERCENTILE of the recent primary latencies, HEDGE_DEFAULT_DELAY
+        until HEDGE_MIN_SAMPLES latencies were seen, and at least HEDGE_MIN_DELAY.
+    """
+    with _lock:
+        latencies = list(_stats[name].primary_latencies)
+    if len(latencies) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return max(HEDGE_MIN_DELAY, percentile(latencies, HEDGE_PERCENTILE))
+
+
+def _run(name, label, func, parent, results):
+    """Run one side of a hedged request in its own thread and report its outcome."""
+    child = RunStats()
+    start = time.perf_counter()
+    value, error = None, None
+    with attach_stats(child):
+        try:
+            value = func()
+        except Exception as e:  # pylint: disable=broad-except
+            error = e
+    elapsed = time.perf_counter() - start
+    with _lock:
+        if label == "primary" and error is None:
+            _stats[name].primary_latencies.append(elapsed)
+        # Requests are counted in the run even when this side lost
+        if parent is not None:
+            parent.requests.update(child.requests)
+            parent.bytes += child.bytes
+    results.put((label, value, error))
+
+
+def hedged(name, primary, alternate=None, delay=None):
+    """
+    Make a latency-critical request, hedging it when the primary is slow.
+
+    Args:
+        name (str): Name of the request, e.g. "quote_open"; latencies are kept per name.
+        primary (callable): Makes the request.
+        alternate (callable, optional): Gets the same value another way, e.g. through
+            another endpoint; the hedge duplicates the primary without it.
+        delay (float, optional): Seconds to wait before hedging; see hedge_delay().
+
+    Returns:
+        The value of the first request that succeeded.
+
+    Raises:
+        Exception: The error of the primary when every request failed.
+    """
+    if not HEDGE_ENABLED:
+        return primary()
+    alternate = alternate or primary
+    delay = hedge_delay(name) if delay is None else delay
+    parent = current_stats()
+    results = queue.Queue()
+    start = time.perf_counter()
+
+    def issue(label, func):
+        threading.Thread(target=_run, args=(name, label, func, parent, results), name=f"hedge-{name}-{label}", daemon=True).start()
+
+    with stage("fetch"):
+        issue("primary", primary)
+        pending, hedge_issued, errors = 1, False, []
+        while pending:
+            try:
+                label, value, error = results.get(timeout=None if hedge_issued else max(0.0, start + delay - time.perf_counter()))
+            except queue.Empty:
+                logger.info(f"{name} took longer than {delay:.2f}s, hedging it")
+                issue("hedge", alternate)
+                pending, hedge_issued = pending + 1, True
+                continue
+            pending -= 1
+            if error is None:
+                with _lock:
+                    stats = _stats[name]
+                    stats.calls += 1
+                    stats.hedges += hedge_issued
+                    stats.hedge_wins += label == "hedge"
+                    stats.latencies.append(time.perf_counter() - start)
+                return value
+            errors.append(error)
+            if not hedge_issued:
+                logger.info(f"{name} failed ({error}), hedging it")
+                issue("hedge", alternate)
+                pending, hedge_issued = pending + 1, True
+
+    with _lock:
+        _stats[name].calls += 1
+        _stats[name].hedges += 1
+        _stats[name].failures += 1
+    raise errors[0]
+
+
+def hedging_report():
+    """
+    Summarize the hedged requests.
+
+    Returns:
+        dict: Per request name, the call count, hedge and win rates, the current hedge
+        delay and the tail latencies of the primary alone and with hedging, in seconds.
+    """
+    report = {}
+    with _lock:
+        items = [(name, stats, list(stats.primary_latencies), list(stats.latencies)) for name, stats in _stats.items()]
+    for name, stats, primary_latencies, latencies in items:
+        calls = stats.calls or 1
+        report[name] = {
+            "calls": stats.calls,
+            "hedge_rate": round(stats.hedges / calls, 3),
+            "hedge_win_rate": round(stats.hedge_wins / stats.hedges, 3) if stats.hedges else 0.0,
+            "failures": stats.failures,
+            "hedge_delay": round(hedge_delay(name), 3),
+            "primary": {f"p{percent}": _round(percentile(primary_latencies, percent)) for percent in (50, 95, 99)},
+            "hedged": {f"p{percent}": _round(percentile(latencies, percent)) for percent in (50, 95, 99)},
+        }
+    return report
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
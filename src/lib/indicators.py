@@ -0,0 +1,511 @@
+"""
+This module computes technical indicators over price matrices of many symbols.
+
+Every kernel takes a matrix with a row per day and a column per symbol (a single series
+is one column) and computes its indicator for all the columns at once with NumPy, so
+screening the whole universe is a handful of array operations instead of a loop over
+symbols. Missing closes, e.g. a suspended stock, carry the last close forward.
+
+The kernels recompute the whole history. An IndicatorState keeps what the indicators
+need to move on by one bar: the last SMA_WINDOW closes in a ring, and the EMA, RSI
+and ATR averages. Adding a daily bar is then O(1) per symbol, whatever the length of
+the history.
+
+The ``refresh_indicators`` job keeps a state of every BIST stock, with the columns of
+the universe registry (src/lib/universe.py), and adds the bars closed since its last
+run; the first run builds it from a year of bars. The bars come from the download
+``refresh_eligibility`` made just before when they are still in memory, so the job
+usually fetches nothing. The state is saved in INDICATORS_PATH.
+
+Posts read the values of one stock with ``latest_values()``, which adds the current
+price as a provisional bar to a copy of its column, and ``format_signals()`` turns
+them into the signals section of the post. ``screen()`` filters a list of the
+universe by a condition on the values.
+"""
+
+import logging
+import os
+import pickle
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.lib.data_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+INDICATORS_PATH = os.getenv("INDICATORS_PATH", os.path.join(CACHE_DIR, "indicators.pkl"))
+INDICATORS_CHUNK = int(os.getenv("INDICATORS_CHUNK", "100"))
+# A state older than this many days is not used for a post
+INDICATORS_MAX_AGE = 5
+
+SMA_FAST = 20
+SMA_SLOW = 50
+SMA_WINDOW = max(SMA_FAST, SMA_SLOW)
+EMA_FAST = 12
+EMA_SLOW = 26
+MACD_SIGNAL = 9
+RSI_WINDOW = 14
+BOLLINGER_WINDOW = SMA_FAST
+BOLLINGER_WIDTH = 2.0
+ATR_WINDOW = 14
+
+
+def _matrix(values):
+    """Return values as a float matrix, a series as one column."""
+    values = np.asarray(values, dtype=float)
+    return values[:, None] if values.ndim == 1 else values
+
+
+def ffill(close):
+    """Carry the last close forward over missing closes, column by column."""
+    close = _matrix(close)
+    rows = np.where(np.isnan(close), 0, np.arange(len(close))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return close[rows, np.arange(close.shape[1])]
+
+
+def _rolling_sum(values, window):
+    """Return the sums of the last window values, NaN until a column has window values."""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    sums[counts < window] = np.nan
+    return sums
+
+
+def sma(close, window):
+    """Simple moving average."""
+    return _rolling_sum(ffill(close), window) / window
+
+
+def _ewm(values, alpha):
+    """Exponential average seeded with the first value; missing values keep the average."""
+    values = _matrix(values)
+    out = np.empty_like(values)
+    state = np.full(values.shape[1], np.nan)
+    for row, value in enumerate(values):
+        state = np.where(np.isnan(state), value, np.where(np.isnan(value), state, state + alpha * (value - state)))
+        out[row] = state
+    return out
+
+
+def ema(close, span):
+    """Exponential moving average with alpha 2 / (span + 1)."""
+    return _ewm(ffill(close), 2.0 / (span + 1))
+
+
+def rsi(close, window=RSI_WINDOW):
+    """Relative strength index with Wilder's smoothing."""
+    close = ffill(close)
+    delta = np.full_like(close, np.nan)
+    delta[1:] = close[1:] - close[:-1]
+    gain = _ewm(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0)), 1.0 / window)
+    loss = _ewm(np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0)), 1.0 / window)
+    return _rsi(gain, loss)
+
+
+def _rsi(gain, loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(loss == 0, np.where(gain > 0, 100.0, 50.0), 100.0 - 100.0 / (1.0 + gain / loss))
+
+
+def macd(close, fast=EMA_FAST, slow=EMA_SLOW, signal=MACD_SIGNAL):
+    """
+    Moving average convergence divergence.
+
+    Returns:
+        tuple: (MACD line, signal line, histogram)
+    """
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = _ewm(line, 2.0 / (signal + 1))
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, window=BOLLINGER_WINDOW, width=BOLLINGER_WIDTH):
+    """
+    Bollinger bands, with the population standard deviation.
+
+    Returns:
+        tuple: (upper band, middle band, lower band)
+    """
+    close = ffill(close)
+    middle = _rolling_sum(close, window) / window
+    variance = _rolling_sum(close * close, window) / window - middle * middle
+    deviation = np.sqrt(np.maximum(variance, 0))
+    return middle + width * deviation, middle, middle - width * deviation
+
+
+def true_range(high, low, close):
+    """True range; the first bar and bars without a previous close are high - low."""
+    high, low, close = _matrix(high), _matrix(low), ffill(close)
+    previous = np.full_like(close, np.nan)
+    previous[1:] = close[:-1]
+    return _true_range(high, low, previous)
+
+
+def _true_range(high, low, previous):
+    ranges = high - low
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isnan(previous), ranges, np.fmax(ranges, np.fmax(np.abs(high - previous), np.abs(low - previous))))
+
+
+def atr(high, low, close, window=ATR_WINDOW):
+    """Average true range with Wilder's smoothing."""
+    return _ewm(true_range(high, low, close), 1.0 / window)
+
+
+class IndicatorState:
+    """
+    What the indicators of many symbols need to move on by one bar.
+
+    Args:
+        count (int): Number of symbols, the columns of the bars.
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self.bars = 0
+        self.ring = np.full((SMA_WINDOW, count), np.nan)
+        self.close = np.full(count, np.nan)
+        self.ema_fast = np.full(count, np.nan)
+        self.ema_slow = np.full(count, np.nan)
+        self.signal = np.full(count, np.nan)
+        self.previous_histogram = np.full(count, np.nan)
+        self.gain = np.full(count, np.nan)
+        self.loss = np.full(count, np.nan)
+        self.atr = np.full(count, np.nan)
+
+    @classmethod
+    def from_history(cls, close, high=None, low=None):
+        """Build the state from bars, oldest first."""
+        close = _matrix(close)
+        high = _matrix(high) if high is not None else np.full_like(close, np.nan)
+        low = _matrix(low) if low is not None else np.full_like(close, np.nan)
+        state = cls(close.shape[1])
+        for row in range(len(close)):
+            state.update(close[row], high[row], low[row])
+        return state
+
+    def update(self, close, high=None, low=None):
+        """
+        Add one bar of every symbol.
+
+        Args:
+            close (numpy.ndarray): Closes; NaN carries the last close forward.
+            high (numpy.ndarray, optional): Highs, for the ATR.
+            low (numpy.ndarray, optional): Lows, for the ATR.
+        """
+        close = np.where(np.isnan(close), self.close, np.asarray(close, dtype=float))
+        high = np.full(self.count, np.nan) if high is None else np.asarray(high, dtype=float)
+        low = np.full(self.count, np.nan) if low is None else np.asarray(low, dtype=float)
+        previous = self.close
+        self.previous_histogram = self.ema_fast - self.ema_slow - self.signal
+
+        self.ring[self.bars % SMA_WINDOW] = close
+        self.bars += 1
+
+        def ewm(state, value, alpha):
+            return np.where(np.isnan(state), value, np.where(np.isnan(value), state, state + alpha * (value - state)))
+
+        self.ema_fast = ewm(self.ema_fast, close, 2.0 / (EMA_FAST + 1))
+        self.ema_slow = ewm(self.ema_slow, close, 2.0 / (EMA_SLOW + 1))
+        line = self.ema_fast - self.ema_slow
+        self.signal = ewm(self.signal, line, 2.0 / (MACD_SIGNAL + 1))
+
+        delta = close - previous
+        self.gain = ewm(self.gain, np.where(np.isnan(delta), np.nan, np.maximum(delta, 0)), 1.0 / RSI_WINDOW)
+        self.loss = ewm(self.loss, np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0)), 1.0 / RSI_WINDOW)
+
+        self.atr = ewm(self.atr, _true_range(high, low, previous), 1.0 / ATR_WINDOW)
+        self.close = close
+
+    def _window(self, window):
+        """Return the last window closes, oldest first; NaN rows before the first bars."""
+        # Rows not written yet are NaN, so the averages are NaN until window bars
+        return self.ring[(self.bars - window + np.arange(window)) % SMA_WINDOW]
+
+    def values(self):
+        """
+        Return the current value of every indicator.
+
+        Returns:
+            dict: An array over the symbols by indicator name.
+        """
+        fast, slow = self._window(SMA_FAST), self._window(SMA_SLOW)
+        # The windows are SMA_WINDOW closes at most, not the whole history
+        sma_fast = fast.sum(axis=0) / SMA_FAST
+        deviation = np.sqrt(np.maximum((fast * fast).sum(axis=0) / SMA_FAST - sma_fast * sma_fast, 0))
+        line = self.ema_fast - self.ema_slow
+        return {
+            "close": self.close,
+            "sma_fast": sma_fast,
+            "sma_slow": slow.sum(axis=0) / SMA_SLOW,
+            "ema_fast": self.ema_fast,
+            "ema_slow": self.ema_slow,
+            "macd": line,
+            "macd_signal": self.signal,
+            "macd_histogram": line - self.signal,
+            "macd_previous_histogram": self.previous_histogram,
+            "rsi": _rsi(self.gain, self.loss),
+            "bollinger_upper": sma_fast + BOLLINGER_WIDTH * deviation,
+            "bollinger_lower": sma_fast - BOLLINGER_WIDTH * deviation,
+            "atr": self.atr,
+        }
+
+    def subset(self, columns):
+        """Return a copy of the state of some columns."""
+        state = IndicatorState(len(columns))
+        state.bars = self.bars
+        for name, value in vars(self).items():
+            if isinstance(value, np.ndarray):
+                setattr(state, name, value[..., columns].copy())
+        return state
+
+    def resize(self, count):
+        """Add NaN columns for new symbols, appended at the end."""
+        for name, value in vars(self).items():
+            if isinstance(value, np.ndarray):
+                pad = np.full(value.shape[:-1] + (count - self.count,), np.nan)
+                setattr(self, name, np.concatenate([value, pad], axis=-1))
+        self.count = count
+
+
+_lock = threading.Lock()
+_saved = None
+
+
+def load(path=INDICATORS_PATH):
+    """
+    Return the saved state, reading it from disk on first use.
+
+    Returns:
+        dict: {"symbols", "last_date", "state"}, or None when there is no state yet.
+    """
+    global _saved  # pylint: disable=global-statement
+    with _lock:
+        if _saved is not None or not os.path.exists(path):
+            return _saved
+        try:
+            with open(path, "rb") as file:
+                _saved = pickle.load(file)
+        except (OSError, pickle.PickleError, EOFError, AttributeError) as e:
+            logger.error(f"Failed to read the indicator state: {e}")
+        return _saved
+
+
+def _save(saved, path):
+    global _saved  # pylint: disable=global-statement
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(saved, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logger.error(f"Failed to save the indicator state: {e}")
+    with _lock:
+        _saved = saved
+
+
+def _align(frame):
+    """Return the Close, High and Low of a multi-ticker download aligned to the universe registry."""
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+
+    frame = frame.copy()
+    frame.index = pd.DatetimeIndex(frame.index).tz_localize(None).normalize()
+    universe = registry()
+    return {field: universe.align(frame, field) for field in ("Close", "High", "Low")}
+
+
+def _recent_bars(symbols):
+    """Return the bars of the eligibility refresh aligned like _download(), None when they do not cover the symbols."""
+    from src.lib.eligibility import recent_bars  # pylint: disable=import-outside-toplevel
+
+    frame = recent_bars()
+    if frame is None or not set(symbols) <= set(frame.columns.get_level_values(1)):
+        return None
+    logger.info("Reusing the bars of the eligibility refresh for the indicator state")
+    return _align(frame)
+
+
+def _download(symbols, **kwargs):
+    """Download daily bars of symbols in chunks and align them to the universe registry."""
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    import yfinance as yf  # pylint: disable=import-outside-toplevel
+
+    frames = []
+    for start in range(0, len(symbols), INDICATORS_CHUNK):
+        chunk = symbols[start : start + INDICATORS_CHUNK]
+        frame = yf.download(chunk, interval="1d", progress=False, **kwargs)
+        if frame.empty:
+            continue
+        if getattr(frame.columns, "nlevels", 1) == 1:
+            frame = pd.concat({chunk[0]: frame}, axis=1).swaplevel(axis=1)
+        frames.append(frame)
+    if not frames:
+        return None
+    return _align(pd.concat(frames, axis=1))
+
+
+def refresh(path=INDICATORS_PATH, today=None):
+    """
+    Add the daily bars closed since the last refresh to the state of every BIST stock,
+    or build it from a year of bars.
+
+    Returns:
+        dict: The saved state.
+    """
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+
+    universe = registry()
+    today = today or date.today()
+    saved = load(path)
+    if saved is not None and universe.symbols[: len(saved["symbols"])] != saved["symbols"]:
+        logger.warning("The symbols of the universe changed, rebuilding the indicator state")
+        saved = None
+    # The year of bars refresh_eligibility downloaded just before covers both a first
+    # run and the days since the last one
+    symbols = universe["bist_stocks"].symbols()
+    bars = _recent_bars(symbols)
+    if saved is None:
+        bars = bars or _download(symbols, period="1y")
+        state, last_date = IndicatorState(len(universe)), None
+    else:
+        bars = bars or _download(symbols, start=saved["last_date"] + timedelta(days=1))
+        state, last_date = saved["state"], saved["last_date"]
+        if state.count < len(universe):
+            state.resize(len(universe))
+    added = 0
+    if bars is not None:
+        close, high, low = (bars[field] for field in ("Close", "High", "Low"))
+        # Only closed bars go into the state; today's bar is still moving
+        for day in close.index:
+            if day.date() >= today or (last_date is not None and day.date() <= last_date):
+                continue
+            state.update(close.loc[day].to_numpy(), high.loc[day].to_numpy(), low.loc[day].to_numpy())
+            last_date = day.date()
+            added += 1
+    if last_date is None:
+        logger.error("No bars for the indicator state")
+        return saved
+    saved = {"symbols": list(universe.symbols), "last_date": last_date, "state": state}
+    _save(saved, path)
+    logger.info(f"Indicator state updated with {added} bars, last bar on {last_date}")
+    return saved
+
+
+def refresh_indicators():
+    """Add the bars of the last sessions to the indicators of every BIST stock."""
+    logger.start("Running refresh_indicators")
+    try:
+        refresh()
+        logger.ok("refresh_indicators worked successfully.")
+    except Exception as e:
+        logger.error(f"Failed to refresh the indicators: {e}")
+
+
+def latest_values(symbol, price=None, history=None, today=None):
+    """
+    Return the indicators of a symbol, with the current price as the last bar.
+
+    Args:
+        symbol (str): Yahoo symbol, e.g. "AKBNK.IS".
+        price (float, optional): Current price, added as a provisional bar.
+        history (pandas.DataFrame, optional): Daily bars of the symbol, used when the
+            saved state does not have it or is too old.
+        today (date, optional): Today, for the age of the state.
+
+    Returns:
+        dict: The value of every indicator, or None without data.
+    """
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+
+    today = today or date.today()
+    saved = load()
+    state = None
+    if saved is not None and (today - saved["last_date"]).days <= INDICATORS_MAX_AGE and symbol in registry().ids:
+        column = registry().id(symbol)
+        if column < saved["state"].count:
+            state = saved["state"].subset([column])
+    if state is None and history is not None and not history.empty:
+        closed = history[history.index.date < today]
+        state = IndicatorState.from_history(closed["Close"].to_numpy(), closed["High"].to_numpy(), closed["Low"].to_numpy())
+    if state is None or not state.bars:
+        return None
+    if isinstance(price, (int, float)) and price > 0:
+        state.update(np.array([price], dtype=float))
+    return {name: float(value[0]) for name, value in state.values().items()}
+
+
+def format_signals(values):
+    """
+    Format the signals section of a post.
+
+    Args:
+        values (dict): Indicators of a stock, as returned by latest_values().
+
+    Returns:
+        str: The section, empty without values.
+    """
+    if not values:
+        return ""
+    lines = ["📊 Teknik Göstergeler"]
+    if not np.isnan(values["rsi"]):
+        rsi_value = values["rsi"]
+        zone = "aşırı alım" if rsi_value >= 70 else "aşırı satım" if rsi_value <= 30 else "nötr"
+        lines.append(f"RSI(14): {rsi_value:.1f} ({zone})")
+    if not np.isnan(values["macd_histogram"]):
+        histogram, previous = values["macd_histogram"], values["macd_previous_histogram"]
+        if not np.isnan(previous) and (histogram > 0) != (previous > 0):
+            lines.append(f"MACD: sinyal çizgisini {'yukarı' if histogram > 0 else 'aşağı'} kesti")
+        else:
+            lines.append(f"MACD: sinyal çizgisinin {'üzerinde' if histogram > 0 else 'altında'}")
+    if not np.isnan(values["sma_slow"]):
+        side = "üzerinde" if values["close"] >= values["sma_slow"] else "altında"
+        lines.append(f"Fiyat 50 günlük ortalamanın ({values['sma_slow']:.2f}) {side}")
+    if not np.isnan(values["bollinger_upper"]):
+        if values["close"] > values["bollinger_upper"]:
+            lines.append("Bollinger: üst bandın üzerinde")
+        elif values["close"] < values["bollinger_lower"]:
+            lines.append("Bollinger: alt bandın altında")
+    if not np.isnan(values["atr"]) and values["close"]:
+        lines.append(f"ATR(14): {values['atr']:.2f} (%{values['atr'] / values['close'] * 100:.1f})")
+    return "\n".join(lines) if len(lines) > 1 else ""
+
+
+def stock_signals(symbol, price=None, history=None):
+    """Return the signals section of a post about a stock; empty when it cannot be computed."""
+    try:
+        return format_signals(latest_values(symbol, price, history))
+    except Exception as e:
+        logger.error(f"Failed to compute the signals of {symbol}: {e}")
+        return ""
+
+
+def screen(condition, set_name="bist_all"):
+    """
+    Return the stocks of a list of the universe whose indicators meet a condition.
+
+    Args:
+        condition (callable): Takes the values of IndicatorState.values() and returns a
+            boolean array, e.g. ``lambda v: v["rsi"] < 30``.
+        set_name (str): List of the universe registry to screen.
+
+    Returns:
+        list: Names of the stocks, e.g. "AKBNK"; empty without a state.
+    """
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+
+    saved = load()
+    if saved is None:
+        return []
+    universe = registry()
+    state = saved["state"]
+    values = state.values()
+    with np.errstate(invalid="ignore"):
+        matches = np.asarray(condition(values), dtype=bool) & universe[set_name].mask()[: state.count]
+    return [universe.names[column] for column in np.flatnonzero(matches)]
@@ -0,0 +1,172 @@
+"""
+This module keeps a rolling window of intraday bars per symbol.
+
+The 7-day chart of BIST100 used to download a week of 15-minute bars and resample them
+to hours on every post. An IntradayStore keeps the closes of the window and their
+hourly resample instead: each update downloads only the bars from the last stored bar
+on (it may have been incomplete), replaces the overlap, appends the rest, and
+resamples only the hours the new bars fall in, plus the interpolated hours since the
+last hour with bars. Bars and hours older than the window are evicted, so a post
+costs a small delta fetch and an update in the number of new bars.
+
+Stores are saved in INTRADAY_DIR after each update, so a restart starts from the
+saved window rather than a full download.
+"""
+
+import logging
+import os
+import pickle
+import threading
+from collections import namedtuple
+from datetime import timedelta
+
+import pandas as pd
+
+from src.lib.data_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+INTRADAY_DIR = os.getenv("INTRADAY_DIR", os.path.join(CACHE_DIR, "intraday"))
+
+IntradayWindow = namedtuple("IntradayWindow", ["interval", "length", "resample"], defaults=("15m", timedelta(days=7), "1h"))
+IntradayWindow.__doc__ = """
+Bars kept by an IntradayStore.
+
+Args:
+    interval (str): Interval of the bars, e.g. "15m".
+    length (timedelta): Age of the oldest bar kept.
+    resample (str): Rule of the resample, e.g. "1h"; hours without bars are
+        interpolated in time like the chart did.
+"""
+
+
+def _closes(frame):
+    """Return the closes of a single-ticker download as a Series."""
+    if frame is None or frame.empty:
+        return pd.Series(dtype=float)
+    closes = frame["Close"]
+    if isinstance(closes, pd.DataFrame):
+        closes = closes.iloc[:, 0]
+    return closes.dropna()
+
+
+class IntradayStore:
+    """
+    Rolling window of the intraday closes of a symbol and their resample.
+
+    Args:
+        symbol (str): Yahoo symbol, e.g. "XU100.IS".
+        window (IntradayWindow): Interval, length and resample of the bars kept.
+        state_dir (str, optional): Directory to save the store in; None keeps it in memory only.
+    """
+
+    def __init__(self, symbol, window=IntradayWindow(), state_dir=INTRADAY_DIR):
+        self.symbol = symbol
+        self.window = window
+        self.path = os.path.join(state_dir, f"{symbol}_{window.interval}.pkl") if state_dir else None
+        self.bars = pd.Series(dtype=float)
+        self.resampled = pd.Series(dtype=float)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as file:
+                self.bars, self.resampled = pickle.load(file)
+        except (OSError, pickle.PickleError, EOFError, ValueError) as e:
+            logger.error(f"Failed to read the intraday bars of {self.symbol}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "wb") as file:
+                pickle.dump((self.bars, self.resampled), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            logger.error(f"Failed to save the intraday bars of {self.symbol}: {e}")
+
+    def merge(self, new):
+        """
+        Merge new bars into the window and update the resample of the hours they touch.
+
+        Args:
+            new (pandas.Series): Closes of the new bars, oldest first; they replace the
+                stored bars from their first one on.
+
+        Returns:
+            int: Number of bars merged.
+        """
+        if new.empty:
+            return 0
+        if not self.bars.empty and self.bars.index.tz is not None and new.index.tz is not None:
+            new = new.tz_convert(self.bars.index.tz)
+        first = new.index[0]
+        bars = new if self.bars.empty else pd.concat([self.bars[self.bars.index < first], new])
+        rule = self.window.resample
+        cutoff = pd.Timestamp.now(tz=bars.index.tz) - self.window.length
+        self.bars = bars[bars.index >= cutoff]
+
+        # Only the hours from the first new bar on change, and the interpolated hours
+        # between them and the last hour with bars before them
+        before = bars[bars.index < first.floor(rule)]
+        start = before.index[-1].floor(rule) if not before.empty else first.floor(rule)
+        kept = self.resampled[self.resampled.index < start] if not self.resampled.empty else self.resampled
+        fresh = bars[bars.index >= start].resample(rule).mean().interpolate(method="time")
+        resampled = pd.concat([kept, fresh]) if not kept.empty else fresh
+        self.resampled = resampled[resampled.index >= cutoff.floor(rule)]
+        return len(new)
+
+    def update(self):
+        """
+        Download the bars since the last stored bar, or the whole window when empty.
+
+        Returns:
+            int: Number of bars merged.
+        """
+        import yfinance as yf  # pylint: disable=import-outside-toplevel
+
+        with self._lock:
+            if not self.bars.empty and self.bars.index[-1] < pd.Timestamp.now(tz=self.bars.index.tz) - self.window.length:
+                logger.info(f"Intraday bars of {self.symbol} are older than the window, downloading it again")
+                self.bars, self.resampled = pd.Series(dtype=float), pd.Series(dtype=float)
+            if self.bars.empty:
+                start = (pd.Timestamp.now() - self.window.length).strftime("%Y-%m-%d")
+            else:
+                start = self.bars.index[-1]
+            frame = yf.download(self.symbol, start=start, interval=self.window.interval, progress=False)
+            count = self.merge(_closes(frame))
+            if count:
+                self._save()
+            logger.info(f"Intraday bars of {self.symbol} updated with {count} bars, {len(self.bars)} in the window")
+            return count
+
+    def series(self, update=True):
+        """
+        Return the resampled closes of the window.
+
+        Args:
+            update (bool): Fetch the new bars first.
+
+        Returns:
+            pandas.Series: Closes by resampled time, oldest first.
+        """
+        if update:
+            self.update()
+        with self._lock:
+            return self.resampled.copy()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def intraday_store(symbol, interval="15m"):
+    """Return the process-wide store of a symbol, created on first use."""
+    with _stores_lock:
+        if (symbol, interval) not in _stores:
+            _stores[(symbol, interval)] = IntradayStore(symbol, IntradayWindow(interval))
+        return _stores[(symbol, interval)]
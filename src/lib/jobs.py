@@ -0,0 +1,262 @@
+"""
+This module holds the registry of the scheduled jobs.
+
+Job modules pull in matplotlib, yfinance (and with it pandas) and requests, so they
+are only imported the first time one of their jobs runs. This keeps the start-up of
+``main.py`` cheap; the matplotlib font cache is warmed in a background thread instead.
+"""
+
+import importlib
+import logging
+import time
+from threading import Thread
+
+from src.lib.budget import Budget, enforce_budget
+from src.lib.memory import track_memory
+from src.lib.planner import DataNeed, ScheduledJob, serve_prefetched
+from src.lib.profiling import run_profiled
+from src.lib.triggers import Trigger
+
+logger = logging.getLogger(__name__)
+
+JOBS = {
+    "bist30_change": "src.bist.bist_30_change:bist30_change",
+    "bist_comp": "src.bist.bist_comp:bist_comp",
+    "bist30_correlation": "src.bist.bist30_correlation:bist30_correlation",
+    "send_bist_open": "src.bist.bist_open_close:send_bist_open",
+    "send_bist_close": "src.bist.bist_open_close:send_bist_close",
+    "bist_sector_info": "src.bist.bist_sector_info:bist_sector_info",
+    "bist_sector_stock_info": "src.bist.bist_sector_stock_info:bist_sector_stock_info",
+    "bist_stock_by_time": "src.bist.bist_stock_by_time:bist_stock_by_time",
+    "halka_arz": "src.bist.halka_arz:halka_arz",
+    "commodity_price": "src.commodity.commodity_price:commodity_price",
+    "gold_price": "src.commodity.gold_price:gold_price",
+    "analyze_silver_prices": "src.commodity.silver_price:analyze_silver_prices",
+    "crypto_send": "src.crypto.crypto_utils:crypto_send",
+    "currency_send": "src.etc.exchange_rates:currency_send",
+    "analyze_long_term_stock": "src.etc.long_term_performance:analyze_long_term_stock",
+    "us_open": "src.us.us_open_close:us_open",
+    "us_close": "src.us.us_open_close:us_close",
+    # Render-ahead jobs build the charts of the jobs above before they run, see src/lib/render_ahead.py
+    "prepare_bist_graph": "src.bist.bist_open_close:prepare_bist_graph",
+    "prepare_commodity_chart": "src.commodity.commodity_price:prepare_commodity_chart",
+    "prepare_gold_chart": "src.commodity.gold_price:prepare_gold_chart",
+    "prepare_bitcoin_graph": "src.crypto.crypto_utils:prepare_bitcoin_graph",
+    "prepare_bist_stock_graph": "src.bist.bist_stock_by_time:prepare_bist_stock_graph",
+    "refresh_eligibility": "src.lib.eligibility:refresh_eligibility",
+    "refresh_indicators": "src.lib.indicators:refresh_indicators",
+    "refresh_sector_profiles": "src.lib.sectors:refresh_sector_profiles",
+    "refresh_risk_metrics": "src.lib.risk:refresh_risk_metrics",
+    "refresh_seasonality": "src.lib.seasonality:refresh_seasonality",
+}
+
+MB = 1024 * 1024
+
+# Most outbound data requests and bytes a run may use, see src/lib/budget.py.
+# Request limits leave room for the cookie and crumb requests yfinance makes first.
+BUDGETS = {
+    "bist30_change": Budget(requests=6, bytes=1 * MB),
+    "bist_comp": Budget(requests=10, bytes=2 * MB),
+    # Six months of bars of the BIST30 stocks and XU100 on the first run, a day after that
+    "bist30_correlation": Budget(requests=40, bytes=4 * MB),
+    "send_bist_open": Budget(requests=8, bytes=2 * MB),
+    "send_bist_close": Budget(requests=8, bytes=2 * MB),
+    # Five days of bars of every sector constituent, one request per symbol, and the
+    # sector indices with SECTOR_CROSS_CHECK=1
+    "bist_sector_info": Budget(requests=140, bytes=4 * MB),
+    "bist_sector_stock_info": Budget(requests=30, bytes=5 * MB),
+    "bist_stock_by_time": Budget(requests=8, bytes=2 * MB),
+    "halka_arz": Budget(requests=12, bytes=4 * MB),
+    "commodity_price": Budget(requests=8, bytes=2 * MB),
+    "gold_price": Budget(requests=8, bytes=2 * MB),
+    "analyze_silver_prices": Budget(requests=6, bytes=2 * MB),
+    "crypto_send": Budget(requests=12, bytes=1 * MB),
+    # One multi-ticker download of the twelve base rates of src/lib/fx.py
+    "currency_send": Budget(requests=16, bytes=1 * MB),
+    "analyze_long_term_stock": Budget(requests=8, bytes=2 * MB),
+    "us_open": Budget(requests=8, bytes=1 * MB),
+    "us_close": Budget(requests=8, bytes=4 * MB),
+    "prepare_bist_graph": Budget(requests=4, bytes=1 * MB),
+    "prepare_commodity_chart": Budget(requests=4, bytes=1 * MB),
+    "prepare_gold_chart": Budget(requests=4, bytes=1 * MB),
+    "prepare_bitcoin_graph": Budget(requests=4, bytes=1 * MB),
+    "prepare_bist_stock_graph": Budget(requests=4, bytes=1 * MB),
+    # A year of daily bars of every stock of the universes, one request per symbol
+    "refresh_eligibility": Budget(requests=500, bytes=40 * MB),
+    # Reuses the bars of refresh_eligibility; without them, the bars of every BIST
+    # stock, one request per symbol
+    "refresh_indicators": Budget(requests=500, bytes=40 * MB),
+    # One info call per sector stock the first time, only the stale profiles after that
+    "refresh_sector_profiles": Budget(requests=150, bytes=10 * MB),
+    # Eleven years of closes of every US stock on the first run, a day after that
+    "refresh_risk_metrics": Budget(requests=110, bytes=60 * MB),
+    # The whole daily history of every commodity the first time, a month of bars after that
+    "refresh_seasonality": Budget(requests=10, bytes=10 * MB),
+}
+
+# Seconds after the start of a run by which the data must be fetched so the post goes
+# out on time; past it the jobs use cached data, see src/lib/data_cache.py
+DEADLINES = {
+    "send_bist_open": 60,
+    "send_bist_close": 60,
+    "bist30_change": 60,
+    "bist_comp": 90,
+    "us_open": 60,
+    "us_close": 60,
+    "crypto_send": 60,
+    "gold_price": 60,
+    "commodity_price": 60,
+    "currency_send": 60,
+}
+
+# Jobs published once their print is available rather than at a fixed time, see src/lib/triggers.py
+TRIGGERS = {
+    "send_bist_open": Trigger("XU100.IS", "open", "BIST"),
+    "send_bist_close": Trigger("XU100.IS", "close", "BIST"),
+    "us_open": Trigger("^GSPC", "open", "NYSE"),
+    "us_close": Trigger("^GSPC", "close", "NYSE"),
+}
+
+# Jobs about one market, skipped on the days it is closed, see src/lib/trading_calendar.py
+MARKETS = {
+    "send_bist_open": "BIST",
+    "send_bist_close": "BIST",
+    "prepare_bist_graph": "BIST",
+    "bist30_change": "BIST",
+    "bist_comp": "BIST",
+    "bist30_correlation": "BIST",
+    "bist_sector_info": "BIST",
+    "halka_arz": "BIST",
+    "us_open": "NYSE",
+    "us_close": "NYSE",
+}
+
+# History fetched by the jobs, prefetched by the planner before they run, see src/lib/planner.py
+BITCOIN_MONTH = DataNeed("history", ("BTC-USD",), "1mo")
+GOLD_YEAR = DataNeed("history", ("GC=F",), "1y")
+SILVER_MAX = DataNeed("history", ("SI=F",), "max")
+BIST_COMP_YEAR = DataNeed("download", ("XU030.IS", "XU100.IS"), "1y")
+
+
+def commodity_year(ticker):
+    """Return the history the chart of a commodity needs."""
+    return DataNeed("download", (ticker,), "1y")
+
+
+def upcoming(rotation):
+    """Return the symbols of the next pick of a rotation, resolved when the planner runs."""
+
+    def symbols():
+        from src.lib.rotation import upcoming_symbols  # pylint: disable=import-outside-toplevel
+
+        return upcoming_symbols(rotation)
+
+    return symbols
+
+
+STOCK_YEAR = DataNeed("history", upcoming("bist_stock_by_time"), "1y")
+LONG_TERM_YEAR = DataNeed("download", upcoming("analyze_long_term_stock"), "1y")
+
+
+# When the jobs run, in Istanbul time; main.py schedules them from this list. Jobs with
+# a trigger start earlier, see TRIGGERS.
+SCHEDULE = [
+    ScheduledJob("06:00", "refresh_eligibility"),
+    ScheduledJob("06:10", "refresh_indicators"),
+    ScheduledJob("06:20", "refresh_sector_profiles"),
+    ScheduledJob("06:25", "prepare_bitcoin_graph", weekdays=False, needs=(BITCOIN_MONTH,)),
+    ScheduledJob("06:30", "crypto_send", weekdays=False, needs=(BITCOIN_MONTH,)),
+    ScheduledJob("06:40", "refresh_risk_metrics"),
+    ScheduledJob("06:45", "refresh_seasonality"),
+    ScheduledJob("10:55", "prepare_bist_stock_graph", weekdays=False, needs=(STOCK_YEAR,)),
+    ScheduledJob("11:00", "bist_stock_by_time", weekdays=False, needs=(STOCK_YEAR,)),
+    ScheduledJob("14:55", "prepare_bist_stock_graph", weekdays=False, needs=(STOCK_YEAR,)),
+    ScheduledJob("15:00", "bist_stock_by_time", weekdays=False, needs=(STOCK_YEAR,)),
+    ScheduledJob("17:30", "analyze_long_term_stock", weekdays=False, needs=(LONG_TERM_YEAR,)),
+    ScheduledJob("18:55", "prepare_bist_stock_graph", weekdays=False, needs=(STOCK_YEAR,)),
+    ScheduledJob("19:00", "bist_stock_by_time", weekdays=False, needs=(STOCK_YEAR,)),
+    ScheduledJob("23:49", "analyze_long_term_stock", weekdays=False, needs=(LONG_TERM_YEAR,)),
+    ScheduledJob("10:17", "send_bist_open"),
+    ScheduledJob("10:20", "halka_arz"),
+    ScheduledJob("10:25", "prepare_gold_chart", needs=(GOLD_YEAR,)),
+    ScheduledJob("10:30", "gold_price", needs=(GOLD_YEAR,)),
+    ScheduledJob("11:30", "analyze_silver_prices", needs=(SILVER_MAX,)),
+    ScheduledJob("12:30", "currency_send"),
+    ScheduledJob("13:25", "prepare_commodity_chart", ("NG=F", "Doğal Gaz"), needs=(commodity_year("NG=F"),)),
+    ScheduledJob("13:30", "commodity_price", ("NG=F", "Doğal Gaz"), needs=(commodity_year("NG=F"),)),
+    ScheduledJob("16:00", "bist30_change"),
+    ScheduledJob("16:25", "prepare_gold_chart", needs=(GOLD_YEAR,)),
+    ScheduledJob("16:30", "gold_price", needs=(GOLD_YEAR,)),
+    ScheduledJob("16:46", "us_open"),
+    ScheduledJob("17:55", "prepare_bitcoin_graph", needs=(BITCOIN_MONTH,)),
+    ScheduledJob("18:00", "crypto_send", needs=(BITCOIN_MONTH,)),
+    ScheduledJob("18:00", "prepare_bist_graph"),
+    ScheduledJob("18:17", "send_bist_close"),
+    ScheduledJob("19:30", "bist30_change"),
+    ScheduledJob("19:55", "prepare_commodity_chart", ("CL=F", "Ham Petrol"), needs=(commodity_year("CL=F"),)),
+    ScheduledJob("20:00", "commodity_price", ("CL=F", "Ham Petrol"), needs=(commodity_year("CL=F"),)),
+    ScheduledJob("20:30", "bist30_change"),
+    ScheduledJob("22:16", "bist_comp", needs=(BIST_COMP_YEAR,)),
+    ScheduledJob("22:20", "bist30_correlation"),
+    ScheduledJob("23:16", "us_close"),
+    ScheduledJob("23:25", "prepare_commodity_chart", ("HO=F", "Kalorifer Yakıtı"), needs=(commodity_year("HO=F"),)),
+    ScheduledJob("23:30", "commodity_price", ("HO=F", "Kalorifer Yakıtı"), needs=(commodity_year("HO=F"),)),
+]
+
+_loaded = {}
+
+
+def get_job(name):
+    """
+    Get the function of a registered job, importing its module on first use.
+
+    Args:
+        name (str): Name of the job in JOBS.
+
+    Returns:
+        callable: The job function.
+
+    Raises:
+        KeyError: If the job is not registered.
+    """
+    if name not in _loaded:
+        module_name, func_name = JOBS[name].split(":")
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        _loaded[name] = getattr(module, func_name)
+        logger.info(f"Loaded job {name} from {module_name} in {time.perf_counter() - start:.2f}s")
+    return _loaded[name]
+
+
+def run_job(name, *args):
+    """
+    Run a registered job so it can be profiled on demand, its memory and requests
+    tracked, its history served from prefetched bars, and its fetches kept within its
+    publish deadline.
+
+    Args:
+        name (str): Name of the job in JOBS.
+        *args: Arguments passed to the job.
+    """
+    from src.lib.data_cache import publish_deadline  # pylint: disable=import-outside-toplevel
+
+    func = get_job(name)
+    with track_memory(name), enforce_budget(name), serve_prefetched(), publish_deadline(DEADLINES.get(name)):
+        return run_profiled(name, func, *args)
+
+
+def _warm_up_matplotlib():
+    """Import pyplot and load the font cache so the first chart does not pay for it."""
+    try:
+        start = time.perf_counter()
+        from matplotlib import font_manager, pyplot  # pylint: disable=import-outside-toplevel,unused-import
+
+        font_manager.findfont(font_manager.FontProperties())
+        logger.info(f"matplotlib warmed up in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        logger.error(f"Failed to warm up matplotlib: {e}")
+
+
+def warm_up_in_background():
+    """Start warming up the heavy libraries in a daemon thread."""
+    Thread(target=_warm_up_matplotlib, name="warm-up", daemon=True).start()
@@ -0,0 +1,29 @@
+"""
+This module adds the custom START and OK log levels used by the jobs.
+
+Jobs call ``logger.start(...)`` when they begin and ``logger.ok(...)`` when they
+finish successfully, so every entry point has to install the levels before a job runs.
+"""
+
+import logging
+
+OK_LEVEL_NUM = 22
+START_LEVEL_NUM = 21
+
+
+def ok(self, message, *args, **kwargs):
+    if self.isEnabledFor(OK_LEVEL_NUM):
+        self._log(OK_LEVEL_NUM, message, args, **kwargs)  # pylint: disable=protected-access
+
+
+def start(self, message, *args, **kwargs):
+    if self.isEnabledFor(START_LEVEL_NUM):
+        self._log(START_LEVEL_NUM, message, args, **kwargs)  # pylint: disable=protected-access
+
+
+def install_log_levels():
+    """Register the START and OK levels and add ``start``/``ok`` to every logger."""
+    logging.addLevelName(OK_LEVEL_NUM, "OK")
+    logging.addLevelName(START_LEVEL_NUM, "START")
+    logging.Logger.ok = ok
+    logging.Logger.start = start
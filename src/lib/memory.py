@@ -0,0 +1,143 @@
+"""
+This module records the memory use of the scheduled jobs.
+
+For every job run the resident set size (RSS) is measured before and after the job,
+after a garbage collection, so the delta is the memory the job retained. When
+tracemalloc is enabled (MEMORY_TRACEMALLOC=1), the top allocation sites that grew
+during the run are recorded as well. A warning is logged when a job keeps retaining
+memory across consecutive runs.
+"""
+
+import gc
+import logging
+import os
+import resource
+import threading
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+MEMORY_HISTORY = int(os.getenv("MEMORY_HISTORY", "50"))
+MEMORY_TRACEMALLOC = os.getenv("MEMORY_TRACEMALLOC", "0") == "1"
+MEMORY_TOP_ALLOCATIONS = int(os.getenv("MEMORY_TOP_ALLOCATIONS", "10"))
+MEMORY_ALERT_RUNS = int(os.getenv("MEMORY_ALERT_RUNS", "3"))
+MEMORY_ALERT_BYTES = int(os.getenv("MEMORY_ALERT_BYTES", str(50 * 1024 * 1024)))
+
+_history = defaultdict(lambda: deque(maxlen=MEMORY_HISTORY))
+_alerts = deque(maxlen=MEMORY_HISTORY)
+_lock = threading.Lock()
+
+
+def get_rss():
+    """
+    Get the current resident set size of the process.
+
+    Returns:
+        int: RSS in bytes. Where /proc is not available, the peak RSS is returned instead.
+    """
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as file:
+            resident_pages = int(file.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def format_bytes(value):
+    """Format a byte count as a signed human readable string."""
+    sign = "-" if value < 0 else ""
+    value = abs(value)
+    for unit in ("B", "KB", "MB"):
+        if value < 1024:
+            return f"{sign}{value:.1f} {unit}"
+        value /= 1024
+    return f"{sign}{value:.1f} GB"
+
+
+def enable_tracemalloc():
+    """Start tracemalloc so the next job runs record their top allocations."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        logger.info("tracemalloc started for job memory snapshots.")
+
+
+def _top_allocations(before, after):
+    """Return the allocation sites that grew the most between two snapshots."""
+    stats = after.compare_to(before, "lineno")
+    return [
+        {"location": str(stat.traceback), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+        for stat in stats[:MEMORY_TOP_ALLOCATIONS]
+        if stat.size_diff > 0
+    ]
+
+
+def _check_growth(job_name, runs):
+    """Log and record an alert if the job retained memory on each of its last runs."""
+    recent = list(runs)[-MEMORY_ALERT_RUNS:]
+    if len(recent) < MEMORY_ALERT_RUNS or any(run["rss_delta"] <= 0 for run in recent):
+        return
+    growth = sum(run["rss_delta"] for run in recent)
+    if growth < MEMORY_ALERT_BYTES:
+        return
+    alert = {
+        "job": job_name,
+        "time": recent[-1]["time"],
+        "runs": MEMORY_ALERT_RUNS,
+        "growth": growth,
+    }
+    _alerts.append(alert)
+    logger.warning(f"Memory alert: {job_name} retained {format_bytes(growth)} over its last {MEMORY_ALERT_RUNS} runs")
+
+
+@contextmanager
+def track_memory(job_name):
+    """
+    Record the RSS delta (and tracemalloc top allocations, if enabled) of a job run.
+
+    Args:
+        job_name (str): Name of the scheduled job.
+    """
+    if MEMORY_TRACEMALLOC:
+        enable_tracemalloc()
+    tracing = tracemalloc.is_tracing()
+
+    gc.collect()
+    snapshot_before = tracemalloc.take_snapshot() if tracing else None
+    rss_before = get_rss()
+    try:
+        yield
+    finally:
+        gc.collect()
+        rss_after = get_rss()
+        record = {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+            "rss_delta": rss_after - rss_before,
+            "top_allocations": _top_allocations(snapshot_before, tracemalloc.take_snapshot()) if tracing else [],
+        }
+        with _lock:
+            _history[job_name].append(record)
+            _check_growth(job_name, _history[job_name])
+        logger.info(f"Memory for {job_name}: RSS {format_bytes(rss_after)} ({format_bytes(record['rss_delta'])})")
+
+
+def memory_report():
+    """
+    Build a report of the recorded job memory use.
+
+    Returns:
+        dict: Current RSS, whether tracemalloc is on, the per-job history and the alerts.
+    """
+    with _lock:
+        return {
+            "rss": get_rss(),
+            "tracemalloc": tracemalloc.is_tracing(),
+            "jobs": {job_name: list(runs) for job_name, runs in _history.items()},
+            "alerts": list(_alerts),
+        }
@@ -0,0 +1,345 @@
+"""
+This module plans the data fetches of the scheduled jobs and makes them ahead of time.
+
+Every job in SCHEDULE (src/lib/jobs.py) declares its time, whether it runs on weekdays
+only, and the history it needs: the symbols, the range and the interval of its bars.
+Once a minute the planner looks at the jobs due in the next PREFETCH_LOOKAHEAD minutes,
+takes the union of their needs, keeps the widest range per symbol and interval, and
+fetches it in one pass: one multi-ticker ``yf.download`` per range and interval, and
+one ``Ticker.history`` per symbol for the jobs that read ticker histories. Needs that are already fetched
+are skipped, so jobs at the same time, or a render-ahead job and its post, share the
+data.
+
+While a job runs, a PrefetchProvider serves its history requests for the range that
+was prefetched, and passes everything else through. Only history goes through the
+planner: quotes and prints must be fresh when the job runs, so they are not declared,
+and shorter requests within a prefetched range, e.g. ``period="1d"`` for the latest
+price, are not served from it either.
+Prefetched data is dropped after PREFETCH_TTL minutes.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv("PREFETCH", "1") == "1"
+PREFETCH_LOOKAHEAD = int(os.getenv("PREFETCH_LOOKAHEAD", "10"))
+PREFETCH_TTL = int(os.getenv("PREFETCH_TTL", "20"))
+# Days a requested start date may differ from the start of the prefetched range
+PREFETCH_RANGE_SLACK = 7
+
+DataNeed = namedtuple("DataNeed", ["kind", "symbols", "period", "interval"], defaults=("1d",))
+DataNeed.__doc__ = """
+History a job needs.
+
+Args:
+    kind (str): "download" for ``yf.download`` or "history" for ``Ticker.history``, the
+        call the job makes, so the prefetched bars are exactly what the job would get.
+    symbols (tuple or callable): Symbols of the bars, or a function returning them when
+        the planner runs, e.g. the next pick of a rotation.
+    period (str): Range of the bars as a yfinance period, e.g. "1y"; jobs asking for a
+        ``start`` date are covered when it is the start of the period, within
+        PREFETCH_RANGE_SLACK days.
+    interval (str): Interval of the bars, e.g. "1d" or "15m".
+"""
+
+ScheduledJob = namedtuple("ScheduledJob", ["at", "name", "args", "weekdays", "needs"], defaults=((), True, ()))
+ScheduledJob.__doc__ = """
+A scheduled run of a job.
+
+Args:
+    at (str): Time of the run in Istanbul, e.g. "10:30".
+    name (str): Name of the job in JOBS.
+    args (tuple): Arguments of the job.
+    weekdays (bool): Run on weekdays only.
+    needs (tuple): DataNeed of the history the run fetches.
+"""
+
+Prefetched = namedtuple("Prefetched", ["frame", "period", "fetched_at"])
+
+# A history request made to the PrefetchProvider, with the defaults of yfinance filled in
+HistoryRequest = namedtuple("HistoryRequest", ["kind", "symbol", "interval", "period", "start", "end"])
+
+_DAYS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+
+
+def period_days(period):
+    """Return the calendar days a yfinance period covers at most; None for "max"."""
+    if period == "max":
+        return None
+    if period == "ytd":
+        return datetime.now().timetuple().tm_yday
+    for unit, days in _DAYS.items():
+        if period.endswith(unit) and period[: -len(unit)].isdigit():
+            return int(period[: -len(unit)]) * days
+    raise ValueError(f"Invalid period: {period}")
+
+
+def _wider(period, other):
+    """Return the wider of two periods."""
+    days, other_days = period_days(period), period_days(other)
+    if days is None or (other_days is not None and days >= other_days):
+        return period
+    return other
+
+
+def due_jobs(schedule, now, minutes, start_time=None, runs_on=None):
+    """
+    Return the scheduled runs due within the next minutes.
+
+    Args:
+        schedule (list): ScheduledJob entries.
+        now (datetime): Current time in Istanbul.
+        minutes (int): Minutes to look ahead.
+        start_time (callable, optional): Maps a run to the time it actually starts at,
+            e.g. earlier than ``at`` for triggered jobs.
+        runs_on (callable, optional): Called with a run and a date, returns False when
+            the run is skipped that day, e.g. on a market holiday.
+
+    Returns:
+        list: The ScheduledJob entries due.
+    """
+    due = []
+    for job in schedule:
+        at = start_time(job) if start_time else job.at
+        hour, minute = map(int, at.split(":"))
+        run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        if run_at - now > timedelta(minutes=minutes):
+            continue
+        if job.weekdays and run_at.weekday() >= 5:
+            continue
+        if runs_on is not None and not runs_on(job, run_at.date()):
+            continue
+        due.append(job)
+    return due
+
+
+def plan(jobs):
+    """
+    Take the union of the data needs of jobs.
+
+    Returns:
+        dict: Symbols by (kind, period, interval), with the widest period per symbol,
+        kind and interval.
+    """
+    widest = {}
+    for job in jobs:
+        for need in job.needs:
+            for symbol in _symbols(need):
+                key = (need.kind, symbol, need.interval)
+                widest[key] = _wider(need.period, widest[key]) if key in widest else need.period
+    batches = defaultdict(list)
+    for (kind, symbol, interval), period in sorted(widest.items()):
+        batches[(kind, period, interval)].append(symbol)
+    return dict(batches)
+
+
+def _symbols(need):
+    """Return the symbols of a need, calling it for needs known only when the planner runs."""
+    if not callable(need.symbols):
+        return need.symbols
+    try:
+        return need.symbols()
+    except Exception as e:
+        logger.error(f"Failed to resolve the symbols of a {need.kind} need: {e}")
+        return ()
+
+
+class PrefetchStore:
+    """Prefetched bars by kind, symbol and interval."""
+
+    def __init__(self, ttl=PREFETCH_TTL * 60):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def put(self, kind, symbol, interval, entry):
+        with self._lock:
+            self._entries[(kind, symbol, interval)] = entry
+
+    def get(self, kind, symbol, interval):
+        """Return the Prefetched entry, or None when there is none or it expired."""
+        with self._lock:
+            entry = self._entries.get((kind, symbol, interval))
+            if entry is not None and time.time() - entry.fetched_at > self.ttl:
+                del self._entries[(kind, symbol, interval)]
+                return None
+        return entry
+
+    def covers(self, kind, symbol, interval, period):
+        """Return True when fresh bars of at least the period are there."""
+        entry = self.get(kind, symbol, interval)
+        return entry is not None and _wider(entry.period, period) == entry.period
+
+    def __len__(self):
+        with self._lock:
+            return sum(time.time() - entry.fetched_at <= self.ttl for entry in self._entries.values())
+
+
+_store = PrefetchStore()
+
+
+def default_store():
+    """Return the process-wide store the jobs are served from."""
+    return _store
+
+
+def fetch_batch(store, kind, period, interval, symbols):
+    """
+    Fetch the bars of a batch of symbols into the store.
+
+    Returns:
+        int: Number of symbols fetched.
+    """
+    import yfinance as yf  # pylint: disable=import-outside-toplevel
+
+    fetched_at = time.time()
+    if kind == "download":
+        frame = yf.download(symbols, period=period, interval=interval, progress=False)
+        for symbol in symbols:
+            # Columns are (price, ticker) with more than one ticker, keep them like a single download
+            bars = frame.xs(symbol, axis=1, level=1, drop_level=False).dropna(how="all") if len(symbols) > 1 else frame
+            store.put(kind, symbol, interval, Prefetched(bars, period, fetched_at))
+        return len(symbols)
+    for symbol in symbols:
+        bars = yf.Ticker(symbol).history(period=period, interval=interval)
+        store.put(kind, symbol, interval, Prefetched(bars, period, fetched_at))
+    return len(symbols)
+
+
+def prefetch(jobs, store=None):
+    """
+    Fetch the data needs of jobs that are not fetched yet.
+
+    Returns:
+        int: Number of symbols fetched.
+    """
+    store = _store if store is None else store
+    count = 0
+    for (kind, period, interval), symbols in plan(jobs).items():
+        missing = [symbol for symbol in symbols if not store.covers(kind, symbol, interval, period)]
+        if not missing:
+            continue
+        try:
+            count += fetch_batch(store, kind, period, interval, missing)
+        except Exception as e:
+            logger.error(f"Failed to prefetch {kind} {period} {interval} bars of {', '.join(missing)}: {e}")
+    return count
+
+
+def prefetch_upcoming(minutes=PREFETCH_LOOKAHEAD):
+    """Prefetch the data of the jobs due in the next minutes."""
+    if not PREFETCH_ENABLED:
+        return
+    from src.lib.jobs import MARKETS, SCHEDULE, TRIGGERS  # pylint: disable=import-outside-toplevel
+    from src.lib.trading_calendar import is_trading_day  # pylint: disable=import-outside-toplevel
+    from src.lib.triggers import start_time  # pylint: disable=import-outside-toplevel
+
+    def runs_on(job, day):
+        return job.name not in MARKETS or is_trading_day(MARKETS[job.name], day)
+
+    now = datetime.now(pytz.timezone("Europe/Istanbul"))
+    due = due_jobs(SCHEDULE, now, minutes, lambda job: start_time(TRIGGERS.get(job.name), job.at), runs_on)
+    jobs = [job for job in due if job.needs]
+    if not jobs:
+        return
+    start = time.perf_counter()
+    count = prefetch(jobs)
+    if count:
+        names = ", ".join(sorted({job.name for job in jobs}))
+        logger.info(f"Prefetched the bars of {count} symbols for {names} in {time.perf_counter() - start:.2f}s")
+
+
+class PrefetchProvider:
+    """
+    Serve history covered by prefetched bars, and pass everything else to another provider.
+
+    Args:
+        store (PrefetchStore): Prefetched bars.
+        upstream: Provider of everything else.
+    """
+
+    name = "prefetch"
+
+    def __init__(self, store, upstream):
+        self.store = store
+        self.upstream = upstream
+        self.hits = 0
+
+    def _serve(self, request):
+        """Return the prefetched bars of a HistoryRequest, or None when they do not cover it."""
+        from src.lib.providers import select_bars  # pylint: disable=import-outside-toplevel
+
+        kind, symbol, interval, period, start, end = request
+        entry = self.store.get(kind, symbol, interval)
+        if entry is None:
+            return None
+        # Only the range that was declared is served: a shorter request, e.g. the
+        # period="1d" or the few days since a saved state a job reads the latest
+        # price with, must get fresh bars rather than the last prefetched one
+        if start is not None:
+            days = period_days(entry.period)
+            if days is None:
+                return None
+            first = (datetime.fromtimestamp(entry.fetched_at) - timedelta(days=days)).date()
+            if abs((_naive(start).date() - first).days) > PREFETCH_RANGE_SLACK:
+                return None
+        elif period != entry.period:
+            return None
+        self.hits += 1
+        logger.info(f"Serving {kind} {interval} bars of {symbol} from the prefetched bars")
+        return select_bars(entry.frame, period=None if start or end else period, start=start, end=end).copy()
+
+    def _request(self, kind, symbol, kwargs):
+        """Serve a request with the default period and interval of yfinance, unless it has other options."""
+        options = dict(kwargs)
+        period, interval = options.pop("period", None) or "1mo", options.pop("interval", "1d")
+        start, end = options.pop("start", None), options.pop("end", None)
+        if options:
+            return None
+        return self._serve(HistoryRequest(kind, symbol, interval, period, start, end))
+
+    def ticker_info(self, symbol):
+        return self.upstream.ticker_info(symbol)
+
+    def ticker_history(self, symbol, **kwargs):
+        bars = self._request("history", symbol, kwargs)
+        return self.upstream.ticker_history(symbol, **kwargs) if bars is None else bars
+
+    def download(self, tickers, **kwargs):
+        symbols = tickers.replace(",", " ").split() if isinstance(tickers, str) else list(tickers)
+        bars = self._request("download", symbols[0], kwargs) if len(symbols) == 1 else None
+        return self.upstream.download(tickers, **kwargs) if bars is None else bars
+
+    def http_request(self, method, url, headers=None, body=None):
+        return self.upstream.http_request(method, url, headers=headers, body=body)
+
+
+def _naive(value):
+    """Return a date-like value as a naive datetime."""
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], "%Y-%m-%d")
+    return datetime(value.year, value.month, value.day)
+
+
+@contextmanager
+def serve_prefetched(store=None):
+    """Serve the history requests made inside the block from prefetched bars when they cover them."""
+    store = _store if store is None else store
+    if not PREFETCH_ENABLED or not len(store):
+        yield None
+        return
+    from src.lib.providers import LiveProvider, active_provider, use_provider  # pylint: disable=import-outside-toplevel
+
+    with use_provider(PrefetchProvider(store, active_provider() or LiveProvider())) as provider:
+        yield provider
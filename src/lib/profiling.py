@@ -0,0 +1,224 @@
+"""
+This module provides on-demand profiling for the scheduled jobs of the running bot.
+
+A profile can be requested for the next run of a named job from the web UI or by
+sending SIGUSR1 to the process, so production behavior can be investigated without
+a restart. Two profilers are available:
+
+- "cprofile": deterministic cProfile run, stored as a ``.pstats`` file.
+- "sampling": low-overhead stack sampler, stored as collapsed stacks
+  (``.collapsed``) that flame graph tools such as flamegraph.pl or speedscope read.
+"""
+
+import cProfile
+import logging
+import os
+import queue
+import re
+import signal
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_REQUEST_FILE = os.getenv("PROFILE_REQUEST_FILE", "profile_request.txt")
+SAMPLING_INTERVAL = float(os.getenv("PROFILE_SAMPLING_INTERVAL", "0.005"))
+PROFILE_MODES = ("cprofile", "sampling")
+ANY_JOB = "*"
+
+_JOB_NAME_PATTERN = re.compile(r"^(\*|[A-Za-z0-9_]+)$")
+_pending = {}
+_lock = threading.Lock()
+# Filled by the SIGUSR1 handler, which must not take _lock: the signal may arrive while
+# the main thread holds it
+_signals = queue.SimpleQueue()
+
+
+def request_profile(job_name, mode="cprofile"):
+    """
+    Arm the profiler for the next run of a job.
+
+    Args:
+        job_name (str): Name of the scheduled job, or "*" for whichever job runs next.
+        mode (str): Either "cprofile" or "sampling".
+
+    Raises:
+        ValueError: If the job name or the mode is not valid.
+    """
+    if not _JOB_NAME_PATTERN.match(job_name or ""):
+        raise ValueError(f"Invalid job name: {job_name!r}")
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Invalid profile mode: {mode!r}, expected one of {PROFILE_MODES}")
+    with _lock:
+        _pending[job_name] = mode
+    logger.info(f"Profiling requested for next run of {job_name} ({mode})")
+
+
+def cancel_profile(job_name):
+    """Remove a pending profile request for a job, if there is one."""
+    with _lock:
+        return _pending.pop(job_name, None)
+
+
+def pending_profiles():
+    """Return a copy of the pending profile requests as a {job_name: mode} dict."""
+    _read_signals()
+    with _lock:
+        return dict(_pending)
+
+
+def _take_request(job_name):
+    """Pop the pending profile request that applies to this run of the job."""
+    _read_signals()
+    with _lock:
+        mode = _pending.pop(job_name, None)
+        if mode is None:
+            mode = _pending.pop(ANY_JOB, None)
+        return mode
+
+
+class StackSampler:
+    """Sample the call stack of one thread at a fixed interval from a background thread."""
+
+    def __init__(self, thread_id, interval=SAMPLING_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread to finish."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        """Write the samples in the collapsed-stack format used by flame graph tools."""
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+def run_profiled(job_name, func, *args, **kwargs):
+    """
+    Run a job, profiling it if a profile was requested for this run.
+
+    Args:
+        job_name (str): Name of the scheduled job.
+        func (callable): The job function.
+        *args: Positional arguments passed to the job.
+        **kwargs: Keyword arguments passed to the job.
+
+    Returns:
+        The return value of the job.
+    """
+    mode = _take_request(job_name)
+    if mode is None:
+        return func(*args, **kwargs)
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    base_path = os.path.join(PROFILE_DIR, f"{job_name}-{stamp}")
+    logger.info(f"Profiling {job_name} with {mode}")
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            profiler.dump_stats(base_path + ".pstats")
+            logger.info(f"Profile for {job_name} saved to {base_path}.pstats")
+
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sampler.stop()
+        sampler.write_collapsed(base_path + ".collapsed")
+        logger.info(f"Profile for {job_name} saved to {base_path}.collapsed ({sum(sampler.stacks.values())} samples)")
+
+
+def list_profiles():
+    """
+    List the stored profiles, newest first.
+
+    Returns:
+        list: Dicts with the file name, size in bytes and modification time of each profile.
+    """
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith((".pstats", ".collapsed")):
+            continue
+        stat = os.stat(os.path.join(PROFILE_DIR, name))
+        profiles.append(
+            {
+                "name": name,
+                "size": stat.st_size,
+                "modified": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        )
+    profiles.sort(key=lambda profile: profile["modified"], reverse=True)
+    return profiles
+
+
+def _handle_profile_signal(_signum, _frame):
+    """Note a SIGUSR1; the requests are read outside the handler by _read_signals()."""
+    _signals.put_nowait(True)
+
+
+def _read_signals():
+    """
+    Arm the profiler for the signals received since the last call.
+
+    Each line of PROFILE_REQUEST_FILE is read as "<job_name> [mode]". Without the file,
+    the next job to run is profiled with cProfile.
+    """
+    received = False
+    while True:
+        try:
+            received = _signals.get_nowait() or received
+        except queue.Empty:
+            break
+    if not received:
+        return
+    if not os.path.exists(PROFILE_REQUEST_FILE):
+        request_profile(ANY_JOB)
+        return
+    try:
+        with open(PROFILE_REQUEST_FILE, "r", encoding="utf-8") as file:
+            lines = [line.split() for line in file if line.strip()]
+        os.remove(PROFILE_REQUEST_FILE)
+        for parts in lines:
+            request_profile(parts[0], parts[1] if len(parts) > 1 else "cprofile")
+    except (OSError, ValueError) as e:
+        logger.error(f"Invalid profile request in {PROFILE_REQUEST_FILE}: {e}")
+
+
+def install_signal_handler():
+    """Install the SIGUSR1 handler. Must be called from the main thread."""
+    if not hasattr(signal, "SIGUSR1"):
+        logger.warning("SIGUSR1 is not available on this platform, signal profiling disabled.")
+        return
+    signal.signal(signal.SIGUSR1, _handle_profile_signal)
@@ -0,0 +1,464 @@
+"""
+This module lets the jobs run against a chosen market data provider.
+
+The jobs call yfinance, requests and http.client directly. ``install_provider()`` swaps
+those entry points for thin stand-ins that route every call through a provider and
+count it in the statistics of the current run:
+
+- LiveProvider: the real network.
+- FixtureProvider: JSON fixture files, so jobs run offline and deterministically.
+- FixtureRecorder: the real network, saving every response into fixture files.
+- CassetteRecorder / CassetteReplayer (src/lib/cassette.py): record every interaction
+  of a job into a cassette and replay it.
+- SyntheticProvider (src/lib/synthetic.py): generated bars for any symbol.
+- DeadlineProvider (src/lib/data_cache.py): another provider under a publish deadline,
+  falling back to cached responses.
+- PrefetchProvider (src/lib/planner.py): history prefetched by the planner, passing
+  everything else to another provider.
+
+A fixture directory holds one ``<symbol>.json`` per ticker with its ``info`` dict and
+its bars per interval, and ``http.json`` with the raw responses of the other APIs
+keyed by URL.
+"""
+
+import http.client
+import json
+import logging
+import os
+import re
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+from src.lib.stats import count_request, stage
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_DIR = os.getenv("FIXTURE_DIR", "fixtures")
+HISTORY_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+DAILY_INTERVALS = ("1d", "5d", "1wk", "1mo", "3mo")
+
+_REAL_TICKER = yf.Ticker
+_REAL_DOWNLOAD = yf.download
+_REAL_REQUESTS_GET = requests.get
+_REAL_HTTPS_CONNECTION = http.client.HTTPSConnection
+
+_PERIOD_PATTERN = re.compile(r"^(\d+)(d|wk|mo|y)$")
+_active_provider = None
+
+
+def frame_to_json(frame):
+    """Serialize a bar DataFrame to a JSON-compatible dict, keeping the index timezone."""
+    index = frame.index
+    return {
+        "tz": str(index.tz) if getattr(index, "tz", None) is not None else None,
+        "index_name": index.name,
+        "index": [timestamp.isoformat() for timestamp in index],
+        "columns": [str(column) for column in frame.columns],
+        "data": [[None if pd.isna(value) else float(value) for value in row] for row in frame.to_numpy(dtype=float)],
+    }
+
+
+def frame_from_json(data):
+    """Rebuild a bar DataFrame serialized by frame_to_json."""
+    if data["tz"]:
+        index = pd.to_datetime(data["index"], utc=True).tz_convert(data["tz"])
+    else:
+        index = pd.to_datetime(data["index"])
+    frame = pd.DataFrame(data["data"], index=index, columns=data["columns"], dtype=float)
+    frame.index.name = data.get("index_name")
+    return frame
+
+
+def select_bars(frame, period=None, start=None, end=None):
+    """
+    Select bars the way yfinance interprets ``period`` or ``start``/``end``.
+
+    Args:
+        frame (pandas.DataFrame): All the bars available, oldest first.
+        period (str, optional): A yfinance period such as "5d", "3mo", "1y", "ytd" or "max".
+        start (str or datetime, optional): First date to include.
+        end (str or datetime, optional): Date to stop before (exclusive).
+
+    Returns:
+        pandas.DataFrame: The selected bars.
+    """
+    if frame.empty:
+        return frame
+    tz = frame.index.tz
+    if start is not None or end is not None:
+        if start is not None:
+            frame = frame[frame.index >= _as_timestamp(start, tz)]
+        if end is not None:
+            frame = frame[frame.index < _as_timestamp(end, tz)]
+        return frame
+    if period in (None, "max"):
+        return frame
+    last = frame.index[-1]
+    if period == "ytd":
+        return frame[frame.index >= last.replace(month=1, day=1, hour=0, minute=0, second=0)]
+    match = _PERIOD_PATTERN.match(period)
+    if not match:
+        raise ValueError(f"Invalid period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        days = sorted(set(frame.index.normalize()))[-count:]
+        return frame[frame.index.normalize() >= days[0]]
+    offset = {"wk": pd.DateOffset(weeks=count), "mo": pd.DateOffset(months=count), "y": pd.DateOffset(years=count)}[unit]
+    return frame[frame.index > last - offset]
+
+
+def _as_timestamp(value, tz):
+    """Convert a date-like value to a Timestamp in the given timezone."""
+    timestamp = pd.Timestamp(value)
+    if tz is not None and timestamp.tzinfo is None:
+        return timestamp.tz_localize(tz)
+    if tz is None and timestamp.tzinfo is not None:
+        return timestamp.tz_localize(None)
+    return timestamp
+
+
+def _split_tickers(tickers):
+    """Split the tickers argument of yf.download into a list of symbols."""
+    if isinstance(tickers, str):
+        return tickers.replace(",", " ").split()
+    return list(tickers)
+
+
+def _frame_bytes(frame):
+    """Approximate the payload size of a bar DataFrame."""
+    return int(frame.size * 8 + len(frame.index) * 8)
+
+
+class LiveProvider:
+    """Fetch from Yahoo Finance and the other APIs over the network."""
+
+    name = "live"
+
+    def ticker_info(self, symbol):
+        return _REAL_TICKER(symbol).info
+
+    def ticker_history(self, symbol, **kwargs):
+        return _REAL_TICKER(symbol).history(**kwargs)
+
+    def download(self, tickers, **kwargs):
+        return _REAL_DOWNLOAD(tickers, **kwargs)
+
+    def http_request(self, method, url, headers=None, body=None):
+        """Make an HTTP request and return the status code and the response body as bytes."""
+        if method == "GET" and body is None:
+            response = _REAL_REQUESTS_GET(url, headers=headers, timeout=30)
+            return response.status_code, response.content
+        parsed = urlparse(url)
+        conn = _REAL_HTTPS_CONNECTION(parsed.netloc)
+        try:
+            path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, response.read()
+        finally:
+            conn.close()
+
+
+class FixtureProvider:
+    """Serve market data from the JSON files of a fixture directory."""
+
+    name = "fixtures"
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+        self._tickers = {}
+        self._http = None
+
+    def _load_ticker(self, symbol):
+        if symbol not in self._tickers:
+            path = os.path.join(self.fixture_dir, f"{symbol}.json")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as file:
+                    self._tickers[symbol] = json.load(file)
+            else:
+                logger.warning(f"No fixture for {symbol} in {self.fixture_dir}")
+                self._tickers[symbol] = {"info": {}, "history": {}}
+        return self._tickers[symbol]
+
+    def _bars(self, symbol, interval):
+        data = self._load_ticker(symbol)["history"].get(interval)
+        if data is None:
+            return pd.DataFrame(columns=HISTORY_COLUMNS, dtype=float)
+        return frame_from_json(data)
+
+    def ticker_info(self, symbol):
+        return dict(self._load_ticker(symbol)["info"])
+
+    def ticker_history(self, symbol, period="1mo", interval="1d", start=None, end=None, **_kwargs):
+        return select_bars(self._bars(symbol, interval), period=None if start or end else period, start=start, end=end)
+
+    def download(self, tickers, period=None, interval="1d", start=None, end=None, **_kwargs):
+        symbols = _split_tickers(tickers)
+        frames = {}
+        for symbol in symbols:
+            frame = select_bars(self._bars(symbol, interval), period=period or "1mo", start=start, end=end)
+            # Like yf.download, daily bars come back without a timezone
+            if interval in DAILY_INTERVALS and getattr(frame.index, "tz", None) is not None:
+                frame = frame.tz_localize(None)
+            frames[symbol] = frame
+        if len(symbols) == 1:
+            return frames[symbols[0]]
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+    def http_request(self, method, url, headers=None, body=None):
+        """Return the recorded status code and body for a URL."""
+        if self._http is None:
+            path = os.path.join(self.fixture_dir, "http.json")
+            self._http = {}
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as file:
+                    self._http = json.load(file)
+        response = self._http.get(url)
+        if response is None:
+            logger.warning(f"No fixture for {method} {url}")
+            return 404, b""
+        return response["status"], response["body"].encode("utf-8")
+
+
+class FixtureRecorder(LiveProvider):
+    """Fetch over the network and save every response into a fixture directory."""
+
+    name = "record-fixtures"
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def _update_ticker(self, symbol, info=None, interval=None, frame=None):
+        path = os.path.join(self.fixture_dir, f"{symbol}.json")
+        data = {"info": {}, "history": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        if info is not None:
+            data["info"] = info
+        if frame is not None and not frame.empty:
+            frame = frame[[column for column in HISTORY_COLUMNS if column in frame.columns]]
+            known = data["history"].get(interval)
+            if known is not None:
+                frame = frame.combine_first(frame_from_json(known))
+            data["history"][interval] = frame_to_json(frame)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file, default=str)
+
+    def ticker_info(self, symbol):
+        info = super().ticker_info(symbol)
+        self._update_ticker(symbol, info=info)
+        return info
+
+    def ticker_history(self, symbol, **kwargs):
+        frame = super().ticker_history(symbol, **kwargs)
+        self._update_ticker(symbol, interval=kwargs.get("interval", "1d"), frame=frame)
+        return frame
+
+    def download(self, tickers, **kwargs):
+        frame = super().download(tickers, **kwargs)
+        for symbol in _split_tickers(tickers):
+            bars = frame.xs(symbol, axis=1, level=1) if isinstance(frame.columns, pd.MultiIndex) else frame
+            self._update_ticker(symbol, interval=kwargs.get("interval", "1d"), frame=bars)
+        return frame
+
+    def http_request(self, method, url, headers=None, body=None):
+        status, content = super().http_request(method, url, headers=headers, body=body)
+        path = os.path.join(self.fixture_dir, "http.json")
+        recorded = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                recorded = json.load(file)
+        recorded[url] = {"status": status, "body": content.decode("utf-8", errors="replace")}
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(recorded, file, ensure_ascii=False, indent=1)
+        return status, content
+
+
+def _fetch(kind, call, size_of):
+    """Make a provider call as the "fetch" stage and count it, even when it fails."""
+    nbytes = 0
+    try:
+        with stage("fetch"):
+            result = call()
+        nbytes = size_of(result)
+        return result
+    finally:
+        count_request(kind, nbytes)
+
+
+class ProviderTicker:
+    """Stand-in for yf.Ticker that routes info and history through the active provider."""
+
+    def __init__(self, ticker, *_args, **_kwargs):
+        self.ticker = ticker
+        self._info = None
+
+    @property
+    def info(self):
+        # yfinance fetches the info once per Ticker object, so do the same
+        if self._info is None:
+            self._info = _fetch(
+                "yfinance.info",
+                lambda: _active_provider.ticker_info(self.ticker),
+                lambda info: len(json.dumps(info, default=str)),
+            )
+        return self._info
+
+    def history(self, *args, **kwargs):
+        if args:
+            kwargs.setdefault("period", args[0])
+        return _fetch("yfinance.history", lambda: _active_provider.ticker_history(self.ticker, **kwargs), _frame_bytes)
+
+
+def provider_download(tickers, *args, **kwargs):
+    """Stand-in for yf.download."""
+    kwargs.pop("progress", None)
+    return _fetch("yfinance.download", lambda: _active_provider.download(tickers, *args, **kwargs), _frame_bytes)
+
+
+class ProviderResponse:
+    """The subset of requests.Response the jobs use."""
+
+    def __init__(self, url, status_code, content):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def provider_requests_get(url, params=None, headers=None, **_kwargs):
+    """Stand-in for requests.get."""
+    if params:
+        url = requests.Request("GET", url, params=params).prepare().url
+    status, content = _fetch("http", lambda: _active_provider.http_request("GET", url, headers=headers), lambda response: len(response[1]))
+    return ProviderResponse(url, status, content)
+
+
+class ProviderHTTPResponse:
+    """The subset of http.client.HTTPResponse the jobs use."""
+
+    def __init__(self, status, content):
+        self.status = status
+        self._content = content
+
+    def read(self):
+        return self._content
+
+
+class ProviderHTTPSConnection:
+    """Stand-in for http.client.HTTPSConnection."""
+
+    def __init__(self, host, *_args, **_kwargs):
+        self.host = host
+        self._request = None
+
+    def request(self, method, url, body=None, headers=None):
+        self._request = (method, f"https://{self.host}{url}", body, headers)
+
+    def getresponse(self):
+        method, url, body, headers = self._request
+        status, content = _fetch(
+            "http",
+            lambda: _active_provider.http_request(method, url, headers=headers, body=body),
+            lambda response: len(response[1]),
+        )
+        return ProviderHTTPResponse(status, content)
+
+    def close(self):
+        self._request = None
+
+
+PROVIDERS = ("live", "fixtures", "record-fixtures", "record", "replay", "synthetic")
+
+
+def get_provider(name, fixture_dir=FIXTURE_DIR, cassette=None, latency=0.0, latency_scale=0.0, seed=0):
+    """
+    Create a provider by name.
+
+    Args:
+        name (str): One of PROVIDERS.
+        fixture_dir (str): Fixture directory for the fixture providers.
+        cassette (str, optional): Cassette path for the "record" and "replay" providers.
+        latency (float): Seconds added to every replayed request.
+        latency_scale (float): Multiplier applied to the recorded duration of every replayed request.
+        seed (int): Seed of the "synthetic" provider.
+
+    Raises:
+        ValueError: If the provider name is unknown or a cassette path is missing.
+    """
+    if name == "live":
+        return LiveProvider()
+    if name == "fixtures":
+        return FixtureProvider(fixture_dir)
+    if name == "record-fixtures":
+        return FixtureRecorder(fixture_dir)
+    if name in ("record", "replay"):
+        from src.lib.cassette import CassetteRecorder, CassetteReplayer  # pylint: disable=import-outside-toplevel
+
+        if cassette is None:
+            raise ValueError(f"The {name} provider needs a cassette path")
+        if name == "record":
+            return CassetteRecorder(cassette)
+        return CassetteReplayer(cassette, latency=latency, latency_scale=latency_scale)
+    if name == "synthetic":
+        from src.lib.synthetic import SyntheticProvider  # pylint: disable=import-outside-toplevel
+
+        return SyntheticProvider(seed=seed)
+    raise ValueError(f"Unknown provider: {name}")
+
+
+def active_provider():
+    """Return the installed provider, or None when the jobs use the real entry points."""
+    return _active_provider
+
+
+def install_provider(provider):
+    """Route the yfinance, requests and http.client calls of the jobs through a provider."""
+    global _active_provider  # pylint: disable=global-statement
+    _active_provider = provider
+    yf.Ticker = ProviderTicker
+    yf.download = provider_download
+    requests.get = provider_requests_get
+    http.client.HTTPSConnection = ProviderHTTPSConnection
+    logger.info(f"Data provider set to {provider.name}")
+
+
+def uninstall_provider():
+    """Restore the real yfinance, requests and http.client entry points, and close the provider."""
+    global _active_provider  # pylint: disable=global-statement
+    if hasattr(_active_provider, "close"):
+        _active_provider.close()
+    _active_provider = None
+    yf.Ticker = _REAL_TICKER
+    yf.download = _REAL_DOWNLOAD
+    requests.get = _REAL_REQUESTS_GET
+    http.client.HTTPSConnection = _REAL_HTTPS_CONNECTION
+
+
+@contextmanager
+def use_provider(provider):
+    """Use a provider for the calls made inside the block, then go back to the previous one."""
+    previous = _active_provider
+    install_provider(provider)
+    try:
+        yield provider
+    finally:
+        uninstall_provider()
+        if previous is not None:
+            install_provider(previous)
@@ -0,0 +1,77 @@
+"""
+This module fetches the opening and closing prints of an index for the open/close jobs.
+
+Each value can be read from two Yahoo endpoints, the quote summary (``Ticker.info``)
+and the chart API (``Ticker.history``), so the requests are hedged with one as the
+alternate of the other (see src/lib/hedging.py).
+"""
+
+from datetime import datetime
+from functools import partial
+
+import pytz
+import yfinance as yf
+
+from src.lib.hedging import hedged
+
+
+def _today(bars):
+    """Return True when the last bar of a daily history is from today, in the exchange timezone."""
+    last = bars.index[-1]
+    tz = last.tzinfo or pytz.timezone("Europe/Istanbul")
+    return last.date() == datetime.now(tz).date()
+
+
+def open_from_quote(symbol):
+    """Return (open, previous close) from the quote summary."""
+    info = yf.Ticker(symbol).info
+    open_price, previous_close = info.get("open", 0), info.get("previousClose", 0)
+    if not open_price or not previous_close:
+        raise ValueError(f"Missing opening or previous close data for {symbol}")
+    return open_price, previous_close
+
+
+def open_from_chart(symbol):
+    """Return (open, previous close) from the daily bars of the chart API."""
+    bars = yf.Ticker(symbol).history(period="5d")
+    if len(bars) < 2 or not _today(bars):
+        raise ValueError(f"No bar for today yet for {symbol}")
+    return float(bars["Open"].iloc[-1]), float(bars["Close"].iloc[-2])
+
+
+def close_from_chart(symbol):
+    """Return (last close, previous close) from the daily bars of the chart API."""
+    bars = yf.Ticker(symbol).history(period="5d")
+    if len(bars) < 2:
+        raise ValueError(f"Not enough bars for {symbol}")
+    return float(bars["Close"].iloc[-1]), float(bars["Close"].iloc[-2])
+
+
+def close_from_quote(symbol):
+    """Return (last price, previous close) from the quote summary."""
+    info = yf.Ticker(symbol).info
+    price = info.get("regularMarketPrice") or info.get("currentPrice", 0)
+    previous_close = info.get("regularMarketPreviousClose") or info.get("previousClose", 0)
+    if not price or not previous_close:
+        raise ValueError(f"Missing last or previous close data for {symbol}")
+    return price, previous_close
+
+
+def get_open(symbol):
+    """
+    Fetch the opening price and the previous close of a symbol, hedged.
+
+    Returns:
+        tuple: (open, previous close)
+    """
+    return hedged("quote_open", partial(open_from_quote, symbol), partial(open_from_chart, symbol))
+
+
+def get_close(symbol):
+    """
+    Fetch the last close and the previous close of a symbol, hedged.
+
+    Returns:
+        tuple: (last close, previous close)
+    """
+    return hedged("quote_close", partial(close_from_chart, symbol), partial(close_from_quote, symbol))
@@ -0,0 +1,161 @@
+"""
+This module renders the charts of the scheduled posts ahead of time.
+
+A few minutes before a job runs, a render-ahead job (e.g. ``prepare_gold_chart``)
+fetches the history and builds the chart: the figure, its axes, labels and layout. At
+publish time the job only patches the final data point into the line of the prepared
+figure with ``set_data`` and saves it, so the time between the trigger and the email
+is one fetch plus the send. When no fresh prepared chart is there, e.g. after a
+restart, the chart is built from scratch as before. Prepared charts that were never
+published are dropped by the next ``prepare()`` once they are too old to be used.
+
+Charts are built with the object-oriented matplotlib API rather than pyplot, so a
+prepared figure is not touched by the pyplot calls of other jobs.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from io import BytesIO
+
+import pandas as pd
+from matplotlib.figure import Figure
+
+logger = logging.getLogger(__name__)
+
+RENDER_AHEAD_MAX_AGE = float(os.getenv("RENDER_AHEAD_MAX_AGE", str(30 * 60)))
+
+ChartSpec = namedtuple("ChartSpec", ["title", "ylabel", "xlabel", "label", "figsize", "step"], defaults=(None, None, (12, 6), "D"))
+ChartSpec.__doc__ = """
+Look of a line chart.
+
+Args:
+    title (str): Title of the chart.
+    ylabel (str): Label of the y axis.
+    xlabel (str, optional): Label of the x axis.
+    label (str, optional): Legend label of the line; no legend without one.
+    figsize (tuple): Size of the figure in inches.
+    step (str): Spacing of the points, e.g. "D" or "h"; a final point within the
+        same step as the last point replaces it instead of being appended.
+"""
+
+PreparedChart = namedtuple("PreparedChart", ["figure", "axes", "line", "series", "prepared_at"])
+
+_prepared = {}
+_lock = threading.Lock()
+
+
+def _as_series(data):
+    """Return the values to plot as a Series; yf.download gives a one-column frame per field."""
+    if isinstance(data, pd.DataFrame):
+        return data.iloc[:, 0]
+    return data
+
+
+def build_chart(spec, series):
+    """
+    Build a line chart of a series.
+
+    Args:
+        spec (ChartSpec): Look of the chart.
+        series (pandas.Series): Values indexed by time.
+
+    Returns:
+        PreparedChart: The figure, ready to be patched and saved.
+    """
+    series = _as_series(series)
+    figure = Figure(figsize=spec.figsize)
+    axes = figure.add_subplot()
+    (line,) = axes.plot(series.index, series.values, linestyle="-", label=spec.label)
+    if spec.label:
+        axes.legend()
+    axes.set_title(spec.title)
+    if spec.xlabel:
+        axes.set_xlabel(spec.xlabel)
+    axes.set_ylabel(spec.ylabel)
+    axes.grid(True)
+    axes.tick_params(axis="x", labelrotation=45)
+    figure.tight_layout()
+    return PreparedChart(figure, axes, line, series, time.monotonic())
+
+
+def patch_chart(chart, spec, when, value):
+    """
+    Put the final data point into a chart: replace the last point when it falls in the
+    same step, append it otherwise.
+
+    Returns:
+        PreparedChart: The patched chart.
+    """
+    series = chart.series
+    when = pd.Timestamp(when)
+    tz = getattr(series.index, "tz", None)
+    if tz is None and when.tzinfo is not None:
+        when = when.tz_convert(None)
+    elif tz is not None:
+        when = when.tz_localize(tz) if when.tzinfo is None else when.tz_convert(tz)
+    if len(series) and series.index[-1].floor(spec.step) == when.floor(spec.step):
+        series = series.copy()
+        series.iloc[-1] = value
+    elif not len(series) or when > series.index[-1]:
+        series = pd.concat([series, pd.Series([value], index=pd.DatetimeIndex([when]))])
+    chart.line.set_data(series.index, series.values)
+    chart.axes.relim()
+    chart.axes.autoscale_view()
+    return chart._replace(series=series)
+
+
+def save_chart(chart):
+    """Save a chart as PNG into a BytesIO stream."""
+    image_stream = BytesIO()
+    chart.figure.savefig(image_stream, format="png")
+    image_stream.seek(0)
+    return image_stream
+
+
+def prepare(key, spec, series, max_age=RENDER_AHEAD_MAX_AGE):
+    """
+    Build a chart ahead of time and keep it for render() under a key.
+
+    Charts older than max_age are dropped, since render() would not use them: those of a
+    pick that was not published, or of a job that failed before render().
+    """
+    chart = build_chart(spec, series)
+    with _lock:
+        for old in [old for old, prepared in _prepared.items() if chart.prepared_at - prepared.prepared_at > max_age]:
+            logger.info(f"Dropping the unused render-ahead chart {old}")
+            del _prepared[old]
+        _prepared[key] = chart
+    logger.info(f"Chart {key} rendered ahead with {len(series)} points")
+
+
+def render(key, spec, fetch_series, fetch_latest=None, max_age=RENDER_AHEAD_MAX_AGE):
+    """
+    Render a chart for publishing, from the prepared chart when there is a fresh one.
+
+    Args:
+        key (str): Key the chart was prepared under.
+        spec (ChartSpec): Look of the chart.
+        fetch_series (callable): Returns the whole series, used when nothing is prepared.
+        fetch_latest (callable, optional): Returns the final (time, value) point, patched
+            into the chart either way so both paths draw the same chart.
+        max_age (float): Seconds a prepared chart stays usable.
+
+    Returns:
+        BytesIO: The chart as PNG.
+    """
+    with _lock:
+        chart = _prepared.pop(key, None)
+    if chart is not None and time.monotonic() - chart.prepared_at > max_age:
+        logger.warning(f"Render-ahead chart {key} is too old, rendering it again")
+        chart = None
+    if chart is None:
+        chart = build_chart(spec, fetch_series())
+    else:
+        logger.info(f"Chart {key} patched from the render-ahead figure")
+    if fetch_latest is not None:
+        when, value = fetch_latest()
+        chart = patch_chart(chart, spec, when, value)
+    return save_chart(chart)
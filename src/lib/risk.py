@@ -0,0 +1,289 @@
+"""
+This module computes the long-term risk and return of the US stocks.
+
+``risk_metrics()`` takes a price matrix with a row per day and a column per symbol and
+computes, for all the columns at once with NumPy:
+
+- CAGR over the whole history of each column,
+- annualized volatility of the daily returns,
+- maximum drawdown, the deepest fall from the running maximum of the closes,
+- Sharpe and Sortino ratios against RISK_FREE_RATE,
+- for 1, 3, 5 and 10 years: the trailing return and the worst return of all the
+  rolling windows of that length, both annualized.
+
+Stocks listed later than the start of the matrix are NaN until their first close;
+missing closes after it carry the last close forward.
+
+The ``refresh_risk_metrics`` job keeps RISK_HISTORY_YEARS of daily closes of every stock
+of ``us_stock_list`` in RISK_PATH, adds the bars closed since its last run and
+recomputes the metrics of the whole list, which are saved with the closes. The post of
+``analyze_long_term_stock`` only reads them with ``symbol_metrics()``, and ``ranking()``
+orders the list by any of them.
+"""
+
+import logging
+import os
+import pickle
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.lib.data_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+RISK_PATH = os.getenv("RISK_PATH", os.path.join(CACHE_DIR, "risk.pkl"))
+RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", "0.04"))
+# Metrics older than this many days are not used for a post
+RISK_MAX_AGE = 5
+# A year more than the longest horizon, so it has a year of rolling windows
+RISK_HORIZONS = (1, 3, 5, 10)
+RISK_HISTORY_YEARS = max(RISK_HORIZONS) + 1
+TRADING_DAYS = 252
+
+
+def _ratio_metrics(returns, risk_free):
+    """Return the annualized volatility and the Sharpe and Sortino ratios of daily returns."""
+    # Daily excess returns over the risk-free rate
+    excess = returns - risk_free / TRADING_DAYS
+    counts = (~np.isnan(returns)).sum(axis=0)
+    mean = np.nansum(excess, axis=0) / counts
+    average = np.nansum(returns, axis=0) / counts
+    deviation = np.sqrt(np.nansum((returns - average) ** 2, axis=0) / (counts - 1))
+    downside = np.sqrt(np.nansum(np.minimum(excess, 0.0) ** 2, axis=0) / counts)
+    return {
+        "volatility": np.where(counts > 1, deviation * np.sqrt(TRADING_DAYS), np.nan),
+        "sharpe": np.where(counts > 1, mean / deviation * np.sqrt(TRADING_DAYS), np.nan),
+        "sortino": np.where(counts > 1, mean / downside * np.sqrt(TRADING_DAYS), np.nan),
+    }
+
+
+def _rolling_metrics(close, horizons):
+    """Return the trailing and the worst annualized return of every horizon in years."""
+    rows, columns = close.shape
+    metrics = {}
+    for horizon in horizons:
+        window = horizon * TRADING_DAYS
+        if rows <= window:
+            metrics[f"return_{horizon}y"] = np.full(columns, np.nan)
+            metrics[f"worst_{horizon}y"] = np.full(columns, np.nan)
+            continue
+        rolling = (close[window:] / close[:-window]) ** (1 / horizon) - 1
+        metrics[f"return_{horizon}y"] = rolling[-1]
+        worst = np.where(np.isnan(rolling), np.inf, rolling).min(axis=0)
+        metrics[f"worst_{horizon}y"] = np.where(np.isfinite(worst), worst, np.nan)
+    return metrics
+
+
+def risk_metrics(close, risk_free=RISK_FREE_RATE, horizons=RISK_HORIZONS):
+    """
+    Compute the risk and return metrics of every column of a price matrix.
+
+    Args:
+        close (numpy.ndarray): Daily closes with a row per day, oldest first, and a
+            column per symbol.
+        risk_free (float): Annual risk-free rate of the Sharpe and Sortino ratios.
+        horizons (tuple): Years of the trailing and rolling returns.
+
+    Returns:
+        dict: Arrays over the symbols by metric: "years", "cagr", "volatility",
+        "max_drawdown", "sharpe", "sortino", and "return_{n}y" and "worst_{n}y" for
+        every horizon; NaN without enough history. Returns are fractions, e.g. 0.12.
+    """
+    from src.lib.indicators import ffill  # pylint: disable=import-outside-toplevel
+
+    close = ffill(close)
+    rows, columns = close.shape
+    valid = ~np.isnan(close)
+    first = np.where(valid.any(axis=0), valid.argmax(axis=0), rows - 1)
+    sessions = rows - 1 - first
+    years = sessions / TRADING_DAYS
+    start = close[first, np.arange(columns)]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # fmax skips the NaN before the first close of a column
+        drawdown = close / np.fmax.accumulate(close, axis=0) - 1
+        metrics = {
+            "years": years,
+            "cagr": np.where(sessions > 0, (close[-1] / start) ** (1 / years) - 1, np.nan),
+            "max_drawdown": np.where(sessions > 0, np.nanmin(np.where(valid, drawdown, 0.0), axis=0), np.nan),
+        }
+        metrics.update(_ratio_metrics(close[1:] / close[:-1] - 1, risk_free))
+        metrics.update(_rolling_metrics(close, horizons))
+    return metrics
+
+
+_lock = threading.Lock()
+_saved = None
+
+
+def load(path=RISK_PATH):
+    """
+    Return the saved closes and metrics, reading them from disk on first use.
+
+    Returns:
+        dict: {"symbols", "last_date", "closes", "metrics"}, or None when there is none yet.
+    """
+    global _saved  # pylint: disable=global-statement
+    with _lock:
+        if _saved is not None or not os.path.exists(path):
+            return _saved
+        try:
+            with open(path, "rb") as file:
+                _saved = pickle.load(file)
+        except (OSError, pickle.PickleError, EOFError, AttributeError) as e:
+            logger.error(f"Failed to read the risk metrics: {e}")
+        return _saved
+
+
+def _save(saved, path):
+    global _saved  # pylint: disable=global-statement
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(saved, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logger.error(f"Failed to save the risk metrics: {e}")
+    with _lock:
+        _saved = saved
+
+
+def refresh(path=RISK_PATH, today=None):
+    """
+    Add the daily closes since the last refresh to those of every US stock, or download
+    RISK_HISTORY_YEARS of them, and recompute the metrics.
+
+    Returns:
+        dict: The saved closes and metrics.
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    import yfinance as yf  # pylint: disable=import-outside-toplevel
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+
+    symbols = registry()["us_stock_list"].symbols()
+    today = today or date.today()
+    oldest = today - timedelta(days=365 * RISK_HISTORY_YEARS + 10)
+    saved = load(path)
+    if saved is not None and saved["symbols"] != symbols:
+        logger.warning("The US stock list changed, downloading the closes again")
+        saved = None
+    start = oldest if saved is None else saved["last_date"] + timedelta(days=1)
+    frame = yf.download(symbols, start=start.strftime("%Y-%m-%d"), interval="1d", progress=False)
+    closes = saved["closes"] if saved is not None else None
+    if not frame.empty:
+        new = frame["Close"].reindex(columns=symbols)
+        new.index = pd.DatetimeIndex(new.index).tz_localize(None).normalize()
+        # Only closed bars are kept; today's bar is still moving
+        new = new[new.index.date < today].dropna(how="all")
+        if closes is not None:
+            new = new[new.index > closes.index[-1]]
+        closes = new if closes is None else pd.concat([closes, new])
+    if closes is None or closes.empty:
+        logger.error("No closes for the risk metrics")
+        return saved
+    closes = closes[closes.index >= pd.Timestamp(oldest)]
+    saved = {
+        "symbols": symbols,
+        "last_date": closes.index[-1].date(),
+        "closes": closes,
+        "metrics": risk_metrics(closes.to_numpy(dtype=float)),
+    }
+    _save(saved, path)
+    logger.info(f"Risk metrics of {len(symbols)} stocks computed from {len(closes)} sessions, last on {saved['last_date']}")
+    return saved
+
+
+def refresh_risk_metrics():
+    """Add the closes of the last sessions and recompute the risk metrics of every US stock."""
+    logger.start("Running refresh_risk_metrics")
+    try:
+        refresh()
+        logger.ok("refresh_risk_metrics worked successfully.")
+    except Exception as e:
+        logger.error(f"Failed to refresh the risk metrics: {e}")
+
+
+def ranking(metric="sharpe", descending=True):
+    """
+    Order the US stocks by a metric.
+
+    Args:
+        metric (str): Key of risk_metrics(), e.g. "cagr".
+        descending (bool): Highest first; use False for e.g. "volatility".
+
+    Returns:
+        list: (symbol, value) pairs, stocks without a value left out; empty without metrics.
+    """
+    saved = load()
+    if saved is None:
+        return []
+    values = saved["metrics"][metric]
+    order = np.argsort(-values if descending else values, kind="stable")
+    return [(saved["symbols"][i], float(values[i])) for i in order if not np.isnan(values[i])]
+
+
+def symbol_metrics(symbol, today=None):
+    """
+    Return the saved metrics of a stock, with its rank by Sharpe ratio.
+
+    Args:
+        symbol (str): Yahoo symbol, e.g. "AAPL".
+
+    Returns:
+        dict: Metric values by key of risk_metrics(), and "sharpe_rank" and "ranked";
+        None without fresh metrics for the stock.
+    """
+    saved = load()
+    today = today or date.today()
+    if saved is None or symbol not in saved["symbols"]:
+        return None
+    if today - saved["last_date"] > timedelta(days=RISK_MAX_AGE):
+        logger.warning(f"Risk metrics are from {saved['last_date']}, not using them")
+        return None
+    column = saved["symbols"].index(symbol)
+    values = {key: float(metric[column]) for key, metric in saved["metrics"].items()}
+    ranked = [item[0] for item in ranking("sharpe")]
+    values["sharpe_rank"] = ranked.index(symbol) + 1 if symbol in ranked else None
+    values["ranked"] = len(ranked)
+    return values
+
+
+def _percent(value):
+    return f"%{value * 100:.1f}" if not np.isnan(value) else "-"
+
+
+def format_risk(values):
+    """
+    Format the risk and return section of a post.
+
+    Args:
+        values (dict): Metrics of a stock, as returned by symbol_metrics().
+
+    Returns:
+        str: The section, empty without values.
+    """
+    if not values or np.isnan(values["cagr"]):
+        return ""
+    lines = [f"📐 Risk ve Getiri (Son {values['years']:.1f} Yıl)"]
+    lines.append(f"▪️ Yıllık Bileşik Getiri (CAGR): {_percent(values['cagr'])}")
+    lines.append(f"▪️ Yıllık Volatilite: {_percent(values['volatility'])}")
+    lines.append(f"▪️ En Büyük Düşüş: {_percent(values['max_drawdown'])}")
+    lines.append(f"▪️ Sharpe Oranı: {values['sharpe']:.2f} / Sortino Oranı: {values['sortino']:.2f}")
+    for horizon in RISK_HORIZONS:
+        if np.isnan(values[f"return_{horizon}y"]):
+            continue
+        lines.append(f"▪️ {horizon} Yıllık Getiri (yıllık): {_percent(values[f'return_{horizon}y'])}, en kötü {horizon} yıl: {_percent(values[f'worst_{horizon}y'])}")
+    if values["sharpe_rank"]:
+        lines.append(f"▪️ Sharpe Sıralaması: {values['sharpe_rank']}/{values['ranked']}")
+    return "\n".join(lines)
+
+
+def stock_risk(symbol):
+    """Return the risk and return section of a post about a stock; empty when there are no metrics."""
+    try:
+        return format_risk(symbol_metrics(symbol))
+    except Exception as e:
+        logger.error(f"Failed to read the risk metrics of {symbol}: {e}")
+        return ""
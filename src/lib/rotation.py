@@ -0,0 +1,169 @@
+"""
+This module rotates the stocks of the jobs that feature one stock per post.
+
+Rather than an independent random pick on every run, each job goes through a shuffled
+cycle of its stocks with no repeats until every stock was featured, then through a new
+cycle; a new cycle never starts with the stock that ended the previous one. The queue
+of coming picks is saved in ROTATION_DIR, so a restart does not start over.
+
+Because the next picks are known in advance, the planner prefetches their history
+(see ``upcoming()`` in src/lib/jobs.py) and render-ahead jobs draw their charts before
+the post, so the post itself only reads them. Stocks that do not meet the requirement
+of the job in the eligibility index (src/lib/eligibility.py) are skipped.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+from collections import namedtuple
+
+from src.lib.data_cache import CACHE_DIR
+from src.lib.eligibility import Requirement, eligible
+
+logger = logging.getLogger(__name__)
+
+ROTATION_DIR = os.getenv("ROTATION_DIR", os.path.join(CACHE_DIR, "rotation"))
+
+RotationSpec = namedtuple("RotationSpec", ["universe", "requirement", "suffix"])
+
+# The stocks of each rotation: a list of src/lib/constants.py, what the job needs of
+# a stock, and the suffix of their Yahoo symbols
+ROTATIONS = {
+    # The 6-month change needs 181 daily bars
+    "bist_stock_by_time": RotationSpec("bist_all", Requirement(min_rows=181), ".IS"),
+    # The change needs the previous close
+    "bist30_change": RotationSpec("bist30_stocks", Requirement(min_rows=2), ".IS"),
+    "analyze_long_term_stock": RotationSpec("us_stock_list", Requirement(min_rows=2), ""),
+}
+
+_lock = threading.Lock()
+
+
+class Rotation:
+    """
+    Shuffled cycles through the names of a universe, kept on disk.
+
+    Args:
+        name (str): Name of the rotation, also the name of its file.
+        spec (RotationSpec): The universe to rotate through, the requirement names not
+            meeting it are skipped for (None for none), and the suffix of their Yahoo symbols.
+        state_dir (str): Directory of the rotation files.
+        rng (random.Random, optional): Source of the shuffles; the random module by default.
+    """
+
+    def __init__(self, name, spec, state_dir=ROTATION_DIR, rng=None):
+        from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+
+        self.name = name
+        self.spec = spec
+        self.names = list(dict.fromkeys(registry()[spec.universe].names()))
+        self.path = os.path.join(state_dir, f"{name}.json")
+        self.rng = rng or random
+        self.queue = []
+        self.last = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read rotation {self.name}: {e}")
+            return
+        if sorted(state.get("pool", [])) != sorted(self.names):
+            logger.info(f"The names of rotation {self.name} changed, starting a new cycle")
+            return
+        self.queue = state.get("queue", [])
+        self.last = state.get("last")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump({"pool": self.names, "queue": self.queue, "last": self.last}, file)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            logger.error(f"Failed to save rotation {self.name}: {e}")
+
+    def _new_cycle(self):
+        """Append a shuffled cycle of every name to the queue."""
+        cycle = list(self.names)
+        self.rng.shuffle(cycle)
+        previous = self.queue[-1] if self.queue else self.last
+        if len(cycle) > 1 and cycle[0] == previous:
+            cycle[0], cycle[-1] = cycle[-1], cycle[0]
+        self.queue.extend(cycle)
+
+    def _eligible(self):
+        if self.spec.requirement is None:
+            return set(self.names)
+        return set(eligible(self.names, self.spec.requirement, self.spec.suffix))
+
+    def upcoming(self, count=1):
+        """
+        Return the next picks without taking them.
+
+        Returns:
+            list: The next count names.
+        """
+        with _lock:
+            allowed = self._eligible()
+            if not allowed:
+                return []
+            picks, cycles = [], 0
+            position = 0
+            while len(picks) < count:
+                if position == len(self.queue):
+                    self._new_cycle()
+                    cycles += 1
+                    if cycles > count:
+                        break
+                if self.queue[position] in allowed:
+                    picks.append(self.queue[position])
+                position += 1
+            if cycles:
+                self._save()
+            return picks
+
+    def next(self):
+        """
+        Take the next pick, skipping names that are not eligible.
+
+        Raises:
+            IndexError: If no name is eligible.
+        """
+        with _lock:
+            allowed = self._eligible()
+            if not allowed:
+                raise IndexError(f"No name of rotation {self.name} meets {self.spec.requirement}")
+            while True:
+                if not self.queue:
+                    self._new_cycle()
+                name = self.queue.pop(0)
+                if name in allowed:
+                    break
+                logger.info(f"Skipping {name} in rotation {self.name}, it does not meet {self.spec.requirement}")
+            self.last = name
+            self._save()
+            logger.info(f"Rotation {self.name} picked {name}, {len(self.queue)} left in the queue")
+            return name
+
+
+def get_rotation(name):
+    """Return the rotation of a job in ROTATIONS."""
+    return Rotation(name, ROTATIONS[name])
+
+
+def next_pick(name):
+    """Take the next pick of the rotation of a job."""
+    return get_rotation(name).next()
+
+
+def upcoming_symbols(name, count=1):
+    """Return the Yahoo symbols of the next picks of the rotation of a job."""
+    rotation = get_rotation(name)
+    return tuple(pick + rotation.spec.suffix for pick in rotation.upcoming(count))
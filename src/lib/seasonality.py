@@ -0,0 +1,212 @@
+"""
+This module computes the monthly seasonality of the commodities.
+
+Energy futures move with the seasons, so the commodity posts add how the current and
+the next calendar month did in the past. ``month_stats()`` takes the month-end closes
+of a symbol and computes, for every calendar month at once with grouped reductions
+(``numpy.bincount`` over the month of each return):
+
+- the average monthly return,
+- the hit rate, the share of the years the month closed higher,
+- the dispersion, the standard deviation of the monthly returns,
+- the number of years behind them.
+
+Only closed months count, so the stats only change when a month closes. The
+``refresh_seasonality`` job keeps the month-end closes and the stats of every
+commodity of ``commodity_price`` in SEASONALITY_PATH and does nothing until a new month
+has closed; it then fetches the daily bars since the last stored month, the whole
+history the first time, and tries again the next day when the closed month has no
+bar yet. The posts read the saved stats and fetch nothing.
+"""
+
+import logging
+import os
+import pickle
+import threading
+from datetime import date
+
+import numpy as np
+
+from src.lib.data_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+SEASONALITY_PATH = os.getenv("SEASONALITY_PATH", os.path.join(CACHE_DIR, "seasonality.pkl"))
+
+MONTHS = ["Ocak", "Şubat", "Mart", "Nisan", "Mayıs", "Haziran", "Temmuz", "Ağustos", "Eylül", "Ekim", "Kasım", "Aralık"]
+
+
+def monthly_closes(closes):
+    """
+    Return the month-end closes of daily closes.
+
+    Args:
+        closes (pandas.Series): Daily closes by date.
+
+    Returns:
+        pandas.Series: Last close of every month, by monthly period.
+    """
+    closes = closes.dropna()
+    return closes.groupby(closes.index.to_period("M")).last()
+
+
+def month_stats(closes):
+    """
+    Compute the return stats of every calendar month.
+
+    Args:
+        closes (pandas.Series): Month-end closes by monthly period, oldest first;
+            months may be missing.
+
+    Returns:
+        dict: Arrays of 12 values, January first: "mean", "hit_rate", "std" (fractions,
+        NaN without returns) and "count".
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    # A missing month leaves the returns into and out of it out, rather than crediting
+    # the return across the gap to the month after it
+    calendar = pd.period_range(closes.index[0], closes.index[-1], freq="M")
+    returns = closes.reindex(calendar).pct_change(fill_method=None).dropna()
+    months = np.asarray(returns.index.month) - 1
+    values = returns.to_numpy(dtype=float)
+    count = np.bincount(months, minlength=12)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(months, weights=values, minlength=12) / count
+        hit_rate = np.bincount(months, weights=values > 0, minlength=12) / count
+        squares = np.bincount(months, weights=(values - mean[months]) ** 2, minlength=12)
+        std = np.sqrt(squares / (count - 1))
+    return {"mean": mean, "hit_rate": hit_rate, "std": np.where(count > 1, std, np.nan), "count": count}
+
+
+_lock = threading.Lock()
+_saved = None
+
+
+def load(path=SEASONALITY_PATH):
+    """
+    Return the saved seasonality of every symbol, reading it from disk on first use.
+
+    Returns:
+        dict: {"closes", "through", "stats"} by symbol.
+    """
+    global _saved  # pylint: disable=global-statement
+    with _lock:
+        if _saved is not None:
+            return _saved
+        _saved = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as file:
+                    _saved = pickle.load(file)
+            except (OSError, pickle.PickleError, EOFError, AttributeError) as e:
+                logger.error(f"Failed to read the seasonality: {e}")
+        return _saved
+
+
+def _save(path):
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(_saved, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logger.error(f"Failed to save the seasonality: {e}")
+
+
+def refresh(symbol, path=SEASONALITY_PATH, today=None):
+    """
+    Update the seasonality of a symbol when a month has closed since the last update.
+
+    Args:
+        symbol (str): Yahoo symbol, e.g. "NG=F".
+        today (date, optional): Today, for the last closed month.
+
+    Returns:
+        bool: True when the stats were updated.
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    import yfinance as yf  # pylint: disable=import-outside-toplevel
+
+    last_closed = pd.Period(today or date.today(), "M") - 1
+    saved = load(path)
+    entry = saved.get(symbol)
+    if entry is not None and entry["through"] >= last_closed:
+        logger.info(f"Seasonality of {symbol} is up to date through {entry['through']}")
+        return False
+    if entry is None:
+        history = yf.Ticker(symbol).history(period="max")
+    else:
+        history = yf.Ticker(symbol).history(start=(entry["through"] + 1).start_time.strftime("%Y-%m-%d"))
+    closes = entry["closes"] if entry is not None else pd.Series(dtype=float)
+    if not history.empty:
+        daily = history["Close"]
+        daily.index = pd.DatetimeIndex(daily.index).tz_localize(None)
+        new = monthly_closes(daily)
+        new = new[new.index <= last_closed]
+        if not closes.empty:
+            new = new[new.index > closes.index[-1]]
+        closes = pd.concat([closes, new]) if not closes.empty else new
+    if len(closes) < 2:
+        logger.error(f"Not enough monthly closes for the seasonality of {symbol}")
+        return False
+    with _lock:
+        # A month without a bar yet, e.g. after a failed fetch, is retried the next day
+        saved[symbol] = {"closes": closes, "through": closes.index[-1], "stats": month_stats(closes)}
+        _save(path)
+    logger.info(f"Seasonality of {symbol} computed from {len(closes)} months through {closes.index[-1]}")
+    return True
+
+
+def refresh_seasonality():
+    """Update the seasonality of the commodities of commodity_price after a month closes."""
+    from src.lib.jobs import SCHEDULE  # pylint: disable=import-outside-toplevel
+
+    logger.start("Running refresh_seasonality")
+    failed = 0
+    for symbol in sorted({job.args[0] for job in SCHEDULE if job.name == "commodity_price"}):
+        try:
+            refresh(symbol)
+        except Exception as e:
+            failed += 1
+            logger.error(f"Failed to refresh the seasonality of {symbol}: {e}")
+    if failed:
+        logger.warning(f"refresh_seasonality could not refresh {failed} symbols")
+    else:
+        logger.ok("refresh_seasonality worked successfully.")
+
+
+def format_seasonality(symbol, today=None):
+    """
+    Format the seasonality section of a post about a symbol, for this month and the next.
+
+    Args:
+        symbol (str): Yahoo symbol, e.g. "NG=F".
+        today (date, optional): Today, for the months.
+
+    Returns:
+        str: The section, empty without saved stats.
+    """
+    entry = load().get(symbol)
+    if entry is None:
+        return ""
+    stats, closes = entry["stats"], entry["closes"]
+    month = (today or date.today()).month - 1
+    lines = [f"📅 Mevsimsellik ({closes.index[0].year}-{closes.index[-1].year})"]
+    for index in (month, (month + 1) % 12):
+        if not stats["count"][index]:
+            continue
+        line = f"▪️ {MONTHS[index]}: ortalama %{stats['mean'][index] * 100:+.1f}, yükseliş oranı %{stats['hit_rate'][index] * 100:.0f}"
+        if not np.isnan(stats["std"][index]):
+            line += f", standart sapma %{stats['std'][index] * 100:.1f}"
+        lines.append(f"{line} ({stats['count'][index]} yıl)")
+    return "\n".join(lines) if len(lines) > 1 else ""
+
+
+def seasonality_section(symbol):
+    """Return the seasonality section of a post about a symbol; empty when there are no stats."""
+    try:
+        return format_seasonality(symbol)
+    except Exception as e:
+        logger.error(f"Failed to read the seasonality of {symbol}: {e}")
+        return ""
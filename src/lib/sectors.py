@@ -0,0 +1,241 @@
+"""
+This module computes the daily performance of every sector from its constituents.
+
+``bist_sector_info`` used to fetch five random sector indices one at a time, each with
+a ``history`` and an ``info`` call. The sectors are now aggregated from the stocks of
+``stocks_by_sector``: one multi-ticker download of their daily closes gives a price
+matrix with the columns of the universe registry (src/lib/universe.py), and the daily
+returns of every sector come out of a few grouped reductions, a product of the sector
+membership matrix with the return vector:
+
+- equal-weight return: the mean return of the constituents,
+- cap-weight return: the returns weighted by the market cap at the previous close,
+- breadth: the number of advancers and decliners.
+
+The matrix is kept for SECTOR_MATRIX_TTL minutes, so the sectors of one post, or of
+posts close together, are computed from a single download. Market caps need the share
+counts of the stocks, which ``refresh_sector_profiles`` keeps in the profiles of the
+window stats (src/lib/window_stats.py); stocks without one are left out of the
+cap-weighted return only.
+
+The official sector indices can still be fetched, in one download, as a cross-check of
+the aggregation (SECTOR_CROSS_CHECK=1); the differences are logged.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+SECTOR_MATRIX_TTL = int(os.getenv("SECTOR_MATRIX_TTL", "15"))
+SECTOR_CROSS_CHECK = os.getenv("SECTOR_CROSS_CHECK", "0") == "1"
+
+# Official Borsa İstanbul index of each sector of stocks_by_sector
+SECTOR_INDICES = {
+    "Banka": "XBANK",
+    "Aracı Kurum": "XAKUR",
+    "Perakende Ticaret": "XTCRT",
+    "Bilişim": "XBLSM",
+    "Gayrimenkul Yatırım Ortaklığı": "XGMYO",
+}
+
+SectorPerformance = namedtuple("SectorPerformance", ["sector", "equal_weight", "cap_weight", "advancers", "decliners", "constituents"])
+SectorPerformance.__doc__ = """
+Daily performance of a sector, from its constituents.
+
+Args:
+    sector (str): Name of the sector in stocks_by_sector.
+    equal_weight (float): Mean daily return of the constituents, in percent.
+    cap_weight (float): Daily return weighted by market cap, in percent; None without
+        share counts.
+    advancers (int): Constituents up on the day.
+    decliners (int): Constituents down on the day.
+    constituents (int): Constituents with a return on the day.
+"""
+
+_lock = threading.Lock()
+_matrix = None
+
+
+def _constituents(universe):
+    """Return the members of every sector."""
+    members = None
+    for sector in universe.sectors():
+        members = universe.sector(sector) if members is None else members | universe.sector(sector)
+    return members
+
+
+def constituent_closes(max_age=SECTOR_MATRIX_TTL * 60):
+    """
+    Return the daily closes of every sector constituent, downloaded at most every max_age seconds.
+
+    Returns:
+        pandas.DataFrame: Closes with a row per day and a column per registry ID.
+    """
+    global _matrix  # pylint: disable=global-statement
+    import yfinance as yf  # pylint: disable=import-outside-toplevel
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+
+    with _lock:
+        if _matrix is not None and time.monotonic() - _matrix[1] <= max_age:
+            return _matrix[0]
+    universe = registry()
+    members = _constituents(universe)
+    frame = yf.download(members.symbols(), period="5d", interval="1d", progress=False)
+    closes = universe.align(frame)
+    with _lock:
+        _matrix = (closes, time.monotonic())
+    logger.info(f"Downloaded the closes of {len(members)} sector constituents")
+    return closes
+
+
+def share_counts():
+    """Return the share count of every registry ID from the saved profiles, NaN without one."""
+    import numpy as np  # pylint: disable=import-outside-toplevel
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+    from src.lib.window_stats import symbol_profile  # pylint: disable=import-outside-toplevel
+
+    universe = registry()
+    shares = np.full(len(universe), np.nan)
+    for column in _constituents(universe):
+        profile = symbol_profile(universe.symbols[column], fetch=False)
+        if profile and profile.get("sharesOutstanding"):
+            shares[column] = profile["sharesOutstanding"]
+    return shares
+
+
+def _last_returns(prices):
+    """
+    Return the previous close of every stock and the return of the last day against it.
+
+    The previous close is older than the day before when the stock did not trade.
+
+    Args:
+        prices (numpy.ndarray): Daily closes with a row per day, oldest first.
+
+    Returns:
+        tuple: (previous closes, returns), NaN without a close.
+    """
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    previous = np.full(prices.shape[1], np.nan)
+    for row in prices[:-1]:
+        previous = np.where(np.isnan(row), previous, row)
+    with np.errstate(invalid="ignore"):
+        return previous, (prices[-1] - previous) / previous
+
+
+def _cap_weighted(membership, previous, returns, shares):
+    """
+    Return the market-cap weighted return of every sector.
+
+    Args:
+        membership (numpy.ndarray): Sector membership, a row per sector and a column per stock.
+        previous (numpy.ndarray): Previous close of every stock.
+        returns (numpy.ndarray): Return of every stock, NaN without one.
+        shares (numpy.ndarray, optional): Share count per registry ID, NaN when unknown.
+
+    Returns:
+        numpy.ndarray: Return of every sector, NaN when no member has a market cap.
+    """
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    if shares is None:
+        return np.full(len(membership), np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        caps = previous * shares[: len(previous)]
+        has_cap = ~np.isnan(caps) & ~np.isnan(returns)
+        return membership @ np.where(has_cap, caps * returns, 0.0) / (membership @ np.where(has_cap, caps, 0.0))
+
+
+def aggregate(closes, shares=None):
+    """
+    Compute the daily performance of every sector from a price matrix.
+
+    Args:
+        closes (pandas.DataFrame): Daily closes with a column per registry ID, oldest first.
+        shares (numpy.ndarray, optional): Share count per registry ID, NaN when unknown.
+
+    Returns:
+        list: SectorPerformance of every sector, in the order of stocks_by_sector.
+    """
+    import numpy as np  # pylint: disable=import-outside-toplevel
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+
+    universe = registry()
+    sectors = universe.sectors()
+    previous, returns = _last_returns(closes.to_numpy(dtype=float))
+    valid = ~np.isnan(returns)
+    filled = np.where(valid, returns, 0.0)
+
+    # Sector membership as a (sectors x stocks) matrix, so every sector is one row of a product
+    membership = np.stack([universe.sector(sector).mask()[: len(returns)] for sector in sectors]).astype(float)
+    counts = membership @ valid
+    with np.errstate(invalid="ignore", divide="ignore"):
+        equal_weight = membership @ filled / counts
+    cap_weight = _cap_weighted(membership, previous, returns, shares)
+    advancers = membership @ (filled > 0)
+    decliners = membership @ (filled < 0)
+    return [
+        SectorPerformance(
+            sector,
+            round(float(equal_weight[i]) * 100, 2) if counts[i] else None,
+            round(float(cap_weight[i]) * 100, 2) if np.isfinite(cap_weight[i]) else None,
+            int(advancers[i]),
+            int(decliners[i]),
+            int(counts[i]),
+        )
+        for i, sector in enumerate(sectors)
+    ]
+
+
+def sector_performance():
+    """Return the daily performance of every sector, from the cached constituent closes."""
+    performance = aggregate(constituent_closes(), share_counts())
+    if SECTOR_CROSS_CHECK:
+        cross_check(performance)
+    return performance
+
+
+def cross_check(performance):
+    """Log the difference between the aggregated and the official sector returns."""
+    import yfinance as yf  # pylint: disable=import-outside-toplevel
+
+    symbols = [SECTOR_INDICES[item.sector] + ".IS" for item in performance if item.sector in SECTOR_INDICES]
+    try:
+        closes = yf.download(symbols, period="5d", interval="1d", progress=False)["Close"]
+    except Exception as e:
+        logger.error(f"Failed to fetch the sector indices for the cross-check: {e}")
+        return
+    for item in performance:
+        symbol = SECTOR_INDICES.get(item.sector, "") + ".IS"
+        if symbol not in closes:
+            continue
+        series = closes[symbol].dropna()
+        if len(series) < 2:
+            continue
+        official = (series.iloc[-1] / series.iloc[-2] - 1) * 100
+        logger.info(f"{item.sector}: aggregated %{item.cap_weight}, equal-weight %{item.equal_weight}, {symbol} %{official:.2f}")
+
+
+def refresh_sector_profiles():
+    """Read the share counts of the sector constituents that have no fresh profile."""
+    from src.lib.universe import registry  # pylint: disable=import-outside-toplevel
+    from src.lib.window_stats import symbol_profile  # pylint: disable=import-outside-toplevel
+
+    logger.start("Running refresh_sector_profiles")
+    universe = registry()
+    failed = 0
+    for symbol in _constituents(universe).symbols():
+        try:
+            symbol_profile(symbol)
+        except Exception as e:
+            failed += 1
+            logger.error(f"Failed to read the profile of {symbol}: {e}")
+    if failed:
+        logger.warning(f"refresh_sector_profiles could not read {failed} profiles")
+    else:
+        logger.ok("refresh_sector_profiles worked successfully.")
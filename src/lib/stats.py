@@ -0,0 +1,135 @@
+"""
+This module collects per-run statistics of a job: time spent per stage and data requests made.
+
+A job run is wrapped in ``collect_stats()``; the data providers, the chart rendering
+and the email sinks report into the collector of the current thread through ``stage()``
+and ``count_request()``. Outside of ``collect_stats()`` reporting is a no-op.
+"""
+
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class RunStats:
+    """Stage timings and request counts of one job run."""
+
+    def __init__(self):
+        self.stages = defaultdict(float)
+        self.requests = Counter()
+        self.bytes = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self._active_stage = None
+
+    @property
+    def request_count(self):
+        """Total number of data requests."""
+        return sum(self.requests.values())
+
+    def as_dict(self):
+        """Return the statistics as a JSON-serializable dict."""
+        stages = dict(self.stages)
+        stages["other"] = max(0.0, self.wall_time - sum(stages.values()))
+        return {
+            "wall_time": round(self.wall_time, 4),
+            "cpu_time": round(self.cpu_time, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in stages.items()},
+            "requests": dict(self.requests),
+            "request_count": self.request_count,
+            "bytes": self.bytes,
+        }
+
+
+def current_stats():
+    """Return the RunStats of the current thread, or None when no run is being collected."""
+    return getattr(_local, "stats", None)
+
+
+@contextmanager
+def collect_stats():
+    """
+    Collect statistics for the code run inside the block.
+
+    Yields:
+        RunStats: The statistics, filled in when the block exits.
+    """
+    stats = RunStats()
+    previous = current_stats()
+    _local.stats = stats
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield stats
+    finally:
+        stats.wall_time = time.perf_counter() - wall_start
+        stats.cpu_time = time.process_time() - cpu_start
+        _local.stats = previous
+
+
+@contextmanager
+def attach_stats(stats):
+    """
+    Report into the given RunStats from another thread, e.g. one fetching for the run.
+
+    Args:
+        stats (RunStats, optional): The statistics to report into; None disables reporting.
+    """
+    previous = current_stats()
+    _local.stats = stats
+    try:
+        yield stats
+    finally:
+        _local.stats = previous
+
+
+@contextmanager
+def stage(name):
+    """
+    Time the block as the given stage (e.g. "fetch", "render", "send").
+
+    Nested stages are attributed to the outermost one, so time is never counted twice.
+    """
+    stats = current_stats()
+    if stats is None or stats._active_stage is not None:  # pylint: disable=protected-access
+        yield
+        return
+    stats._active_stage = name  # pylint: disable=protected-access
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.stages[name] += time.perf_counter() - start
+        stats._active_stage = None  # pylint: disable=protected-access
+
+
+def count_request(kind, nbytes=0):
+    """
+    Count a data request in the current run.
+
+    Args:
+        kind (str): The kind of request, e.g. "yfinance.history" or "http".
+        nbytes (int): Size of the response in bytes.
+    """
+    stats = current_stats()
+    if stats is not None:
+        stats.requests[kind] += 1
+        stats.bytes += nbytes
+
+
+def install_render_timing():
+    """Time every Figure.savefig call, where matplotlib does the drawing, as the "render" stage."""
+    from matplotlib.figure import Figure  # pylint: disable=import-outside-toplevel
+
+    if getattr(Figure.savefig, "_timed", False):
+        return
+    savefig = Figure.savefig
+
+    def timed_savefig(self, *args, **kwargs):
+        with stage("render"):
+            return savefig(self, *args, **kwargs)
+
+    timed_savefig._timed = True  # pylint: disable=protected-access
+    Figure.savefig = timed_savefig
@@ -0,0 +1,249 @@
+"""
+This module generates synthetic market data, for scale testing without the network.
+
+Every symbol follows a geometric Brownian motion with its own drift and volatility,
+seeded by the symbol and a global seed, so the same symbol always gets the same bars.
+All symbols share one trading calendar with weekends and holidays, and each symbol
+also misses a few random days. Some symbols split: history is split-adjusted like
+yfinance returns it by default, and ``auto_adjust=False`` returns the raw prices.
+Intraday bars fill the session of the most recent days with a Brownian bridge from the
+open to the close of each day.
+"""
+
+import zlib
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from src.lib.providers import DAILY_INTERVALS, HISTORY_COLUMNS, _split_tickers, select_bars
+
+MARKET_TZ = "Europe/Istanbul"
+SESSION_START = pd.Timedelta(hours=10)
+SESSION_END = pd.Timedelta(hours=18)
+SPLIT_RATIOS = (2.0, 3.0, 4.0, 5.0, 10.0)
+TRADING_DAYS_PER_YEAR = 252
+
+# How the bars are generated:
+# - years: years of daily bars per symbol
+# - holidays_per_year: weekdays per year on which the market is closed
+# - missing_rate: probability that a trading day is missing from a symbol
+# - splits_per_year: expected number of splits per symbol and year
+# - intraday_days: number of most recent trading days that have intraday bars
+# - drift: mean and standard deviation of the annual drift of the symbols
+# - volatility: range of the annual volatility of the symbols
+SyntheticConfig = namedtuple(
+    "SyntheticConfig",
+    ["years", "holidays_per_year", "missing_rate", "splits_per_year", "intraday_days", "drift", "volatility"],
+    defaults=(10, 12, 0.002, 0.02, 30, (0.08, 0.10), (0.15, 0.60)),
+)
+
+
+def synthetic_universe(count, suffix=".IS"):
+    """
+    Return the names of a synthetic universe, e.g. ["SYN0000.IS", "SYN0001.IS", ...].
+
+    Args:
+        count (int): Number of symbols.
+        suffix (str): Exchange suffix of the symbols.
+    """
+    width = max(4, len(str(count - 1)))
+    return [f"SYN{index:0{width}d}{suffix}" for index in range(count)]
+
+
+class SyntheticProvider:
+    """
+    Serve generated bars for any symbol.
+
+    Args:
+        seed (int): Global seed; the bars of a symbol depend only on it and the symbol.
+        config (SyntheticConfig): How the bars are generated.
+        end (str, optional): Date of the last bar; defaults to today.
+        cache_size (int): Number of generated series kept in memory.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, seed=0, config=SyntheticConfig(), end=None, cache_size=256):
+        self.seed = seed
+        self.config = config
+        self.end = pd.Timestamp(end or pd.Timestamp.now(tz=MARKET_TZ).date())
+        self.cache_size = cache_size
+        self._calendar = None
+        self._cache = OrderedDict()
+
+    def _rng(self, *keys):
+        return np.random.default_rng([self.seed, *(zlib.crc32(str(key).encode()) for key in keys)])
+
+    @property
+    def calendar(self):
+        """The trading days shared by every symbol, oldest first."""
+        if self._calendar is None:
+            years, holidays_per_year = self.config.years, self.config.holidays_per_year
+            days = pd.bdate_range(end=self.end, periods=int(years * (TRADING_DAYS_PER_YEAR + holidays_per_year)))
+            holidays = []
+            for year in sorted(set(days.year)):
+                weekdays = days[days.year == year]
+                rng = self._rng("holidays", year)
+                # New Year's Day, a couple of multi-day religious holidays and single days at random dates
+                closed = weekdays[(weekdays.month == 1) & (weekdays.day == 1)]
+                for _ in range(2):
+                    first = int(rng.integers(0, len(weekdays)))
+                    closed = closed.union(weekdays[first : first + int(rng.integers(3, 5))])
+                remaining = weekdays.difference(closed)
+                count = min(max(0, holidays_per_year - len(closed)), len(remaining))
+                closed = closed.union(remaining[np.sort(rng.choice(len(remaining), size=count, replace=False))])
+                holidays.append(closed)
+            self._calendar = days.difference(holidays[0].append(holidays[1:]))[-years * TRADING_DAYS_PER_YEAR :]
+        return self._calendar
+
+    def _cached(self, key, build):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = build()
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def daily_bars(self, symbol):
+        """
+        Return the split-adjusted daily bars of a symbol and its splits.
+
+        Returns:
+            tuple: (pandas.DataFrame of bars, pandas.Series of split ratios indexed by date)
+        """
+        return self._cached((symbol, "1d"), lambda: self._generate_daily(symbol))
+
+    def _generate_daily(self, symbol):
+        rng = self._rng(symbol)
+        index = pd.DatetimeIndex(self._trading_days(rng), name="Date").tz_localize(MARKET_TZ)
+        frame = pd.DataFrame(self._price_path(rng, len(index)), index=index, columns=HISTORY_COLUMNS)
+        return frame, self._splits(rng, index)
+
+    def _trading_days(self, rng):
+        """Return the days of the calendar a symbol trades on."""
+        days = self.calendar
+        # Drop a few random days, but never the first or the last one
+        keep = rng.random(len(days)) >= self.config.missing_rate
+        keep[0] = keep[-1] = True
+        return days[keep]
+
+    def _price_path(self, rng, count):
+        """Return the columns of count daily bars following a geometric Brownian motion."""
+        dt = 1 / TRADING_DAYS_PER_YEAR
+        drift, volatility = rng.normal(*self.config.drift), rng.uniform(*self.config.volatility)
+        shocks = rng.standard_normal(count)
+        log_returns = (drift - volatility**2 / 2) * dt + volatility * np.sqrt(dt) * shocks
+        close = rng.uniform(5, 500) * np.exp(np.cumsum(log_returns))
+        previous_close = np.concatenate([[close[0]], close[:-1]])
+        open_ = previous_close * np.exp(rng.normal(0, volatility * np.sqrt(dt) / 3, count))
+        wick = np.abs(rng.normal(0, volatility * np.sqrt(dt) / 2, (2, count)))
+        return {
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + wick[0]),
+            "Low": np.minimum(open_, close) * (1 - wick[1]),
+            "Close": close,
+            "Volume": np.round(rng.lognormal(np.log(rng.uniform(1e5, 1e7)), 0.5, count)),
+        }
+
+    def _splits(self, rng, index):
+        """Return the split ratios of a symbol, indexed by the date of the split."""
+        count = min(rng.poisson(self.config.splits_per_year * self.config.years), len(index) - 1)
+        days = np.sort(rng.choice(np.arange(1, len(index)), size=count, replace=False))
+        return pd.Series(rng.choice(SPLIT_RATIOS, size=count), index=index[days], name="Stock Splits")
+
+    def raw_daily_bars(self, symbol):
+        """Return the daily bars of a symbol as traded, before the split adjustment."""
+        frame, splits = self.daily_bars(symbol)
+        # Each bar is scaled by the product of the splits that happened after it
+        factor = pd.Series(1.0, index=frame.index)
+        for day, ratio in splits.items():
+            factor[frame.index < day] *= ratio
+        raw = frame.copy()
+        for column in ("Open", "High", "Low", "Close"):
+            raw[column] = frame[column] * factor
+        raw["Volume"] = np.round(frame["Volume"] / factor)
+        return raw
+
+    def intraday_bars(self, symbol, interval):
+        """Return the intraday bars of a symbol for the most recent trading days."""
+        return self._cached((symbol, interval), lambda: self._generate_intraday(symbol, interval))
+
+    def _generate_intraday(self, symbol, interval):
+        daily, _splits = self.daily_bars(symbol)
+        daily = daily.iloc[-self.config.intraday_days :]
+        rng = self._rng(symbol, interval)
+        step = pd.Timedelta(interval.replace("m", "min"))
+        offsets = pd.timedelta_range(SESSION_START, SESSION_END - step, freq=step)
+        frames = []
+        for day, bar in daily.iterrows():
+            count = len(offsets)
+            # A Brownian bridge from the open to the close of the day
+            walk = np.cumsum(rng.standard_normal(count)) * 0.002
+            walk -= np.linspace(0, 1, count) * (walk[-1] - np.log(bar["Close"] / bar["Open"]))
+            close = bar["Open"] * np.exp(walk)
+            open_ = np.concatenate([[bar["Open"]], close[:-1]])
+            wick = np.abs(rng.normal(0, 0.001, (2, count)))
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "Open": open_,
+                        "High": np.maximum(open_, close) * (1 + wick[0]),
+                        "Low": np.minimum(open_, close) * (1 - wick[1]),
+                        "Close": close,
+                        "Volume": np.round(bar["Volume"] * rng.dirichlet(np.ones(count))),
+                    },
+                    index=pd.DatetimeIndex(day + offsets, name="Datetime"),
+                    columns=HISTORY_COLUMNS,
+                )
+            )
+        if not frames:
+            return pd.DataFrame(columns=HISTORY_COLUMNS, dtype=float)
+        return pd.concat(frames)
+
+    def bars(self, symbol, interval="1d", auto_adjust=True):
+        """Return every bar of a symbol for an interval."""
+        if interval in DAILY_INTERVALS:
+            return self.daily_bars(symbol)[0] if auto_adjust else self.raw_daily_bars(symbol)
+        return self.intraday_bars(symbol, interval)
+
+    def ticker_info(self, symbol):
+        bars = self.daily_bars(symbol)[0]
+        year = bars.iloc[-TRADING_DAYS_PER_YEAR:]
+        last = float(bars["Close"].iloc[-1])
+        return {
+            "symbol": symbol,
+            "shortName": symbol,
+            "longName": f"{symbol} A.Ş.",
+            "financialCurrency": "TRY" if symbol.endswith(".IS") else "USD",
+            "currentPrice": last,
+            "regularMarketPrice": last,
+            "open": float(bars["Open"].iloc[-1]),
+            "dayHigh": float(bars["High"].iloc[-1]),
+            "previousClose": float(bars["Close"].iloc[-2]),
+            "fiftyTwoWeekHigh": float(year["High"].max()),
+            "fiftyTwoWeekLow": float(year["Low"].min()),
+            "averageDailyVolume10Day": float(bars["Volume"].iloc[-10:].mean()),
+            "marketCap": last * 1e9,
+        }
+
+    def ticker_history(self, symbol, period="1mo", interval="1d", start=None, end=None, auto_adjust=True, **_kwargs):
+        bars = self.bars(symbol, interval, auto_adjust)
+        return select_bars(bars, period=None if start or end else period, start=start, end=end)
+
+    def download(self, tickers, period=None, interval="1d", start=None, end=None, auto_adjust=True, **_kwargs):
+        symbols = _split_tickers(tickers)
+        frames = {}
+        for symbol in symbols:
+            frame = select_bars(self.bars(symbol, interval, auto_adjust), period=period or "1mo", start=start, end=end)
+            # Like yf.download, daily bars come back without a timezone
+            frames[symbol] = frame.tz_localize(None) if interval in DAILY_INTERVALS else frame
+        if len(symbols) == 1:
+            return frames[symbols[0]]
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+    def http_request(self, method, url, headers=None, body=None):  # pylint: disable=unused-argument
+        """There is no synthetic data for the HTTP APIs."""
+        return 404, b""
@@ -0,0 +1,223 @@
+"""
+This module holds the trading calendars of Borsa İstanbul and the NYSE.
+
+The sessions of every day from FIRST_YEAR to LAST_YEAR are computed once, on first use,
+into a dict per market, so "is the market open today" and "when does it close" are
+dict lookups. The scheduler consults it before running a market-specific job (MARKETS
+in src/lib/jobs.py), so on a holiday nothing is fetched, rendered or sent.
+
+Borsa İstanbul is closed on the official holidays and on the religious holidays
+(bayram), and closes early on the eve (arife) of a bayram and of Republic Day. The
+dates of the bayrams follow the Hijri calendar and are listed as announced by the
+Presidency of Religious Affairs; add the coming years to RAMAZAN_BAYRAMI and
+KURBAN_BAYRAMI as they are announced. The NYSE holidays and early closes follow the
+rules of the exchange.
+"""
+
+import logging
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+FIRST_YEAR = 2020
+LAST_YEAR = 2030
+
+Market = namedtuple("Market", ["tz", "open", "close", "early_close"])
+
+MARKETS = {
+    # Continuous trading ends at 18:00, the closing auction runs until about 18:10
+    "BIST": Market("Europe/Istanbul", time(10, 0), time(18, 10), time(12, 30)),
+    "NYSE": Market("America/New_York", time(9, 30), time(16, 0), time(13, 0)),
+}
+
+Session = namedtuple("Session", ["open", "close", "early_close"])
+Session.__doc__ = """
+Trading session of a market on a day.
+
+Args:
+    open (datetime): Opening time, in the timezone of the market.
+    close (datetime): Closing time, in the timezone of the market.
+    early_close (bool): The market closes early that day.
+"""
+
+# First days of the bayrams in Turkey
+RAMAZAN_BAYRAMI = {
+    2020: date(2020, 5, 24),
+    2021: date(2021, 5, 13),
+    2022: date(2022, 5, 2),
+    2023: date(2023, 4, 21),
+    2024: date(2024, 4, 10),
+    2025: date(2025, 3, 30),
+    2026: date(2026, 3, 20),
+    2027: date(2027, 3, 9),
+    2028: date(2028, 2, 26),
+    2029: date(2029, 2, 14),
+    2030: date(2030, 2, 4),
+}
+KURBAN_BAYRAMI = {
+    2020: date(2020, 7, 31),
+    2021: date(2021, 7, 20),
+    2022: date(2022, 7, 9),
+    2023: date(2023, 6, 28),
+    2024: date(2024, 6, 16),
+    2025: date(2025, 6, 6),
+    2026: date(2026, 5, 27),
+    2027: date(2027, 5, 16),
+    2028: date(2028, 5, 5),
+    2029: date(2029, 4, 24),
+    2030: date(2030, 4, 13),
+}
+
+# New Year, National Sovereignty and Children's Day, Labour Day, Youth and Sports Day,
+# Democracy Day, Victory Day, Republic Day
+BIST_FIXED_HOLIDAYS = [(1, 1), (4, 23), (5, 1), (5, 19), (7, 15), (8, 30), (10, 29)]
+
+
+def easter(year):
+    """Return the date of Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """Return the n-th (1-based; -1 for the last) given weekday of a month."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day):
+    """Move a holiday on a weekend to the Friday before or the Monday after."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def bist_holidays(year):
+    """
+    Return the holidays and early closes of Borsa İstanbul in a year.
+
+    Returns:
+        tuple: (set of closed days, set of early-close days)
+    """
+    closed = {date(year, month, day) for month, day in BIST_FIXED_HOLIDAYS}
+    early = {date(year, 10, 28)}
+    for first, days in ((RAMAZAN_BAYRAMI.get(year), 3), (KURBAN_BAYRAMI.get(year), 4)):
+        if first is None:
+            continue
+        closed.update(first + timedelta(days=offset) for offset in range(days))
+        early.add(first - timedelta(days=1))
+    return closed, early - closed
+
+
+def nyse_holidays(year):
+    """
+    Return the holidays and early closes of the NYSE in a year.
+
+    Returns:
+        tuple: (set of closed days, set of early-close days)
+    """
+    closed = {
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)),
+    }
+    # New Year's Day on a Saturday is not made up on the Friday before
+    if date(year, 1, 1).weekday() != 5:
+        closed.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        closed.add(_observed(date(year, 6, 19)))  # Juneteenth
+    early = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1)}
+    for day in (date(year, 7, 3), date(year, 12, 24)):
+        if day.weekday() < 4 or (day.month == 12 and day.weekday() == 4):
+            early.add(day)
+    return closed, early - closed
+
+
+_HOLIDAYS = {"BIST": bist_holidays, "NYSE": nyse_holidays}
+
+# Closures announced outside of the rules, e.g. a national day of mourning
+EXTRA_CLOSED = {
+    "BIST": set(),
+    "NYSE": {date(2025, 1, 9)},
+}
+
+
+@lru_cache(maxsize=None)
+def _sessions(market):
+    """Compute the sessions of a market, by date, for every year of the calendar."""
+    holidays = _HOLIDAYS[market]
+    sessions = {}
+    for year in range(FIRST_YEAR, LAST_YEAR + 1):
+        closed, early = holidays(year)
+        day = date(year, 1, 1)
+        while day.year == year:
+            if day.weekday() < 5 and day not in closed and day not in EXTRA_CLOSED[market]:
+                sessions[day] = day in early
+            day += timedelta(days=1)
+    return sessions
+
+
+def _today(market):
+    return datetime.now(pytz.timezone(MARKETS[market].tz)).date()
+
+
+def is_trading_day(market, day=None):
+    """
+    Check whether a market has a session on a day.
+
+    Args:
+        market (str): "BIST" or "NYSE".
+        day (date, optional): The day, today in the timezone of the market by default.
+
+    Returns:
+        bool: True when the market opens that day, also for early closes.
+    """
+    day = day or _today(market)
+    if not FIRST_YEAR <= day.year <= LAST_YEAR:
+        logger.warning(f"No {market} calendar for {day.year}, only skipping weekends")
+        return day.weekday() < 5
+    return day in _sessions(market)
+
+
+def session(market, day=None):
+    """
+    Return the trading session of a market on a day.
+
+    Args:
+        market (str): "BIST" or "NYSE".
+        day (date, optional): The day, today in the timezone of the market by default.
+
+    Returns:
+        Session: The session, or None when the market is closed that day.
+    """
+    day = day or _today(market)
+    if not is_trading_day(market, day):
+        return None
+    early_close = _sessions(market).get(day, False)
+    spec = MARKETS[market]
+    tz = pytz.timezone(spec.tz)
+    close = spec.early_close if early_close else spec.close
+    return Session(tz.localize(datetime.combine(day, spec.open)), tz.localize(datetime.combine(day, close)), early_close)
+
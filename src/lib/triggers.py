@@ -0,0 +1,167 @@
+"""
+This module publishes the market open and close jobs when their data is available,
+instead of at a fixed time.
+
+A triggered job is started ``lead`` minutes before its nominal time. From the opening
+or closing time of the day's session of its exchange on (src/lib/trading_calendar.py),
+it polls the daily bar of a symbol through the chart API with
+backoff, and runs the job once today's opening or closing print has appeared and
+stayed unchanged for ``settle`` seconds. Polls are made from the scheduler loop, one
+per tick, so other jobs keep running meanwhile. When the print has not appeared
+``timeout`` minutes after the session time, e.g. on a market holiday, the post is
+skipped rather than published with the previous day's numbers.
+
+On a day the exchange closes early, e.g. the eve of a bayram, a close-triggered job is
+started earlier by as much as the session is shorter, see ``start_time()``.
+
+Set PUBLISH_TRIGGERS=0 to run the jobs at their nominal times instead.
+"""
+
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from src.lib.trading_calendar import MARKETS, session
+
+logger = logging.getLogger(__name__)
+
+PUBLISH_TRIGGERS = os.getenv("PUBLISH_TRIGGERS", "1") == "1"
+POLL_INTERVAL = float(os.getenv("TRIGGER_POLL_INTERVAL", "5"))
+POLL_MAX_INTERVAL = float(os.getenv("TRIGGER_POLL_MAX_INTERVAL", "60"))
+POLL_BACKOFF = 1.5
+
+Trigger = namedtuple("Trigger", ["symbol", "print", "market", "lead", "timeout", "settle"], defaults=(15, 30, 60))
+Trigger.__doc__ = """
+Data trigger of a job.
+
+Args:
+    symbol (str): Symbol whose daily bar is polled.
+    print (str): "open" or "close".
+    market (str): Market of the session, "BIST" or "NYSE"; the print can appear from
+        the opening or closing time of the day's session on.
+    lead (int): Minutes before the nominal time of the job to start.
+    timeout (int): Minutes after the session time to give up.
+    settle (int): Seconds the print must stay unchanged.
+"""
+
+
+def start_time(trigger, nominal, early_close=False):
+    """
+    Return the time a triggered job is started at.
+
+    Args:
+        trigger (Trigger, optional): Trigger of the job; None without one.
+        nominal (str): Nominal time of the job, e.g. "10:17".
+        early_close (bool): For a day the market closes early; a close-triggered job
+            then starts earlier by as much as the session is shorter.
+
+    Returns:
+        str: ``lead`` minutes before the nominal time, or the nominal time when triggers
+        are off or the job has no trigger.
+    """
+    if trigger is None or not PUBLISH_TRIGGERS:
+        return nominal
+    start = datetime.strptime(nominal, "%H:%M") - timedelta(minutes=trigger.lead)
+    if early_close and trigger.print == "close":
+        spec = MARKETS[trigger.market]
+        start -= datetime.combine(date.min, spec.close) - datetime.combine(date.min, spec.early_close)
+    return start.strftime("%H:%M")
+
+
+class TriggeredRun:
+    """
+    Poll for the print of one run of a triggered job and run the job once it is there.
+
+    Args:
+        name (str): Name of the job.
+        trigger (Trigger): Trigger of the job.
+        run (callable): Called with the name and args of the job to run it.
+        args (tuple): Arguments of the job.
+    """
+
+    # Returns the current time in seconds since the epoch; a subclass can override it
+    clock = staticmethod(time.time)
+
+    def __init__(self, name, trigger, run, args=()):
+        self.name = name
+        self.trigger = trigger
+        self.run = run
+        self.args = args
+        spec = MARKETS[trigger.market]
+        tz = pytz.timezone(spec.tz)
+        now = datetime.fromtimestamp(self.clock(), tz)
+        today = session(trigger.market, now.date())
+        if today is None:
+            # Not a trading day; the scheduler does not start the job then, but keep the
+            # regular times for a run by hand
+            at = tz.localize(datetime.combine(now.date(), spec.open if trigger.print == "open" else spec.close))
+        else:
+            at = today.open if trigger.print == "open" else today.close
+        self.session_time = at.strftime("%H:%M")
+        self.session_date = at.date()
+        self.session_at = at.timestamp()
+        self.give_up_at = self.session_at + trigger.timeout * 60
+        self.next_poll = self.session_at
+        self.interval = POLL_INTERVAL
+        self.value = None
+        self.since = None
+        self.polls = 0
+
+    def observe(self):
+        """
+        Read today's print from the daily bars of the trigger symbol.
+
+        Returns:
+            float: The print, or None when today's bar is not there yet.
+        """
+        # pylint: disable=import-outside-toplevel
+        import pandas as pd
+        import yfinance as yf
+
+        bars = yf.Ticker(self.trigger.symbol).history(period="5d")
+        if bars.empty or bars.index[-1].date() != self.session_date:
+            return None
+        value = bars["Open" if self.trigger.print == "open" else "Close"].iloc[-1]
+        return None if pd.isna(value) else float(value)  # NaN until the print appears
+
+    def poll(self):
+        """
+        Poll when it is time to, and run the job once the print is settled.
+
+        Returns:
+            bool: True when the run is over, because the job ran or the trigger gave up.
+        """
+        now = self.clock()
+        if now < self.next_poll:
+            return False
+        if now >= self.give_up_at:
+            logger.warning(f"No {self.trigger.print} print for {self.trigger.symbol} {self.trigger.timeout} minutes after {self.session_time}, skipping {self.name}")
+            return True
+
+        self.polls += 1
+        try:
+            value = self.observe()
+        except Exception as e:
+            logger.error(f"Failed to poll {self.trigger.symbol} for {self.name}: {e}")
+            value = None
+
+        if value is None:
+            self.value, self.since = None, None
+            self.interval = min(self.interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
+        elif value != self.value:
+            # A new print, check it again soon to see whether it settles
+            self.value, self.since = value, now
+            self.interval = POLL_INTERVAL
+        elif now - self.since >= self.trigger.settle:
+            logger.info(
+                f"{self.trigger.symbol} {self.trigger.print} print {value} settled "
+                f"{now - self.session_at:.0f}s after {self.session_time} after {self.polls} polls, running {self.name}"
+            )
+            self.run(self.name, *self.args)
+            return True
+        self.next_poll = now + self.interval
+        return False
@@ -0,0 +1,240 @@
+"""
+This module interns the symbols of src/lib/constants.py to integer IDs.
+
+Every stock, sector index and US stock of the constants gets a stable ID, in the order
+of LISTS: bist_all first, then the stocks that are only in bist100_stocks or
+bist30_stocks, the sector indices (endeksler) and us_stock_list, and last the stocks
+that are only in stocks_by_sector. New symbols are appended, so IDs do not move when a
+list grows at its end.
+
+The lists and sectors are kept as bitsets over the IDs (Python ints), so membership is
+a bit test and questions like "BIST100 members of Banka not in BIST30" are a couple of
+integer operations instead of list scans:
+
+    universe = registry()
+    picks = universe["bist100_stocks"] & universe.sector("Banka") - universe["bist30_stocks"]
+    picks.names()
+
+IDs are also the column positions of price matrices: ``align()`` orders the columns of a
+multi-ticker download by ID, so column i of the matrix is the symbol with ID i and a
+membership ``mask()`` selects its columns without a join on names.
+"""
+
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Lists of src/lib/constants.py interned into the registry, with the suffix of their
+# Yahoo symbols
+LISTS = {
+    "bist_all": ".IS",
+    "bist100_stocks": ".IS",
+    "bist30_stocks": ".IS",
+    "endeksler": ".IS",
+    "us_stock_list": "",
+}
+
+
+class Members:
+    """
+    A set of symbols of a universe, as a bitset over their IDs.
+
+    Supports ``&``, ``|``, ``-``, ``^`` and ``~`` with other members of the same universe,
+    ``len()``, ``in`` with a Yahoo symbol or an ID, and iterates over the IDs in order.
+    """
+
+    __slots__ = ("universe", "bits")
+
+    def __init__(self, universe, bits=0):
+        self.universe = universe
+        self.bits = bits
+
+    def _check(self, other):
+        if not isinstance(other, Members) or other.universe is not self.universe:
+            raise TypeError("Members can only be combined with members of the same universe")
+        return other.bits
+
+    def __and__(self, other):
+        return Members(self.universe, self.bits & self._check(other))
+
+    def __or__(self, other):
+        return Members(self.universe, self.bits | self._check(other))
+
+    def __sub__(self, other):
+        return Members(self.universe, self.bits & ~self._check(other))
+
+    def __xor__(self, other):
+        return Members(self.universe, self.bits ^ self._check(other))
+
+    def __invert__(self):
+        return Members(self.universe, self.universe.everything & ~self.bits)
+
+    def __eq__(self, other):
+        return isinstance(other, Members) and other.universe is self.universe and other.bits == self.bits
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __contains__(self, item):
+        if isinstance(item, str):
+            item = self.universe.ids.get(item)
+            if item is None:
+                return False
+        return item >= 0 and bool(self.bits >> item & 1)
+
+    def __iter__(self):
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    def __repr__(self):
+        return f"Members({len(self)} of {len(self.universe)})"
+
+    def ids(self):
+        """Return the IDs, in order."""
+        return list(self)
+
+    def symbols(self):
+        """Return the Yahoo symbols, e.g. "AKBNK.IS", in the order of their IDs."""
+        return [self.universe.symbols[i] for i in self]
+
+    def names(self):
+        """Return the names as in src/lib/constants.py, e.g. "AKBNK", in the order of their IDs."""
+        return [self.universe.names[i] for i in self]
+
+    def mask(self):
+        """Return a boolean array over the IDs, to select the columns of a price matrix."""
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        mask = np.zeros(len(self.universe), dtype=bool)
+        mask[self.ids()] = True
+        return mask
+
+
+class Universe:
+    """
+    Symbols interned to integer IDs, with named sets and sectors as bitsets.
+
+    Args:
+        lists (dict): (names, suffix) by set name; IDs follow the order of the lists.
+        sectors (dict, optional): Stock names by sector, with the suffix ".IS".
+    """
+
+    def __init__(self, lists, sectors=None):
+        self.symbols = []
+        self.names = []
+        self.ids = {}
+        self._sets = {}
+        self._sectors = {}
+        for set_name, (names, suffix) in lists.items():
+            self._sets[set_name] = self._bits(names, suffix)
+        for sector, names in (sectors or {}).items():
+            self._sectors[sector] = self._bits(names, ".IS")
+        self.everything = (1 << len(self.symbols)) - 1
+
+    def intern(self, name, suffix=""):
+        """Return the ID of a symbol, giving it the next ID when it is new."""
+        symbol = name + suffix
+        if symbol not in self.ids:
+            self.ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self.names.append(name)
+        return self.ids[symbol]
+
+    def _bits(self, names, suffix):
+        bits = 0
+        for name in names:
+            bits |= 1 << self.intern(name, suffix)
+        return bits
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getitem__(self, set_name):
+        return self.members(set_name)
+
+    def id(self, symbol):
+        """
+        Return the ID of a Yahoo symbol.
+
+        Raises:
+            KeyError: If the symbol is not in the universe.
+        """
+        return self.ids[symbol]
+
+    def members(self, set_name):
+        """
+        Return the members of a list of src/lib/constants.py, e.g. "bist30_stocks", or
+        "bist_stocks" for every BIST stock of the lists and sectors.
+
+        Raises:
+            KeyError: If there is no such list.
+        """
+        if set_name == "bist_stocks":
+            bits = self._sets["bist_all"] | self._sets["bist100_stocks"] | self._sets["bist30_stocks"]
+            for sector_bits in self._sectors.values():
+                bits |= sector_bits
+            return Members(self, bits)
+        return Members(self, self._sets[set_name])
+
+    def sector(self, sector):
+        """
+        Return the stocks of a sector of stocks_by_sector.
+
+        Raises:
+            KeyError: If there is no such sector.
+        """
+        return Members(self, self._sectors[sector])
+
+    def sectors(self):
+        """Return the names of the sectors."""
+        return list(self._sectors)
+
+    def sectors_of(self, symbol):
+        """Return the sectors a Yahoo symbol belongs to."""
+        bit = 1 << self.ids[symbol] if symbol in self.ids else 0
+        return [sector for sector, bits in self._sectors.items() if bits & bit]
+
+    def of(self, symbols):
+        """Return the members for Yahoo symbols, skipping those not in the universe."""
+        bits = 0
+        for symbol in symbols:
+            if symbol in self.ids:
+                bits |= 1 << self.ids[symbol]
+        return Members(self, bits)
+
+    def align(self, frame, field="Close"):
+        """
+        Order the columns of a price matrix by ID.
+
+        Args:
+            frame (pandas.DataFrame): Prices with a column per Yahoo symbol, or a
+                multi-ticker download.
+            field (str): Price of a multi-ticker download to take, e.g. "High".
+
+        Returns:
+            pandas.DataFrame: A column per ID, in order; symbols missing from the frame
+            are NaN columns and symbols not in the universe are dropped.
+        """
+        if getattr(frame.columns, "nlevels", 1) > 1:
+            frame = frame[field]
+        return frame.reindex(columns=self.symbols)
+
+
+@lru_cache(maxsize=None)
+def registry():
+    """Return the universe of src/lib/constants.py, built on first use."""
+    from src.lib import constants  # pylint: disable=import-outside-toplevel
+
+    universe = Universe({name: (getattr(constants, name), suffix) for name, suffix in LISTS.items()}, constants.stocks_by_sector)
+    logger.info(f"Universe registry built with {len(universe)} symbols")
+    return universe
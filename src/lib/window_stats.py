@@ -0,0 +1,259 @@
+"""
+This module keeps the 52-week high and low and the 10-day average volume of symbols.
+
+The commodity and long-term reports used to read ``fiftyTwoWeekHigh``,
+``fiftyTwoWeekLow`` and ``averageDailyVolume10Day`` from ``Ticker.info``, a heavy quote
+summary call, on top of the history they download anyway. A WindowStats keeps them from
+daily bars instead: the highs and lows of the window in monotonic deques, whose front
+is the maximum or minimum, and the volumes of the last VOLUME_DAYS sessions with their
+running sum. Adding a closed bar and evicting the old ones is amortized O(1), and the
+state of every symbol is saved in WINDOW_STATS_PATH, so a report only fetches the
+bars since its last run. Today's bar is still moving, so it is never pushed; it is
+taken into account when the stats are read.
+
+Names, currencies and share counts do not move with the price, so they are read from
+``Ticker.info`` once every PROFILE_MAX_AGE days and kept with the stats; the market cap
+is the shares times the last price.
+"""
+
+import logging
+import os
+import pickle
+import threading
+from collections import deque, namedtuple
+from datetime import date, datetime, timedelta
+
+from src.lib.data_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+WINDOW_STATS_PATH = os.getenv("WINDOW_STATS_PATH", os.path.join(CACHE_DIR, "window_stats.pkl"))
+WINDOW_DAYS = 365
+VOLUME_DAYS = 10
+# Long enough for a stock in rotation to find its profile on its next turn
+PROFILE_MAX_AGE = 180
+
+Stats = namedtuple("Stats", ["price", "high", "low", "average_volume", "last_date"])
+Stats.__doc__ = """
+Window statistics of a symbol.
+
+Args:
+    price (float): Last price, today's close so far when there is a bar for today.
+    high (float): Highest high of the last WINDOW_DAYS days.
+    low (float): Lowest low of the last WINDOW_DAYS days.
+    average_volume (float): Average volume of the last VOLUME_DAYS closed sessions,
+        None without volume, e.g. for an index.
+    last_date (date): Date of the last bar.
+"""
+
+
+class WindowStats:
+    """
+    Rolling 52-week extremes and 10-day volume of a symbol, from closed daily bars.
+
+    Args:
+        window_days (int): Calendar days of the high and low window.
+        volume_days (int): Sessions of the average volume.
+    """
+
+    def __init__(self, window_days=WINDOW_DAYS, volume_days=VOLUME_DAYS):
+        self.window = timedelta(days=window_days)
+        self.highs = deque()
+        self.lows = deque()
+        self.volumes = deque(maxlen=volume_days)
+        self.volume_sum = 0.0
+        self.last_date = None
+        self.last_close = None
+        self.profile = None
+
+    def push(self, day, bar):
+        """
+        Add a closed daily bar, newer than the last one.
+
+        Args:
+            day (date): Date of the bar.
+            bar (tuple): (high, low, close, volume) of the bar.
+        """
+        high, low, close, volume = bar
+        # A bar with a higher high makes the older, lower highs useless for the maximum
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((day, high))
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((day, low))
+        if len(self.volumes) == self.volumes.maxlen:
+            self.volume_sum -= self.volumes[0]
+        self.volumes.append(volume)
+        self.volume_sum += volume
+        self.last_date = day
+        self.last_close = close
+
+    def evict(self, today):
+        """Drop the extremes older than the window."""
+        oldest = today - self.window
+        while self.highs and self.highs[0][0] <= oldest:
+            self.highs.popleft()
+        while self.lows and self.lows[0][0] <= oldest:
+            self.lows.popleft()
+
+    def stats(self, today, bar=None):
+        """
+        Return the stats, with today's bar when there is one.
+
+        Args:
+            today (date): Today, for the window.
+            bar (tuple, optional): (high, low, close) of today's bar so far.
+
+        Returns:
+            Stats: The stats, None without any bar.
+        """
+        self.evict(today)
+        highs = [self.highs[0][1]] if self.highs else []
+        lows = [self.lows[0][1]] if self.lows else []
+        price, last_date = self.last_close, self.last_date
+        if bar is not None:
+            highs.append(bar[0])
+            lows.append(bar[1])
+            price, last_date = bar[2], today
+        if price is None:
+            return None
+        average_volume = self.volume_sum / len(self.volumes) if self.volumes and self.volume_sum else None
+        return Stats(price, max(highs), min(lows), average_volume, last_date)
+
+
+_lock = threading.Lock()
+_states = None
+
+
+def _load(path):
+    global _states  # pylint: disable=global-statement
+    if _states is not None:
+        return _states
+    _states = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as file:
+                _states = pickle.load(file)
+        except (OSError, pickle.PickleError, EOFError, AttributeError) as e:
+            logger.error(f"Failed to read the window stats: {e}")
+    return _states
+
+
+def _save(path):
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump(_states, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logger.error(f"Failed to save the window stats: {e}")
+
+
+def _today(bars):
+    """Return today's date in the timezone of the bars."""
+    tz = getattr(bars.index, "tz", None)
+    return datetime.now(tz).date()
+
+
+def merge_bars(state, bars, today):
+    """
+    Push the closed bars newer than the last one into a state.
+
+    Args:
+        state (WindowStats): The state of the symbol.
+        bars (pandas.DataFrame): Daily bars with High, Low, Close and Volume columns,
+            or those of a single-ticker download.
+        today (date): Bars of today are not pushed.
+
+    Returns:
+        tuple: (high, low, close) of today's bar, None without one.
+    """
+    if getattr(bars.columns, "nlevels", 1) > 1:
+        bars = bars.droplevel(1, axis=1)
+    bars = bars.dropna(subset=["Close"])
+    volumes = bars["Volume"] if "Volume" in bars else None
+    today_bar = None
+    for position, (moment, row) in enumerate(bars.iterrows()):
+        day = moment.date()
+        if day >= today:
+            today_bar = (float(row["High"]), float(row["Low"]), float(row["Close"]))
+            break
+        if state.last_date is not None and day <= state.last_date:
+            continue
+        volume = float(volumes.iloc[position]) if volumes is not None else 0.0
+        state.push(day, (float(row["High"]), float(row["Low"]), float(row["Close"]), volume))
+    return today_bar
+
+
+def symbol_stats(symbol, bars=None, path=WINDOW_STATS_PATH):
+    """
+    Return the window stats of a symbol, updated with the bars since its last update.
+
+    Args:
+        symbol (str): Yahoo symbol, e.g. "GC=F".
+        bars (pandas.DataFrame, optional): Daily bars the caller already has, at least
+            since the last update; fetched otherwise, a year of them the first time.
+        path (str): File of the saved stats.
+
+    Returns:
+        Stats: The stats, None without any bar.
+    """
+    with _lock:
+        states = _load(path)
+        state = states.get(symbol)
+        if state is None:
+            state = states[symbol] = WindowStats()
+        last_date = state.last_date
+    if bars is None:
+        import yfinance as yf  # pylint: disable=import-outside-toplevel
+
+        if last_date is None:
+            bars = yf.Ticker(symbol).history(period="1y")
+        else:
+            bars = yf.Ticker(symbol).history(start=(last_date + timedelta(days=1)).strftime("%Y-%m-%d"))
+    with _lock:
+        today = _today(bars) if not bars.empty else date.today()
+        today_bar = merge_bars(state, bars, today) if not bars.empty else None
+        if state.last_date != last_date:
+            _save(path)
+        result = state.stats(today, today_bar)
+    logger.info(f"Window stats of {symbol}: {result}")
+    return result
+
+
+def symbol_profile(symbol, fetch=True, path=WINDOW_STATS_PATH):
+    """
+    Return the name, currency and share count of a symbol, read from ``Ticker.info``
+    once every PROFILE_MAX_AGE days.
+
+    Args:
+        symbol (str): Yahoo symbol.
+        fetch (bool): Read ``Ticker.info`` when there is no fresh profile; otherwise
+            return the saved one, however old, or None.
+
+    Returns:
+        dict: shortName, financialCurrency, sharesOutstanding and marketCap, as in ``Ticker.info``.
+    """
+    with _lock:
+        states = _load(path)
+        if symbol not in states and not fetch:
+            return None
+        state = states.setdefault(symbol, WindowStats())
+        profile = state.profile
+    if not fetch or (profile is not None and date.today() - profile["fetched_on"] <= timedelta(days=PROFILE_MAX_AGE)):
+        return profile
+    import yfinance as yf  # pylint: disable=import-outside-toplevel
+
+    info = yf.Ticker(symbol).info
+    profile = {key: info.get(key) for key in ("shortName", "financialCurrency", "sharesOutstanding", "marketCap")}
+    price = info.get("regularMarketPrice") or info.get("currentPrice")
+    if not profile["sharesOutstanding"] and profile["marketCap"] and price:
+        # Some quotes only have the market cap; the shares are what it was priced with
+        profile["sharesOutstanding"] = profile["marketCap"] / price
+    profile["fetched_on"] = date.today()
+    with _lock:
+        state.profile = profile
+        _save(path)
+    return profile
+
@@ -6,8 +6,8 @@ It uses the yfinance library to fetch market data and a custom email utility to
 import logging
 from datetime import datetime
 import pytz
-import yfinance as yf
 from src.email_utils import send_email
+from src.lib.quotes import get_close, get_open
 from src.lib.utils import get_turkish_month
 
 # Configure logger
@@ -17,9 +17,7 @@ def get_market_data(ticker):
     """Fetch market data for a given ticker."""
     try:
         logger.info(f"Fetching data for ticker: {ticker}")
-        ticker_data = yf.Ticker(ticker)
-        current = ticker_data.info.get('open', 0)
-        previous = ticker_data.info.get('previousClose', 0)
+        current, previous = get_open(ticker)
         if previous == 0:
             logger.warning(f"Previous close price not available for {ticker}")
             return 0, 0, 0.0
@@ -74,9 +72,7 @@ def us_close():
 
         for ticker, name in [("^IXIC", "NASDAQ"), ("^GSPC", "S&P 500"), ("^DJI", "Dow Jones")]:
             try:
-                ticker_data = yf.Ticker(ticker).history(period="max")
-                current = ticker_data["Close"].iloc[-1]
-                previous = ticker_data["Close"].iloc[-2]
+                current, previous = get_close(ticker)
                 change = round(((current - previous) / previous) * 100, 2)
                 body += format_market_data(name, change)
                 logger.info(f"Fetched closing data for {name} - Current: {current}, Previous: {previous}, Change: {change}%")